@@ -1,9 +1,71 @@
-import cv2
-import face_recognition
 import numpy as np
 import os
-import qrcode
 import pickle
+import struct
+import time
+
+from detectors import get_detector
+from lazy_imports import lazy_import, load
+from face_templates import TemplateSet
+from face_quality import assess_face
+from metrics import timed
+
+# Ciężkie biblioteki ładowane przy pierwszym użyciu (szybki start aplikacji),
+# wcześniej - w warm_up()
+cv2 = lazy_import('cv2')
+face_recognition = lazy_import('face_recognition')
+qrcode = lazy_import('qrcode')
+
+# Próg odległości wektorów, poniżej którego twarz uznajemy za zgodną
+MATCH_THRESHOLD = 0.5
+
+# Maksymalna szerokość obrazu, na którym szukamy twarzy (0 = pełna rozdzielczość).
+# Detekcja HOG działa na pomniejszonej kopii, a ramka jest przeliczana
+# z powrotem na współrzędne oryginału - kodowanie nadal na pełnym obrazie.
+DETECTION_WIDTH = int(os.environ.get('FACE_DETECTION_WIDTH', 640))
+
+# Format zapisu wektora twarzy: 8-bajtowy nagłówek + surowe dane little-endian.
+# Nagłówek: magic b'FENC', wersja (1 B), typ danych (1 B), wymiar (uint16).
+ENCODING_MAGIC = b'FENC'
+ENCODING_VERSION = 1
+ENCODING_HEADER = struct.Struct('<4sBBH')
+ENCODING_DTYPES = {1: np.dtype('<f4'), 2: np.dtype('<f2')}
+ENCODING_DTYPE_CODES = {'float32': 1, 'float16': 2}
+ENCODING_DTYPE = os.environ.get('FACE_ENCODING_DTYPE', 'float32')
+
+# Odczyt starych rekordów zapisanych przez pickle (przed migracją) - tylko
+# jawnie, ALLOW_LEGACY_PICKLE=1; pickle.loads na danych z bazy wykona dowolny kod
+ALLOW_LEGACY_PICKLE = os.environ.get('ALLOW_LEGACY_PICKLE', '0') == '1'
+
+# Wybór twarzy w klatce z kilkoma osobami (verify_face_multi):
+# match - najlepiej pasująca do właściciela QR, largest - największa, central - najbliżej środka.
+# W trybie match dopasowana twarz musi też być największa albo najbliżej środka -
+# właściciel kodu rozpoznany w tle (a przy bramce ktoś inny) to odmowa, nie wejście
+FACE_SELECTION = os.environ.get('FACE_SELECTION', 'match')
+# Maksymalna liczba (największych) twarzy kodowanych z jednej klatki
+MAX_FACES_PER_FRAME = int(os.environ.get('MAX_FACES_PER_FRAME', 5))
+
+def warm_up(detector=None):
+    """
+    Import ciężkich bibliotek (modele dlib) i przebieg próbny detekcji
+    i kodowania - koszt ponoszony przy starcie bramki, a nie przy pierwszym
+    żądaniu. Zwraca czasy poszczególnych kroków w sekundach.
+    """
+    timings = {}
+    start = time.perf_counter()
+    for module in (cv2, face_recognition, qrcode):
+        load(module)
+    timings["import"] = time.perf_counter() - start
+
+    img = np.zeros((64, 64, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    get_detector(detector).detect(img)
+    timings["detect"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    face_recognition.face_encodings(img, [(8, 56, 56, 8)])
+    timings["encode"] = time.perf_counter() - start
+    return timings
 
 def generate_qr(data, output_folder):
     qr = qrcode.QRCode(version=1, box_size=10, border=5)
@@ -14,19 +76,107 @@ def generate_qr(data, output_folder):
     img.save(os.path.join(output_folder, filename))
     return filename
 
-def get_face_data(image_source):
-    # Wczytanie
+def dump_encoding(encoding, dtype=None):
+    """Zapisuje wektor twarzy w formacie binarnym (nagłówek + float32/float16)"""
+    code = ENCODING_DTYPE_CODES[dtype or ENCODING_DTYPE]
+    data = np.asarray(encoding, dtype=ENCODING_DTYPES[code]).ravel()
+    return ENCODING_HEADER.pack(ENCODING_MAGIC, ENCODING_VERSION, code, data.size) + data.tobytes()
+
+def is_legacy_encoding(encoding_data):
+    return bytes(encoding_data[:len(ENCODING_MAGIC)]) != ENCODING_MAGIC
+
+def load_encoding(encoding_data, allow_pickle=None):
+    """
+    Dekoduje zapisany wektor twarzy do tablicy NumPy.
+    Dane float32 są czytane bez kopiowania (np.frombuffer, tylko do odczytu).
+    """
+    if isinstance(encoding_data, np.ndarray):
+        return encoding_data
+
+    if is_legacy_encoding(encoding_data):
+        if not (ALLOW_LEGACY_PICKLE if allow_pickle is None else allow_pickle):
+            raise ValueError("Stary format wektora (pickle) - uruchom python migrate_encodings.py "
+                             "(albo tymczasowo ALLOW_LEGACY_PICKLE=1)")
+        return pickle.loads(encoding_data)
+
+    magic, version, code, dim = ENCODING_HEADER.unpack_from(encoding_data)
+    if version != ENCODING_VERSION or code not in ENCODING_DTYPES:
+        raise ValueError(f"Nieobsługiwany format wektora (wersja {version}, typ {code})")
+
+    encoding = np.frombuffer(encoding_data, dtype=ENCODING_DTYPES[code], count=dim, offset=ENCODING_HEADER.size)
+    if code != 1:
+        encoding = encoding.astype(np.float32)
+    return encoding
+
+@timed('detect')
+def detect_faces(img, detection_width=None, detector=None):
+    """
+    Zwraca listę ramek (top, right, bottom, left) we współrzędnych oryginału.
+    detector - nazwa backendu z detectors.py (domyślnie FACE_DETECTOR).
+    """
+    if detection_width is None:
+        detection_width = DETECTION_WIDTH
+    backend = get_detector(detector)
+
+    height, width = img.shape[:2]
+    if not detection_width or width <= detection_width:
+        return backend.detect(img)
+
+    scale = width / float(detection_width)
+    small = cv2.resize(img, (detection_width, int(round(height / scale))), interpolation=cv2.INTER_AREA)
+
+    locations = []
+    for top, right, bottom, left in backend.detect(small):
+        locations.append((
+            max(0, int(top * scale)),
+            min(width, int(right * scale)),
+            min(height, int(bottom * scale)),
+            max(0, int(left * scale))
+        ))
+    return locations
+
+def load_image(image_source):
+    # Wczytanie (tablica RGB z image_ingest jest używana bez ponownego dekodowania)
+    if isinstance(image_source, np.ndarray):
+        return image_source
+    if hasattr(image_source, 'array'):
+        return image_source.array
     if hasattr(image_source, 'read'):
         image_source.seek(0)
-        img = face_recognition.load_image_file(image_source)
-    else:
-        img = face_recognition.load_image_file(image_source)
+    return face_recognition.load_image_file(image_source)
+
+def to_rect(location):
+    """Ramka (top, right, bottom, left) w formacie (x, y, w, h)"""
+    top, right, bottom, left = location
+    return {"x": left, "y": top, "w": right - left, "h": bottom - top}
+
+def _by_area(locations):
+    return sorted(locations, key=lambda l: (l[1] - l[3]) * (l[2] - l[0]), reverse=True)
+
+def locate_faces(image_source, detection_width=None):
+    """Wszystkie twarze w klatce (największa pierwsza) - sama detekcja, bez kodowania"""
+    return [to_rect(l) for l in _by_area(detect_faces(load_image(image_source), detection_width))]
 
-    # 1. Znajdź twarz
-    face_locations = face_recognition.face_locations(img)
+def get_face_data(image_source, detection_width=None, tracker=None):
+    encoding_data, coords, _ = get_face_data_checked(image_source, detection_width, tracker, check_quality=False)
+    return encoding_data, coords
+
+def get_face_data_checked(image_source, detection_width=None, tracker=None, check_quality=True):
+    """
+    get_face_data z bramką jakości (face_quality) przed kodowaniem.
+    Zwraca (wektor, coords, powód odrzucenia albo None).
+    """
+    img = load_image(image_source)
+
+    # 1. Znajdź twarz (na pomniejszonej kopii, jeśli obraz jest duży;
+    #    z trackerem - najpierw w obszarze ostatniej ramki)
+    if tracker is not None:
+        face_locations = tracker.locate(img, lambda frame: detect_faces(frame, detection_width))
+    else:
+        face_locations = detect_faces(img, detection_width)
     
     if not face_locations:
-        return None, None
+        return None, None, None
 
     # Pobieramy pierwszą twarz
     top, right, bottom, left = face_locations[0]
@@ -39,41 +189,175 @@ def get_face_data(image_source):
         "h": bottom - top
     }
 
-    # 2. Zakoduj cechy
-    face_encodings = face_recognition.face_encodings(img, face_locations)
+    # 2. Zakoduj cechy (tylko pierwszej twarzy - pozostałe i tak są pomijane)
+    if tracker is not None:
+        cached = tracker.cached_encoding(img, face_locations[0])
+        if cached is not None:
+            return cached, coords, None
+
+    # Mała, rozmyta albo źle oświetlona twarz - odrzucenie bez kodowania
+    if check_quality:
+        with timed('quality'):
+            reason = assess_face(img, face_locations[0])
+        if reason is not None:
+            return None, coords, reason
+
+    with timed('encode'):
+        face_encodings = face_recognition.face_encodings(img, face_locations[:1])
     
     if not face_encodings:
-        return None, coords
+        return None, coords, None
+
+    encoding_data = dump_encoding(face_encodings[0])
+    if tracker is not None:
+        tracker.store_encoding(img, face_locations[0], encoding_data)
+    return encoding_data, coords, None
 
-    return pickle.dumps(face_encodings[0]), coords
+def load_template_set(user_id, encodings_data):
+    """Buduje TemplateSet z zapisanych wektorów użytkownika (pierwszy = zdjęcie z rejestracji)"""
+    return TemplateSet(user_id, [load_encoding(e) for e in encodings_data], base_threshold=MATCH_THRESHOLD)
 
-def verify_face(known_encoding_pickle, unknown_image_file):
+def match_distance(known_encoding, unknown_encoding):
+    """Zwraca (odległość, próg) - dla TemplateSet najbliższy wzorzec i próg użytkownika"""
+    if isinstance(known_encoding, TemplateSet):
+        return known_encoding.match(unknown_encoding)
+    return face_recognition.face_distance([known_encoding], unknown_encoding)[0], MATCH_THRESHOLD
+
+def verify_face(known_encoding_data, unknown_image_file, tracker=None):
+    match, score, coords, _, _, _ = verify_face_with_encoding(known_encoding_data, unknown_image_file, tracker=tracker)
+    return match, score, coords
+
+def verify_face_with_encoding(known_encoding_data, unknown_image_file, tracker=None, check_quality=False):
+    """
+    verify_face zwracające dodatkowo wektor twarzy z kamery, odległość
+    i powód odrzucenia przez bramkę jakości
+    (match, score, coords, wektor, odległość, jakość) - do adaptacji wzorców.
+    """
+    # known_encoding_data: zapisany wektor, gotowy ndarray albo TemplateSet (np. z EncodingCache)
     # Pobierz twarz z kamery
-    unknown_encoding_packed, coords = get_face_data(unknown_image_file)
+    unknown_encoding_packed, coords, quality = get_face_data_checked(
+        unknown_image_file, tracker=tracker, check_quality=check_quality
+    )
 
     # Jeśli nie wykryto twarzy na zdjęciu
     if coords is None:
-        return False, 0, None
+        return False, 0, None, None, None, None
+
+    # Twarz odrzucona przez bramkę jakości - bez kodowania i porównania
+    if quality is not None:
+        return False, 0, coords, None, None, quality
 
     # Jeśli nie ma wzorca (nieznany QR), ale twarz jest widoczna
-    if known_encoding_pickle is None:
-        return False, 0, coords
+    if known_encoding_data is None:
+        return False, 0, coords, unknown_encoding_packed, None, None
 
     try:
-        known_encoding = pickle.loads(known_encoding_pickle)
+        if not isinstance(known_encoding_data, TemplateSet):
+            known_encoding_data = load_encoding(known_encoding_data)
         
         if unknown_encoding_packed:
-            unknown_encoding = pickle.loads(unknown_encoding_packed)
+            unknown_encoding = load_encoding(unknown_encoding_packed)
             
-            # Porównanie
-            distance = face_recognition.face_distance([known_encoding], unknown_encoding)[0]
+            # Porównanie (wszystkie wzorce użytkownika naraz)
+            with timed('distance'):
+                distance, threshold = match_distance(known_encoding_data, unknown_encoding)
             score = int((1.0 - distance) * 100)
-            is_match = distance < 0.5 # Próg sukcesu
+            is_match = distance < threshold # Próg sukcesu
 
-            return is_match, score, coords
+            return is_match, score, coords, unknown_encoding_packed, float(distance), None
         else:
-            return False, 0, coords
+            return False, 0, coords, None, None, None
             
     except Exception as e:
         print(f"Błąd AI: {e}")
-        return False, 0, coords
\ No newline at end of file
+        return False, 0, coords, None, None, None
+
+def verify_face_tracked(known_encoding_data, unknown_image_file, tracker, check_quality=False):
+    """
+    verify_face ze śledzeniem twarzy między klatkami. Zwraca także tracker,
+    bo w puli procesów stan zmieniony w workerze musi wrócić do wywołującego,
+    oraz powód odrzucenia przez bramkę jakości.
+    """
+    match, score, coords, _, _, quality = verify_face_with_encoding(
+        known_encoding_data, unknown_image_file, tracker=tracker, check_quality=check_quality
+    )
+    return match, score, coords, tracker, quality
+
+def select_face(locations, shape, selection):
+    """Indeks twarzy wybranej bez porównywania wektorów (largest / central)"""
+    if selection == 'central':
+        cy, cx = shape[0] / 2, shape[1] / 2
+        return min(
+            range(len(locations)),
+            key=lambda i: ((locations[i][0] + locations[i][2]) / 2 - cy) ** 2 + ((locations[i][1] + locations[i][3]) / 2 - cx) ** 2
+        )
+    # largest - lista jest posortowana po polu ramki
+    return 0
+
+def verify_face_multi(known_encoding_data, unknown_image_file, selection=None, check_quality=False):
+    """
+    Weryfikacja klatki z kilkoma osobami (np. kolejka przy bramce).
+
+    Wykrywa wszystkie twarze; w trybie 'match' koduje je jednym wywołaniem
+    face_encodings (do MAX_FACES_PER_FRAME największych) i wybiera tę
+    najlepiej pasującą do właściciela QR. Dostęp jest przyznany tylko wtedy,
+    gdy to twarz największa albo najbliżej środka - inaczej właściciel kodu
+    stojący w kolejce wpuściłby osobę przy bramce. Tryby 'largest' i 'central'
+    wybierają twarz przed kodowaniem, więc kodowana jest tylko jedna.
+    Zwraca wynik jak verify_face_with_encoding oraz ramki wszystkich twarzy.
+    """
+    img = load_image(unknown_image_file)
+    locations = _by_area(detect_faces(img))
+    if not locations:
+        return False, 0, None, None, None, None, []
+    faces = [to_rect(l) for l in locations]
+
+    selection = selection or FACE_SELECTION
+    if selection == 'match' and known_encoding_data is not None:
+        candidates = list(range(min(len(locations), MAX_FACES_PER_FRAME)))
+    else:
+        candidates = [select_face(locations, img.shape, 'largest' if selection == 'match' else selection)]
+
+    # Bramka jakości dla każdej kandydatki - słabe twarze (np. z tła) nie są kodowane
+    if check_quality:
+        with timed('quality'):
+            reasons = [assess_face(img, locations[i]) for i in candidates]
+        passed = [i for i, reason in zip(candidates, reasons) if reason is None]
+        if not passed:
+            return False, 0, faces[candidates[0]], None, None, reasons[0], faces
+        candidates = passed
+
+    try:
+        with timed('encode'):
+            encodings = face_recognition.face_encodings(img, [locations[i] for i in candidates])
+        if not encodings:
+            return False, 0, faces[candidates[0]], None, None, None, faces
+        if known_encoding_data is None:
+            return False, 0, faces[candidates[0]], dump_encoding(encodings[0]), None, None, faces
+
+        if not isinstance(known_encoding_data, TemplateSet):
+            known_encoding_data = load_encoding(known_encoding_data)
+        with timed('distance'):
+            results = [match_distance(known_encoding_data, e) for e in encodings]
+        best = min(range(len(results)), key=lambda i: results[i][0])
+        distance, threshold = results[best]
+        score = int((1.0 - distance) * 100)
+        is_match = distance < threshold
+        front = {select_face(locations, img.shape, 'largest'), select_face(locations, img.shape, 'central')}
+        if is_match and candidates[best] not in front:
+            print(f"Właściciel QR rozpoznany w tle (twarz {candidates[best] + 1} z {len(locations)}) - odmowa")
+            is_match = False
+        return (is_match, score, faces[candidates[best]],
+                dump_encoding(encodings[best]), float(distance), None, faces)
+
+    except Exception as e:
+        print(f"Błąd AI: {e}")
+        return False, 0, faces[candidates[0]], None, None, None, faces
+
+def rank_matches(face_index, unknown_encoding, top_k=5):
+    """Top-k dopasowań z indeksu dla gotowego wektora twarzy (próg każdego użytkownika)"""
+    matches = face_index.search(load_encoding(unknown_encoding), top_k=top_k)
+    for m in matches:
+        m["score"] = int((1.0 - m["distance"]) * 100)
+        m["match"] = m["distance"] < m["threshold"]
+    return matches
\ No newline at end of file
@@ -1,13 +1,40 @@
-from flask import Flask, request, jsonify, session
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from models import Base, User, AccessLog
-from ai_engine import get_face_data, generate_qr, verify_face
+from flask import Flask, request, jsonify, session, Response, stream_with_context
+from models import User, AccessLog, FaceTemplate, EdgeUpload
+from database import create_db_engine, create_session_factory, init_db
+from ai_engine import get_face_data, generate_qr, verify_face_with_encoding, verify_face_multi, verify_face_tracked, locate_faces, rank_matches, load_encoding, load_template_set
+from encoding_cache import EncodingCache
+from face_index import FaceIndex
+from image_ingest import UploadedImage
+from recognition_pool import RecognitionPool, PoolSaturated
+from io_writer import BackgroundWriter
+from snapshot_store import SnapshotStore
+from bulk_enroll import read_names, load_photos, enroll
+from log_writer import AccessLogWriter
+from log_queries import parse_filters, fetch_page, hourly_counts, export_lines, log_to_dict
+from frame_stream import FrameStreamManager, read_frames
+from face_quality import QualityStats, REJECT_REASONS
+from metrics import REGISTRY, timed, count_decision
+from lazy_imports import load_times
+import ai_engine
+from user_listing import UserListCache, user_to_dict, MAX_USERS_PAGE_SIZE
+from edge_snapshot import dump_edge_snapshot, user_payload
+from gate_limits import TokenBucketLimiter, DecisionCoalescer
+from migrate_encodings import count_legacy
+from detectors import validate_detector
 from flask_cors import CORS
+from sqlalchemy import update, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 import os
+import io
+import hmac
+import math
 import uuid
+import atexit
+import threading
+import time
+import zipfile
 import datetime
-from io import BytesIO
 
 BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 STATIC_DIR = os.path.join(BACKEND_DIR, 'static')
@@ -21,9 +48,11 @@ app.config['SESSION_COOKIE_SECURE'] = False  # Zmień na True w produkcji z HTTP
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 
-CORS(app)
+# max_age - przeglądarka pamięta preflight, więc klatki strumienia (image/jpeg)
+# nie płacą za dodatkowe żądanie OPTIONS przy każdym wysłaniu
+CORS(app, max_age=600)
 
-DB_FILE = f"sqlite:///{os.path.join(BACKEND_DIR, 'faceid_system.db')}"
+DB_FILE = os.environ.get('DATABASE_URL', f"sqlite:///{os.path.join(BACKEND_DIR, 'faceid_system.db')}")
 QR_FOLDER = os.path.join(STATIC_DIR, 'qrcodes')
 INCIDENT_FOLDER = os.path.join(STATIC_DIR, 'incidents')
 FACES_FOLDER = os.path.join(STATIC_DIR, 'faces')
@@ -32,9 +61,243 @@ os.makedirs(QR_FOLDER, exist_ok=True)
 os.makedirs(INCIDENT_FOLDER, exist_ok=True)
 os.makedirs(FACES_FOLDER, exist_ok=True)
 
-engine = create_engine(DB_FILE)
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
+engine = create_db_engine(
+    DB_FILE,
+    pool_size=int(os.environ.get('DB_POOL_SIZE', 10)),
+    max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 20))
+)
+init_db(engine)
+Session = create_session_factory(engine)
+
+@app.teardown_appcontext
+def remove_session(exception=None):
+    # Sesja wątku jest zawsze zamykana na końcu żądania (także po wyjątku)
+    Session.remove()
+
+# Cache wektorów twarzy (kod QR -> imię + wektor), rozgrzewany w initialize().
+# Cache jest osobny w każdym procesie - przy kilku workerach (gunicorn -w N)
+# usunięcie użytkownika unieważnia wpis tylko w jednym z nich, pozostałe
+# widzą zmianę po ENCODING_CACHE_TTL sekundach (0 = bez wygasania, tylko
+# dla jednego procesu).
+ENCODING_CACHE_SIZE = int(os.environ.get('ENCODING_CACHE_SIZE', 10000))
+ENCODING_CACHE_TTL = float(os.environ.get('ENCODING_CACHE_TTL', 60))
+encoding_cache = EncodingCache(max_size=ENCODING_CACHE_SIZE, ttl=ENCODING_CACHE_TTL)
+
+def user_templates(user):
+    """Wszystkie wzorce użytkownika (główny + dodatkowe) jako jeden TemplateSet"""
+    return load_template_set(user.id, [user.face_encoding] + [t.face_encoding for t in user.templates])
+
+def warm_encoding_cache():
+    session_db = Session()
+    try:
+        users = session_db.query(User).options(selectinload(User.templates)).limit(encoding_cache.max_size)
+        return encoding_cache.warm(users, encoding_of=user_templates)
+    finally:
+        session_db.close()
+
+# Indeks 1:N wszystkich aktywnych pracowników (identyfikacja bez QR)
+face_index = FaceIndex()
+
+def load_face_index():
+    session_db = Session()
+    try:
+        users = session_db.query(User).options(selectinload(User.templates)).filter(User.is_active == True)
+        return face_index.load(users, templates=user_templates)
+    finally:
+        session_db.close()
+
+# Cache i indeks są ładowane przy pierwszym żądaniu (albo w warm_up()),
+# a nie przy imporcie - import aplikacji (testy, skrypty) pozostaje szybki.
+# Wtedy też startuje sprzątanie snapshotów - także pod serwerem WSGI.
+_initialized = False
+_init_lock = threading.Lock()
+
+def check_legacy_encodings():
+    """Bez ALLOW_LEGACY_PICKLE=1 stare wektory (pickle) trzeba najpierw zmigrować"""
+    if ai_engine.ALLOW_LEGACY_PICKLE:
+        return
+    session_db = Session()
+    try:
+        legacy = count_legacy(session_db)
+    finally:
+        session_db.close()
+    if legacy:
+        raise RuntimeError(f"{legacy} wektorów twarzy w starym formacie (pickle) - "
+                           "uruchom python migrate_encodings.py (albo tymczasowo ALLOW_LEGACY_PICKLE=1)")
+
+def initialize():
+    """Rozgrzanie cache wektorów i indeksu 1:N oraz start sprzątania snapshotów - raz na proces"""
+    global _initialized
+    with _init_lock:
+        if not _initialized:
+            warm_encoding_cache()
+            load_face_index()
+            snapshot_store.start()
+            _initialized = True
+
+@app.before_request
+def ensure_initialized():
+    if not _initialized:
+        initialize()
+
+# Pula procesów dla obliczeń dlib (0 = obliczenia w wątku żądania)
+RECOGNITION_WORKERS = int(os.environ.get('RECOGNITION_WORKERS', 0))
+RECOGNITION_QUEUE_SIZE = int(os.environ.get('RECOGNITION_QUEUE_SIZE', 0))
+recognition_pool = RecognitionPool(workers=RECOGNITION_WORKERS, max_pending=RECOGNITION_QUEUE_SIZE)
+atexit.register(recognition_pool.shutdown)
+
+# Błędny FACE_DETECTOR, brak pliku FACE_DNN_MODEL albo niezmigrowane wektory
+# pickle zatrzymują start aplikacji (import) - bez ładowania modeli, więc
+# import pozostaje szybki, a proces nie przyjmuje ruchu, którego nie obsłuży
+validate_detector()
+check_legacy_encodings()
+
+# EAGER_WARM_UP=1 - rozgrzewka już przy imporcie (serwery WSGI bez __main__)
+EAGER_WARM_UP = os.environ.get('EAGER_WARM_UP', '0') == '1'
+warm_up_timings = {}
+
+def warm_up():
+    """
+    Inicjalizacja i załadowanie modeli przed ruchem - pierwsze żądanie
+    na bramce nie czeka na import dlib. Przy puli procesów modele ładują
+    workery, w przeciwnym razie proces aplikacji.
+    """
+    start = time.perf_counter()
+    initialize()
+    if recognition_pool.workers > 0:
+        recognition_pool.start()
+    else:
+        warm_up_timings.update(ai_engine.warm_up())
+    warm_up_timings["total"] = time.perf_counter() - start
+    return warm_up_timings
+
+# Zapisy snapshotów w tle - odpowiedź wychodzi przed zapisem pliku.
+# SNAPSHOT_JPEG_QUALITY > 0 koduje snapshot ponownie z tą jakością,
+# SNAPSHOT_CROP_FACE=1 zapisuje tylko wycinek z twarzą.
+SNAPSHOT_JPEG_QUALITY = int(os.environ.get('SNAPSHOT_JPEG_QUALITY', 0))
+SNAPSHOT_CROP_FACE = os.environ.get('SNAPSHOT_CROP_FACE', '0') == '1'
+background_writer = BackgroundWriter()
+atexit.register(background_writer.shutdown)
+
+# Snapshoty w katalogach dziennych (RRRR/MM/DD) z deduplikacją po skrócie treści.
+# Sprzątanie w tle: SNAPSHOT_RETENTION_DAYS (0 = bez limitu) i SNAPSHOT_MAX_MB (0 = bez limitu).
+SNAPSHOT_RETENTION_DAYS = int(os.environ.get('SNAPSHOT_RETENTION_DAYS', 90))
+SNAPSHOT_MAX_MB = int(os.environ.get('SNAPSHOT_MAX_MB', 0))
+SNAPSHOT_SWEEP_INTERVAL = int(os.environ.get('SNAPSHOT_SWEEP_INTERVAL', 3600))
+
+def clear_snapshot_paths(paths):
+    """Usunięte snapshoty - logi przestają na nie wskazywać"""
+    session_db = Session()
+    try:
+        for i in range(0, len(paths), 500):
+            session_db.execute(
+                update(AccessLog).where(AccessLog.snapshot_path.in_(paths[i:i + 500])).values(snapshot_path=None)
+            )
+        session_db.commit()
+    finally:
+        session_db.close()
+
+snapshot_store = SnapshotStore(
+    INCIDENT_FOLDER,
+    retention_days=SNAPSHOT_RETENTION_DAYS,
+    max_bytes=SNAPSHOT_MAX_MB * 1024 * 1024,
+    sweep_interval=SNAPSHOT_SWEEP_INTERVAL,
+    on_removed=clear_snapshot_paths
+)
+atexit.register(snapshot_store.shutdown)
+
+def save_snapshot(camera_image, face_rect=None):
+    """Zleca zapis snapshotu w tle i zwraca jego ścieżkę (względem INCIDENT_FOLDER)"""
+    snapshot_path = snapshot_store.reserve(camera_image)
+    background_writer.submit(
+        snapshot_store.write,
+        camera_image,
+        snapshot_path,
+        face_rect=face_rect,
+        jpeg_quality=SNAPSHOT_JPEG_QUALITY,
+        crop=SNAPSHOT_CROP_FACE
+    )
+    return snapshot_path
+
+# Logi wejść zapisywane partiami w tle (rozmiar partii / maks. opóźnienie w sekundach).
+# Gdy baza jest zablokowana, wpisy trafiają do pliku awaryjnego.
+LOG_BATCH_SIZE = int(os.environ.get('LOG_BATCH_SIZE', 100))
+LOG_FLUSH_INTERVAL = float(os.environ.get('LOG_FLUSH_INTERVAL', 0.5))
+LOG_SPILL_FILE = os.environ.get('LOG_SPILL_FILE', os.path.join(BACKEND_DIR, 'access_log_spill.jsonl'))
+access_log_writer = AccessLogWriter(
+    Session,
+    batch_size=LOG_BATCH_SIZE,
+    flush_interval=LOG_FLUSH_INTERVAL,
+    spill_path=LOG_SPILL_FILE
+)
+atexit.register(access_log_writer.shutdown)
+
+# Adaptacja wzorców: udane wejście z bardzo wysoką zgodnością dodaje nowy wzorzec
+# (np. zmiana fryzury, okulary), jeśli różni się od dotychczasowych.
+# Wzorce adaptacyjne nigdy nie zastępują zdjęć od admina - przy limicie
+# usuwany jest najstarszy wzorzec adaptacyjny.
+ADAPTIVE_TEMPLATES = os.environ.get('ADAPTIVE_TEMPLATES', '0') == '1'
+ADAPTIVE_MAX_DISTANCE = float(os.environ.get('ADAPTIVE_MAX_DISTANCE', 0.35))
+ADAPTIVE_MIN_NOVELTY = float(os.environ.get('ADAPTIVE_MIN_NOVELTY', 0.1))
+MAX_TEMPLATES = int(os.environ.get('MAX_TEMPLATES', 10))
+
+# Bramka jakości klatek z bramek (rozmiar twarzy, ostrość, ekspozycja) przed
+# kodowaniem wektora. Odrzucona klatka nie trafia do logów ani incydentów.
+QUALITY_GATING = os.environ.get('QUALITY_GATING', '1') == '1'
+quality_stats = QualityStats()
+
+# Klatki z kilkoma osobami: wszystkie twarze są kodowane naraz i wybierana jest
+# ta wskazana przez FACE_SELECTION (domyślnie najlepiej pasująca do właściciela QR;
+# wejście tylko wtedy, gdy to twarz największa albo najbliżej środka kadru, żeby
+# rozpoznany w kolejce właściciel kodu nie wpuścił osoby stojącej przy bramce)
+MULTI_FACE = os.environ.get('MULTI_FACE', '0') == '1'
+
+# Liczba procesów do kodowania zdjęć przy masowej rejestracji (górny limit
+# także dla parametru workers z formularza) oraz limity archiwum ZIP
+BULK_ENROLL_WORKERS = max(1, int(os.environ.get('BULK_ENROLL_WORKERS', os.cpu_count() or 1)))
+BULK_MAX_FILES = int(os.environ.get('BULK_MAX_FILES', 5000))
+BULK_MAX_MB = int(os.environ.get('BULK_MAX_MB', 500))
+
+# Lista pracowników dla panelu admina i bramek brzegowych - cache odpowiedzi
+# z ETagiem i dziennik zmian dla delt. Dziennik jest osobny w każdym procesie
+# (gunicorn -w N, rejestracja z bulk_enroll.py), więc co USERS_VERSION_TTL
+# sekund zaczyna się nowa epoka i klienci pobierają pełną listę z bazy
+# (0 = bez rotacji, tylko dla jednego procesu).
+USERS_VERSION_TTL = float(os.environ.get('USERS_VERSION_TTL', 300))
+users_cache = UserListCache(ttl=USERS_VERSION_TTL)
+
+# Powtórzone skany na bramce: żądania w toku dla tego samego (bramka, QR)
+# czekają na jedną decyzję. Odmowy są potem pamiętane DECISION_CACHE_TTL
+# sekund (0 = tylko łączenie żądań w toku) - w tym oknie ten sam kod QR na
+# tej samej bramce nie jest odrzucany ponownie. Sukces nie jest pamiętany:
+# każde wpuszczenie przechodzi pełną weryfikację twarzy i ma własny log.
+VERIFY_COALESCE = os.environ.get('VERIFY_COALESCE', '1') == '1'
+DECISION_CACHE_TTL = float(os.environ.get('DECISION_CACHE_TTL', 2.0))
+entry_coalescer = DecisionCoalescer(ttl=DECISION_CACHE_TTL)
+
+# Limit żądań weryfikacji na bramkę (token bucket, 0 = bez limitu).
+# Kubełek liczony per adres IP - gate_id z formularza ustawia klient,
+# więc zmiana identyfikatora nie może omijać limitu.
+GATE_RATE_LIMIT = float(os.environ.get('GATE_RATE_LIMIT', 5))
+GATE_RATE_BURST = int(os.environ.get('GATE_RATE_BURST', 10))
+gate_limiter = TokenBucketLimiter(GATE_RATE_LIMIT, GATE_RATE_BURST)
+
+# Kody QR, zdjęcia twarzy i snapshoty mają niezmienne nazwy (uuid / skrót treści),
+# więc przeglądarka może je trzymać w cache bez ponownego pytania serwera
+IMMUTABLE_STATIC_PREFIXES = ('/static/qrcodes/', '/static/faces/', '/static/incidents/')
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 365 * 24 * 3600))
+
+@app.after_request
+def cache_static_assets(response):
+    if response.status_code == 200 and request.path.startswith(IMMUTABLE_STATIC_PREFIXES):
+        response.headers['Cache-Control'] = f'private, max-age={STATIC_MAX_AGE}, immutable'
+    return response
+
+@app.errorhandler(PoolSaturated)
+def handle_pool_saturated(e):
+    response = jsonify({"status": "busy", "error": "Serwer przeciążony, spróbuj ponownie"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 # Decorator do ochrony adminowych endpointów
 def admin_required(f):
@@ -47,179 +310,789 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# EDGE_SYNC_TOKEN - wspólny klucz bramek (nagłówek X-Edge-Token) dla
+# endpointów /api/edge/* i /api/identify; bez niego dostępne tylko dla admina
+EDGE_SYNC_TOKEN = os.environ.get('EDGE_SYNC_TOKEN', '')
+
+def edge_auth_required(f):
+    """Decorator dla endpointów bramek: klucz X-Edge-Token albo sesja admina"""
+    from functools import wraps
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = request.headers.get('X-Edge-Token', '')
+        if not (EDGE_SYNC_TOKEN and hmac.compare_digest(token, EDGE_SYNC_TOKEN)) and not session.get('admin_logged_in', False):
+            return jsonify({"error": "Brak autoryzacji"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def encode_extra_photos(photos):
+    """Wektory twarzy z dodatkowych zdjęć; zdjęcia bez twarzy są pomijane"""
+    encodings = []
+    for photo in photos:
+        encoding_data, _ = recognition_pool.run(get_face_data, UploadedImage.from_upload(photo))
+        if encoding_data is not None:
+            encodings.append(encoding_data)
+    return encodings
+
 @app.route('/api/register', methods=['POST'])
 def register_user():
     name = request.form.get('name')
-    photo = request.files.get('photo')
-    if not name or not photo:
+    # Pierwsze zdjęcie jest główne, kolejne (opcjonalne) to dodatkowe wzorce
+    photos = request.files.getlist('photo')
+    if not name or not photos:
         return jsonify({"error": "Brak danych"}), 400
 
-    photo_bytes = BytesIO(photo.read())
-    photo.seek(0)
+    # Zdjęcie czytamy i dekodujemy tylko raz
+    upload = UploadedImage.from_upload(photos[0])
     
     # Pobranie danych twarzy
-    encoding_pickle, coords = get_face_data(photo_bytes)
+    encoding_data, coords = recognition_pool.run(get_face_data, upload)
     
-    if encoding_pickle is None:
+    if encoding_data is None:
         return jsonify({"error": "Nie wykryto twarzy. Użyj wyraźniejszego zdjęcia."}), 400
 
+    extra_encodings = encode_extra_photos(photos[1:MAX_TEMPLATES])
+
+    # Wykrywanie duplikatów - czy ta twarz jest już w bazie
+    encoding = load_encoding(encoding_data)
+    duplicates = [m for m in rank_matches(face_index, encoding, top_k=3) if m["match"]]
+
     photo_filename = f"{uuid.uuid4()}.jpg"
-    photo.seek(0)
-    photo.save(os.path.join(FACES_FOLDER, photo_filename))
+    upload.save(os.path.join(FACES_FOLDER, photo_filename))
 
     qr_data = str(uuid.uuid4())[:8]
+    # Synchronicznie - panel pokazuje kod QR zaraz po odpowiedzi
     generate_qr(qr_data, QR_FOLDER)
 
     session = Session()
     new_user = User(
         name=name, 
         qr_code_data=qr_data, 
-        face_encoding=encoding_pickle, 
-        photo_path=f"/static/faces/{photo_filename}"
+        face_encoding=encoding_data, 
+        photo_path=f"/static/faces/{photo_filename}",
+        templates=[FaceTemplate(face_encoding=e) for e in extra_encodings]
     )
     session.add(new_user)
     session.commit()
+    new_user_id = new_user.id
     session.close()
 
-    return jsonify({"message": "Dodano", "qr_code": qr_data})
+    templates = load_template_set(new_user_id, [encoding] + extra_encodings)
+    encoding_cache.put(qr_data, name, templates)
+    face_index.add(new_user_id, name, templates)
+    users_cache.record(added=[new_user_id])
 
-@app.route('/api/verify_entry', methods=['POST'])
-def verify_entry():
-    qr_input = request.form.get('qr_code')
-    camera_image = request.files.get('frame')
+    return jsonify({
+        "message": "Dodano",
+        "qr_code": qr_data,
+        "templates": 1 + len(extra_encodings),
+        "possible_duplicates": [{"id": m["user_id"], "name": m["name"]} for m in duplicates]
+    })
 
-    session = Session()
-    user = session.query(User).filter_by(qr_code_data=qr_input).first()
+@app.route('/api/register/bulk', methods=['POST'])
+@admin_required
+def register_bulk():
+    """Masowa rejestracja: plik ZIP ze zdjęciami + CSV (filename,name)"""
+    archive = request.files.get('archive')
+    names = request.files.get('names')
+    if not archive or not names:
+        return jsonify({"error": "Brak danych"}), 400
+
+    try:
+        rows = read_names(names.read())
+        photos = load_photos(archive.stream, [f for f, _ in rows],
+                             max_files=BULK_MAX_FILES, max_bytes=BULK_MAX_MB * 1024 * 1024)
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({"error": f"Niepoprawne pliki: {e}"}), 400
+
+    workers = request.form.get('workers', BULK_ENROLL_WORKERS, type=int) or 1
+    workers = max(1, min(workers, BULK_ENROLL_WORKERS, os.cpu_count() or 1))
+    report, created = enroll(rows, photos, Session, FACES_FOLDER, QR_FOLDER, workers=workers)
+
+    for user in created:
+        templates = load_template_set(user["id"], [user["face_encoding"]])
+        encoding_cache.put(user["qr_code_data"], user["name"], templates)
+        face_index.add(user["id"], user["name"], templates)
+    if created:
+        users_cache.record(added=[user["id"] for user in created])
+
+    return jsonify({
+        "message": f"Dodano {len(created)} z {len(report)}",
+        "added": len(created),
+        "failed": len(report) - len(created),
+        "rows": report
+    })
+
+def rect_to_json(rect):
+    return {k: int(rect[k]) for k in ('x', 'y', 'w', 'h')}
+
+def find_user_encoding(qr_input):
+    """Zwraca (imię, wzorce twarzy) dla kodu QR albo None"""
+    # Najpierw cache - zapytanie do bazy tylko przy braku wpisu
+    cached = encoding_cache.get(qr_input)
+    if cached is None:
+        session = Session()
+        with timed('db_lookup'):
+            user = session.query(User).options(selectinload(User.templates)).filter_by(qr_code_data=qr_input).first()
+        if user:
+            cached = encoding_cache.put(user.qr_code_data, user.name, user_templates(user))
+        session.close()
+    return cached
+
+def add_adaptive_template(user_id, encoding_data):
+    """Zapisuje wzorzec adaptacyjny i odświeża wpis w cache (wywoływane w tle)"""
+    session_db = Session()
+    try:
+        user = session_db.get(User, user_id, options=[selectinload(User.templates)])
+        if user is None:
+            return
+        user.templates.append(FaceTemplate(face_encoding=encoding_data, source='adaptive'))
+        adaptive = [t for t in user.templates if t.source == 'adaptive']
+        while adaptive and 1 + len(user.templates) > MAX_TEMPLATES:
+            user.templates.remove(adaptive.pop(0))
+        session_db.commit()
+        templates = user_templates(user)
+        encoding_cache.put(user.qr_code_data, user.name, templates)
+        face_index.add(user.id, user.name, templates)
+        # Zmienione wzorce - bramki offline pobiorą użytkownika ponownie w delcie
+        users_cache.record(added=[user.id])
+    finally:
+        session_db.close()
+
+def maybe_adapt_templates(templates, encoding_data, distance):
+    """Dodaje wektor z udanego wejścia jako nowy wzorzec, jeśli zgodność jest bardzo wysoka"""
+    if not ADAPTIVE_TEMPLATES or encoding_data is None or distance is None:
+        return
+    if getattr(templates, 'user_id', None) is None or distance > ADAPTIVE_MAX_DISTANCE:
+        return
+    if templates.nearest_template_distance(load_encoding(encoding_data)) < ADAPTIVE_MIN_NOVELTY:
+        return
+    background_writer.submit(add_adaptive_template, templates.user_id, encoding_data)
+
+def decide_entry(qr_input, camera_image):
+    """Decyzja wejścia dla kodu QR i klatki z kamery: (treść odpowiedzi, kod HTTP)"""
+    cached = find_user_encoding(qr_input)
 
     # Przypadek 1: Nieznany kod QR
-    if not user:
-        filename = f"unknown_{uuid.uuid4()}.jpg"
-        camera_image.seek(0)
-        camera_image.save(os.path.join(INCIDENT_FOLDER, filename))
+    if cached is None:
+        # Pobieramy współrzędne dla czerwonej ramki (sama detekcja, bez kodowania)
+        faces = [rect_to_json(f) for f in recognition_pool.run(locate_faces, camera_image)]
+        unknown_coords = faces[0] if faces else None
+
+        filename = save_snapshot(camera_image, unknown_coords)
         
-        # Pobieramy współrzędne dla czerwonej ramki
-        camera_image.seek(0)
-        _, unknown_coords = get_face_data(camera_image)
+        access_log_writer.log("Nieznany QR", "DENIED_QR", snapshot_path=filename)
         
-        session.add(AccessLog(user_name="Nieznany QR", status="DENIED_QR", snapshot_path=filename))
-        session.commit()
-        session.close()
-        
-        return jsonify({
+        return {
             "status": "denied", 
             "reason": "Zły kod QR", 
             "score": 0,
-            "face_rect": unknown_coords
-        }), 403
+            "face_rect": unknown_coords,
+            "faces": faces
+        }, 403
 
     # Przypadek 2: Użytkownik znaleziony - weryfikacja twarzy
     
-    # WAŻNE: Zapisujemy imię do zmiennej póki sesja jest otwarta!
-    user_name_str = user.name 
+    user_name_str, known_encoding = cached
     
-    camera_image.seek(0)
-    match, score, face_rect_dict = verify_face(user.face_encoding, camera_image)
+    if MULTI_FACE:
+        match, score, face_rect_dict, probe_encoding, distance, quality, all_faces = recognition_pool.run(
+            verify_face_multi, known_encoding, camera_image, None, QUALITY_GATING
+        )
+    else:
+        match, score, face_rect_dict, probe_encoding, distance, quality = recognition_pool.run(
+            verify_face_with_encoding, known_encoding, camera_image, None, QUALITY_GATING
+        )
+        all_faces = [face_rect_dict] if face_rect_dict else []
     
     # Konwersja prostokąta twarzy na format JSON
-    rect_data = None
-    if face_rect_dict:
-        rect_data = {
-            "x": int(face_rect_dict['x']),
-            "y": int(face_rect_dict['y']),
-            "w": int(face_rect_dict['w']),
-            "h": int(face_rect_dict['h'])
-        }
+    rect_data = rect_to_json(face_rect_dict) if face_rect_dict else None
+    faces = [rect_to_json(f) for f in all_faces]
     
     safe_score = int(score) if score is not None else 0
 
+    if QUALITY_GATING and face_rect_dict:
+        quality_stats.record(quality)
+    if quality is not None:
+        # Zła jakość klatki - prośba o ponowienie zamiast odmowy
+        return {
+            "status": "retry",
+            "reason": REJECT_REASONS[quality],
+            "quality": quality,
+            "score": 0,
+            "face_rect": rect_data,
+            "faces": faces
+        }, 422
+
     if match:
-        session.add(AccessLog(user_name=user_name_str, status="SUCCESS"))
-        session.commit()
-        session.close() # Zamykamy sesję DOPIERO TUTAJ
+        access_log_writer.log(user_name_str, "SUCCESS")
+        maybe_adapt_templates(known_encoding, probe_encoding, distance)
         
-        return jsonify({
+        return {
             "status": "success", 
             "user": user_name_str, # Używamy zmiennej string, nie obiektu bazy
             "score": safe_score,
-            "face_rect": rect_data
-        })
+            "face_rect": rect_data,
+            "faces": faces
+        }, 200
     else:
-        timestamp = datetime.datetime.now().strftime("%H%M%S")
-        filename = f"fail_{user_name_str}_{timestamp}.jpg"
-        camera_image.seek(0)
-        camera_image.save(os.path.join(INCIDENT_FOLDER, filename))
+        filename = save_snapshot(camera_image, rect_data)
         
-        session.add(AccessLog(
-            user_name=user_name_str, 
-            status="DENIED_FACE", 
-            snapshot_path=filename
-        ))
-        session.commit()
-        session.close() # Zamykamy sesję DOPIERO TUTAJ
+        access_log_writer.log(user_name_str, "DENIED_FACE", snapshot_path=filename)
         
-        return jsonify({
+        return {
             "status": "denied", 
             "reason": f"Niska zgodność ({safe_score}%)", 
             "score": safe_score,
-            "face_rect": rect_data
-        }), 403
+            "face_rect": rect_data,
+            "faces": faces
+        }, 403
+
+def request_gate_id():
+    return request.form.get('gate_id') or request.remote_addr
+
+def rate_limited_response():
+    """Odpowiedź 429, gdy adres klienta przekroczył limit żądań, w przeciwnym razie None"""
+    allowed, retry_after = gate_limiter.allow(request.remote_addr)
+    if allowed:
+        return None
+    response = jsonify({"status": "rate_limited", "error": "Za dużo żądań z bramki, spróbuj za chwilę"})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, 429
+
+def cacheable_decision(result):
+    # Pamiętamy tylko odmowy - sukces z cache wpuściłby kolejną osobę z tym samym QR
+    return result[1] == 403
+
+@app.route('/api/verify_entry', methods=['POST'])
+@timed('verify_entry')
+def verify_entry():
+    qr_input = request.form.get('qr_code')
+    frame = request.files.get('frame')
+    if not frame:
+        return jsonify({"error": "Brak danych"}), 400
+
+    gate_id = request_gate_id()
+    response = rate_limited_response()
+    if response is not None:
+        return response
+
+    # Klatka czytana i dekodowana raz - wspólna dla detekcji, kodowania i snapshotu
+    camera_image = UploadedImage.from_upload(frame)
+
+    if not VERIFY_COALESCE:
+        body, status = decide_entry(qr_input, camera_image)
+        return jsonify(body), status
+
+    # Skany w toku tego samego QR na tej bramce dostają jedną decyzję, a powtórzony
+    # chwilę później dostaje zapamiętaną odmowę (bez rozpoznawania, logu i snapshotu)
+    (body, status), source = entry_coalescer.run(
+        (gate_id, qr_input), lambda: decide_entry(qr_input, camera_image), cacheable_decision
+    )
+    if source != "computed":
+        body = dict(body, repeated=True)
+    return jsonify(body), status
+
+def verify_stream_frame(known_encoding, image, tracker):
+    match, score, face_rect, tracker, quality = recognition_pool.run(
+        verify_face_tracked, known_encoding, image, tracker, QUALITY_GATING
+    )
+    if QUALITY_GATING and face_rect:
+        quality_stats.record(quality)
+    if face_rect:
+        face_rect = rect_to_json(face_rect)
+    return match, score, face_rect, tracker
+
+# Ciągła weryfikacja klatek z kamer (jedna sesja na bramkę)
+# STREAM_MAX_SESSIONS - limit jednoczesnych sesji (gate_id podaje klient)
+STREAM_SESSION_TTL = int(os.environ.get('STREAM_SESSION_TTL', 15))
+STREAM_MAX_SESSIONS = int(os.environ.get('STREAM_MAX_SESSIONS', 1000))
+STREAM_MAX_FRAME_KB = int(os.environ.get('STREAM_MAX_FRAME_KB', 2048))
+stream_manager = FrameStreamManager(verify_stream_frame, session_ttl=STREAM_SESSION_TTL, max_sessions=STREAM_MAX_SESSIONS)
+
+def finish_expired_streams():
+    """Sesje zakończone bez dopasowania logujemy jako jedną odmowę (z ostatnią klatką z twarzą)"""
+    for stream in stream_manager.purge_expired():
+        log_stream_denial(stream)
+
+def log_stream_denial(stream):
+    if stream.decision:
+        return
+    filename = None
+    if stream.last_face_frame is not None:
+        filename = save_snapshot(stream.last_face_frame, stream.last_face_rect)
+    access_log_writer.log(stream.user_name, "DENIED_FACE", snapshot_path=filename)
+
+@app.route('/api/stream/start', methods=['POST'])
+def stream_start():
+    """Otwiera sesję strumienia klatek dla zeskanowanego kodu QR"""
+    qr_input = request.form.get('qr_code')
+    gate_id = request_gate_id()
+    finish_expired_streams()
+
+    # Ten sam limit co /api/verify_entry - otwarcie sesji to jedna próba wejścia
+    response = rate_limited_response()
+    if response is not None:
+        return response
+
+    cached = find_user_encoding(qr_input)
+    if cached is None:
+        access_log_writer.log("Nieznany QR", "DENIED_QR")
+        return jsonify({"status": "denied", "reason": "Zły kod QR", "score": 0}), 403
+
+    user_name_str, known_encoding = cached
+    stream, replaced = stream_manager.open(qr_input, gate_id, user_name_str, known_encoding)
+    if replaced:
+        log_stream_denial(replaced)
+
+    return jsonify({"stream_id": stream.id, "status": "pending", "expires_in": STREAM_SESSION_TTL})
+
+@app.route('/api/stream/<stream_id>/frame', methods=['POST'])
+def stream_frame(stream_id):
+    """
+    Kolejna klatka strumienia: surowe bajty JPEG w treści żądania
+    (albo pole 'frame' formularza). Zwraca bieżący stan sesji.
+    """
+    finish_expired_streams()
+    stream = stream_manager.get(stream_id)
+    if stream is None:
+        return jsonify({"error": "Sesja nie istnieje lub wygasła"}), 404
+
+    frame = request.files.get('frame')
+    data = frame.read() if frame else request.get_data()
+    if not data:
+        return jsonify({"error": "Brak danych"}), 400
+
+    if stream_manager.push_frame(stream, UploadedImage(data)):
+        access_log_writer.log(stream.user_name, "SUCCESS")
+
+    return jsonify(stream.to_dict())
+
+@app.route('/api/stream/<stream_id>/frames', methods=['POST'])
+def stream_frames(stream_id):
+    """
+    Ciągły strumień klatek w jednym żądaniu (Transfer-Encoding: chunked,
+    np. z kamery bramki): [długość uint32 big-endian][bajty JPEG]...
+    Połączenie zestawiane jest raz na próbę wejścia, a nie na klatkę.
+    Odpowiedź (stan sesji) po decyzji, wygaśnięciu sesji albo końcu treści.
+    """
+    finish_expired_streams()
+    stream = stream_manager.get(stream_id)
+    if stream is None:
+        return jsonify({"error": "Sesja nie istnieje lub wygasła"}), 404
+
+    frames = (UploadedImage(data) for data in read_frames(request.stream, STREAM_MAX_FRAME_KB * 1024))
+    try:
+        if stream_manager.push_stream(stream, frames):
+            access_log_writer.log(stream.user_name, "SUCCESS")
+    except ValueError as e:
+        return jsonify({"error": f"Niepoprawny strumień klatek: {e}"}), 400
+
+    return jsonify(stream.to_dict())
+
+@app.route('/api/stream/<stream_id>', methods=['GET'])
+def stream_status(stream_id):
+    """Stan sesji; ?wait=N czeka do N sekund na decyzję (long-poll)"""
+    stream = stream_manager.get(stream_id)
+    if stream is None:
+        return jsonify({"error": "Sesja nie istnieje lub wygasła"}), 404
+    wait = min(request.args.get('wait', 0, type=float), 30)
+    if wait > 0:
+        stream_manager.wait(stream, wait)
+    return jsonify(stream.to_dict())
+
+@app.route('/api/stream/<stream_id>', methods=['DELETE'])
+def stream_close(stream_id):
+    stream = stream_manager.close(stream_id)
+    if stream is None:
+        return jsonify({"error": "Sesja nie istnieje lub wygasła"}), 404
+    log_stream_denial(stream)
+    return jsonify(stream.to_dict())
+
+@app.route('/api/identify', methods=['POST'])
+@edge_auth_required
+def identify():
+    """
+    Identyfikacja 1:N - wejście bez kodu QR. Tylko dla bramek (X-Edge-Token)
+    i admina: lista dopasowań ujawnia, kto jest w bazie. Decyzja trafia do logu.
+    """
+    frame = request.files.get('frame')
+    if not frame:
+        return jsonify({"error": "Brak danych"}), 400
+
+    camera_image = UploadedImage.from_upload(frame)
+    top_k = request.form.get('top_k', 5, type=int)
+    encoding_data, coords = recognition_pool.run(get_face_data, camera_image)
+    matches = rank_matches(face_index, encoding_data, max(1, min(top_k, 50))) if encoding_data else []
+
+    best = matches[0] if matches and matches[0]["match"] else None
+    if best:
+        access_log_writer.log(best["name"], "SUCCESS")
+    elif encoding_data:
+        access_log_writer.log("Nieznana twarz", "DENIED_FACE")
+    return jsonify({
+        "status": "success" if best else "unknown",
+        "user": best["name"] if best else None,
+        "matches": [{
+            "id": m["user_id"],
+            "name": m["name"],
+            "score": m["score"],
+            "distance": round(m["distance"], 4),
+            "match": bool(m["match"])
+        } for m in matches],
+        "face_rect": coords
+    })
+
+def build_users_response(since, limit, cursor):
+    """Treść odpowiedzi /api/users i dodatkowe nagłówki (bez cache)"""
+    version = users_cache.version
+    headers = {'X-Users-Version': version}
+    session_db = Session()
+    try:
+        if since is not None:
+            changes = users_cache.changes_since(since)
+            if changes is None:
+                payload = {"version": version, "full": True, "removed": [],
+                           "added": [user_to_dict(u) for u in session_db.query(User).order_by(User.id)]}
+            else:
+                added, removed = changes
+                users = session_db.query(User).filter(User.id.in_(added)).order_by(User.id) if added else []
+                payload = {"version": version, "full": False, "removed": removed,
+                           "added": [user_to_dict(u) for u in users]}
+        else:
+            query = session_db.query(User).order_by(User.id)
+            if cursor:
+                query = query.filter(User.id > cursor)
+            if limit:
+                limit = max(1, min(limit, MAX_USERS_PAGE_SIZE))
+                users = query.limit(limit + 1).all()
+                if len(users) > limit:
+                    users = users[:limit]
+                    headers['X-Next-Cursor'] = str(users[-1].id)
+            else:
+                users = query.all()
+            # Kopiujemy dane do listy słowników przed zamknięciem sesji
+            payload = [user_to_dict(u) for u in users]
+    finally:
+        session_db.close()
+    return app.json.dumps(payload), headers, version
 
 @app.route('/api/users', methods=['GET'])
 @admin_required
 def get_users():
+    """
+    Lista pracowników. Bez parametrów - cała lista; limit + cursor - strona
+    (kursor następnej strony w nagłówku X-Next-Cursor); since=<wersja> - tylko
+    zmiany od wersji z nagłówka X-Users-Version ({added, removed, full}).
+    Odpowiedzi są cache'owane do następnej zmiany listy i mają ETag.
+    """
+    since = request.args.get('since')
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', type=int)
+    key = (since, limit, cursor)
+
+    entry = users_cache.get(key)
+    if entry is None:
+        body, headers, version = build_users_response(since, limit, cursor)
+        entry = users_cache.put(key, body, headers, version)
+
+    body, etag, headers = entry
+    response = Response(body, mimetype='application/json')
+    response.headers.update(headers)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/users/<int:user_id>/templates', methods=['POST'])
+@admin_required
+def add_user_templates(user_id):
+    """Dodatkowe zdjęcia pracownika jako kolejne wzorce twarzy"""
+    photos = request.files.getlist('photo')
+    if not photos:
+        return jsonify({"error": "Brak danych"}), 400
+
     session_db = Session()
-    users = session_db.query(User).all()
-    # Kopiujemy dane do listy słowników przed zamknięciem sesji
-    result = [{"id": u.id, "name": u.name, "qr": u.qr_code_data, "photo": u.photo_path} for u in users]
-    session_db.close()
-    return jsonify(result)
+    try:
+        user = session_db.get(User, user_id, options=[selectinload(User.templates)])
+        if user is None:
+            return jsonify({"error": "Użytkownik nie znaleziony"}), 404
+
+        free = MAX_TEMPLATES - 1 - len(user.templates)
+        encodings = encode_extra_photos(photos[:max(0, free)])
+        if not encodings:
+            return jsonify({"error": "Nie wykryto twarzy albo osiągnięto limit wzorców"}), 400
+
+        user.templates.extend(FaceTemplate(face_encoding=e) for e in encodings)
+        session_db.commit()
+        templates = user_templates(user)
+        encoding_cache.put(user.qr_code_data, user.name, templates)
+        face_index.add(user.id, user.name, templates)
+        users_cache.record(added=[user.id])
+        return jsonify({
+            "message": f"Dodano {len(encodings)} wzorców",
+            "templates": len(templates),
+            "threshold": templates.threshold
+        })
+    finally:
+        session_db.close()
 
 @app.route('/api/users/<int:user_id>', methods=['DELETE'])
 @admin_required
 def delete_user(user_id):
     session_db = Session()
-    user = session_db.query(User).get(user_id)
+    user = session_db.get(User, user_id)
     if user:
+        qr_data = user.qr_code_data
         session_db.delete(user)
         session_db.commit()
+        encoding_cache.invalidate(qr_data)
+        face_index.remove(user_id)
+        users_cache.record(removed=[user_id])
     session_db.close()
     return jsonify({"message": "Usunięto"})
 
+# Bramki offline (edge_gate.py): migawka wzorców, delty listy pracowników
+# i wysyłka zaległych logów (klucz bramek - EDGE_SYNC_TOKEN, wyżej)
+MAX_EDGE_UPLOAD = int(os.environ.get('MAX_EDGE_UPLOAD', 5000))
+_edge_snapshot = (None, None)  # (wersja listy, bajty migawki)
+_edge_snapshot_lock = threading.Lock()
+
+def query_edge_users(session_db, ids=None):
+    query = session_db.query(User).options(selectinload(User.templates)).filter(User.is_active == True)
+    if ids is not None:
+        query = query.filter(User.id.in_(ids))
+    return query.order_by(User.id)
+
+def build_edge_snapshot():
+    """(wersja, bajty migawki) - budowane raz na wersję listy pracowników"""
+    global _edge_snapshot
+    with _edge_snapshot_lock:
+        # Wersja sprzed zapytania: zmiany w trakcie budowania wrócą w kolejnej delcie
+        version = users_cache.version
+        if _edge_snapshot[0] != version:
+            buffer = io.BytesIO()
+            session_db = Session()
+            try:
+                dump_edge_snapshot(buffer, version, (
+                    (u.id, u.name, u.qr_code_data, user_templates(u)) for u in query_edge_users(session_db)
+                ))
+            finally:
+                session_db.close()
+            _edge_snapshot = (version, buffer.getvalue())
+        return _edge_snapshot
+
+@app.route('/api/edge/snapshot', methods=['GET'])
+@edge_auth_required
+def get_edge_snapshot():
+    """Migawka wzorców aktywnych pracowników (format edge_snapshot, wersja w X-Users-Version)"""
+    version, data = build_edge_snapshot()
+    response = Response(data, mimetype='application/octet-stream')
+    response.headers['X-Users-Version'] = version
+    response.set_etag(version)
+    return response.make_conditional(request)
+
+@app.route('/api/edge/delta', methods=['GET'])
+@edge_auth_required
+def get_edge_delta():
+    """
+    Zmiany od wersji since: added (nowi albo ze zmienionymi wzorcami, z macierzą
+    wzorców) i removed (id). full=true - bramka musi pobrać całą migawkę.
+    """
+    version = users_cache.version
+    changes = users_cache.changes_since(request.args.get('since'))
+    if changes is None:
+        return jsonify({"version": version, "full": True})
+
+    added, removed = changes
+    session_db = Session()
+    try:
+        users = query_edge_users(session_db, added).all() if added else []
+        payload = [user_payload(u.id, u.name, u.qr_code_data, user_templates(u)) for u in users]
+    finally:
+        session_db.close()
+    # Dodani, ale już nieaktywni - bramka też ich usuwa
+    removed = sorted(set(removed) | (set(added) - {u["id"] for u in payload}))
+    return jsonify({"version": version, "full": False, "added": payload, "removed": removed})
+
+@app.route('/api/edge/logs', methods=['POST'])
+@edge_auth_required
+def upload_edge_logs():
+    """
+    Zaległe logi z bramki offline: {gate_id, batch_id, entries: [{user_name,
+    status, timestamp}]}. Partia o tym samym batch_id jest zapisywana raz,
+    więc bramka może bezpiecznie ponawiać wysyłkę.
+    """
+    data = request.get_json(silent=True) or {}
+    batch_id, entries = data.get('batch_id'), data.get('entries')
+    if not batch_id or not isinstance(entries, list) or len(entries) > MAX_EDGE_UPLOAD:
+        return jsonify({"error": "Niepoprawne dane"}), 400
+    try:
+        rows = [{
+            "user_name": e.get("user_name"),
+            "status": e["status"],
+            "snapshot_path": None,
+            "timestamp": datetime.datetime.fromisoformat(e["timestamp"]),
+        } for e in entries]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({"error": "Niepoprawne wpisy"}), 400
+
+    session_db = Session()
+    try:
+        if session_db.get(EdgeUpload, batch_id) is not None:
+            return jsonify({"accepted": 0, "duplicate": True})
+        session_db.add(EdgeUpload(batch_id=batch_id, gate_id=data.get('gate_id'), entries=len(rows)))
+        if rows:
+            session_db.execute(insert(AccessLog), rows)
+        session_db.commit()
+    except IntegrityError:
+        # Ta sama partia zapisana równolegle
+        session_db.rollback()
+        return jsonify({"accepted": 0, "duplicate": True})
+    finally:
+        session_db.close()
+
+    for row in rows:
+        count_decision(row["status"])
+    return jsonify({"accepted": len(rows), "duplicate": False})
+
 @app.route('/api/logs', methods=['GET'])
 @admin_required
 def get_logs():
-    session_db = Session()
-    logs = session_db.query(AccessLog).order_by(AccessLog.timestamp.desc()).limit(50).all()
+    """
+    Logi wejść (najnowsze pierwsze). Parametry: limit, cursor, user,
+    status (lista po przecinku), since, until (ISO 8601).
+    Kursor następnej strony zwracany jest w nagłówku X-Next-Cursor.
+    """
+    try:
+        filters = parse_filters(request.args)
+        session_db = Session()
+        logs, next_cursor = fetch_page(
+            session_db, filters,
+            limit=request.args.get('limit', 50, type=int),
+            cursor=request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Kopiujemy dane do listy słowników przed zamknięciem sesji
-    result = [{
-        "id": l.id,
-        "time": str(l.timestamp), 
-        "user": l.user_name, 
-        "status": l.status, 
-        "snapshot": f"/static/incidents/{l.snapshot_path}" if l.snapshot_path else None
-    } for l in logs]
+    result = [log_to_dict(l) for l in logs]
+    session_db.close()
+
+    response = jsonify(result)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@app.route('/api/logs/stats', methods=['GET'])
+@admin_required
+def get_logs_stats():
+    """Liczba wejść na godzinę dla każdego statusu (te same filtry co /api/logs)"""
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    session_db = Session()
+    result = hourly_counts(session_db, filters)
     session_db.close()
     return jsonify(result)
 
+@app.route('/api/logs/export', methods=['GET'])
+@admin_required
+def export_logs():
+    """Strumieniowy eksport logów do CSV albo NDJSON (format=csv|ndjson)"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"error": "Nieobsługiwany format"}), 400
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(export_lines(Session, filters, fmt)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=access_logs.{fmt}'
+    return response
+
 @app.route('/api/logs/<int:log_id>', methods=['GET'])
 @admin_required
 def get_log_detail(log_id):
     """Pobranie szczegółów konkretnego logu z snapshot'em"""
     session_db = Session()
-    log = session_db.query(AccessLog).filter(AccessLog.id == log_id).first()
+    log = session_db.get(AccessLog, log_id)
     session_db.close()
     
     if not log:
         return jsonify({"error": "Log nie znaleziony"}), 404
     
+    return jsonify(log_to_dict(log))
+
+@app.route('/api/cache/stats', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    """Statystyki cache wektorów twarzy (trafienia/chybienia)"""
+    return jsonify({**encoding_cache.stats(), "users_list": users_cache.stats()})
+
+@app.route('/api/recognition/stats', methods=['GET'])
+@admin_required
+def get_recognition_stats():
+    """Stan puli rozpoznawania (zadania w toku, odrzucone) i czasy ładowania modeli"""
+    stats = recognition_pool.stats()
+    stats["module_load_s"] = load_times()
+    stats["warm_up_s"] = warm_up_timings
+    return jsonify(stats)
+
+@app.route('/api/stream/stats', methods=['GET'])
+@admin_required
+def get_stream_stats():
+    """Aktywne strumienie i skuteczność śledzenia twarzy"""
+    return jsonify(stream_manager.stats())
+
+@app.route('/api/quality/stats', methods=['GET'])
+@admin_required
+def get_quality_stats():
+    """Liczniki bramki jakości klatek (odrzucenia według powodu)"""
+    return jsonify(quality_stats.stats())
+
+@app.route('/api/gate/stats', methods=['GET'])
+@admin_required
+def get_gate_stats():
+    """Łączenie powtórzonych skanów i limit żądań na bramkę"""
+    return jsonify({"coalescing": entry_coalescer.stats(), "rate_limit": gate_limiter.stats()})
+
+# Metryki chwilowe odczytywane przy każdym eksporcie /metrics
+REGISTRY.gauge('faceid_encoding_cache_size', 'Liczba wpisów w cache wektorów', lambda: len(encoding_cache))
+REGISTRY.gauge('faceid_face_index_size', 'Liczba pracowników w indeksie 1:N', lambda: len(face_index))
+REGISTRY.gauge('faceid_recognition_pending', 'Zadania w toku w puli rozpoznawania', lambda: recognition_pool.stats()["pending"])
+REGISTRY.gauge('faceid_writer_queue_depth', 'Pliki oczekujące na zapis w tle', lambda: background_writer.stats()["queue_depth"])
+REGISTRY.gauge('faceid_access_log_buffered', 'Logi wejść oczekujące na zapis', lambda: access_log_writer.stats()["buffered"])
+REGISTRY.gauge('faceid_active_streams', 'Aktywne sesje strumieni klatek', lambda: stream_manager.stats()["active_streams"])
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Metryki w formacie tekstowym Prometheusa (bez logowania - dla scrapera).
+    Przy kilku procesach serwera każdy z nich eksportuje własne liczniki.
+    """
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/writer/stats', methods=['GET'])
+@admin_required
+def get_writer_stats():
+    """Stan kolejki zapisów w tle (pliki i logi wejść)"""
     return jsonify({
-        "id": log.id,
-        "time": str(log.timestamp),
-        "user": log.user_name,
-        "status": log.status,
-        "snapshot": f"/static/incidents/{log.snapshot_path}" if log.snapshot_path else None
+        "files": background_writer.stats(),
+        "access_logs": access_log_writer.stats(),
+        "snapshots": snapshot_store.stats()
     })
 
+@app.route('/api/snapshots/sweep', methods=['POST'])
+@admin_required
+def sweep_snapshots():
+    """Natychmiastowe sprzątanie snapshotów (retencja i limit rozmiaru)"""
+    removed = snapshot_store.sweep()
+    return jsonify({"removed": len(removed), **snapshot_store.stats()})
+
 @app.route('/')
 def home():
     return app.send_static_file('index.html')
@@ -251,5 +1124,9 @@ def check_admin():
     is_logged = session.get('admin_logged_in', False)
     return jsonify({"admin_logged_in": is_logged})
 
+if EAGER_WARM_UP:
+    warm_up()
+
 if __name__ == '__main__':
+    warm_up()
     app.run(debug=True, port=5000)
\ No newline at end of file
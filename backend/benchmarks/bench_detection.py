@@ -0,0 +1,90 @@
+"""
+Benchmark detekcji: pełna rozdzielczość vs pomniejszona kopia.
+
+Dla każdego zdjęcia z folderu mierzy czas get_face_data w obu trybach
+oraz porównuje wynik (czy wykryto twarz, odległość wektorów, zgodność
+decyzji przy progu MATCH_THRESHOLD).
+
+Uruchomienie (z folderu backend):
+    python benchmarks/bench_detection.py <folder_ze_zdjeciami> --width 640 --repeat 3
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from ai_engine import get_face_data, load_encoding, MATCH_THRESHOLD
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def time_call(path, detection_width, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = get_face_data(path, detection_width=detection_width)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folder')
+    parser.add_argument('--width', type=int, default=640, help='szerokość obrazu do detekcji')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='zapisz wyniki do pliku JSON')
+    args = parser.parse_args()
+
+    images = sorted(
+        os.path.join(args.folder, f) for f in os.listdir(args.folder)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not images:
+        sys.exit(f"Brak zdjęć w {args.folder}")
+
+    full_ms, small_ms, distances = [], [], []
+    detected_full = detected_small = agree = 0
+
+    for path in images:
+        t_full, (enc_full, _) = time_call(path, 0, args.repeat)
+        t_small, (enc_small, _) = time_call(path, args.width, args.repeat)
+        full_ms.append(t_full)
+        small_ms.append(t_small)
+
+        detected_full += enc_full is not None
+        detected_small += enc_small is not None
+        if enc_full is not None and enc_small is not None:
+            distance = float(np.linalg.norm(load_encoding(enc_full) - load_encoding(enc_small)))
+            distances.append(distance)
+            agree += distance < MATCH_THRESHOLD
+
+        print(f"{os.path.basename(path):40s} pełna {t_full:8.1f} ms   {args.width}px {t_small:8.1f} ms")
+
+    report = {
+        "images": len(images),
+        "detection_width": args.width,
+        "full_ms_median": statistics.median(full_ms),
+        "downscaled_ms_median": statistics.median(small_ms),
+        "speedup": statistics.median(full_ms) / max(statistics.median(small_ms), 1e-9),
+        "detected_full": detected_full,
+        "detected_downscaled": detected_small,
+        "encoding_distance_mean": statistics.mean(distances) if distances else None,
+        "encoding_distance_max": max(distances) if distances else None,
+        "same_identity": agree,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Porównanie detektorów twarzy (hog, cnn, haar, dnn) na lokalnym zbiorze zdjęć.
+
+Dla każdego backendu mierzy opóźnienie (p50/p95), przepustowość
+(zdjęcia/s) oraz czułość (recall). Z plikiem adnotacji czułość liczona
+jest po ramkach (IoU >= 0.5), bez niego - po zdjęciach (zakładamy, że na
+każdym zdjęciu jest twarz).
+
+Format adnotacji (JSON): {"plik.jpg": [[x, y, w, h], ...], ...}
+
+Uruchomienie (z folderu backend):
+    python benchmarks/bench_detectors.py <folder> --backends hog,haar,dnn --width 640
+    python benchmarks/bench_detectors.py <folder> --annotations adnotacje.json --json wyniki.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from ai_engine import detect_faces
+from detectors import DETECTORS, get_detector
+from image_ingest import decode_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = w * h
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_boxes(detected, expected, threshold=0.5):
+    """Zwraca (trafienia, fałszywe wykrycia) przy dopasowaniu zachłannym po IoU"""
+    unused = list(detected)
+    hits = 0
+    for box in expected:
+        best = max(unused, key=lambda d: iou(d, box), default=None)
+        if best is not None and iou(best, box) >= threshold:
+            unused.remove(best)
+            hits += 1
+    return hits, len(unused)
+
+
+def bench_backend(name, images, annotations, width, repeat):
+    get_detector(name)  # wczytanie modelu poza pomiarem
+    detect_faces(images[0][1], width, detector=name)  # rozgrzewka
+
+    timings = []
+    hits = expected_total = false_positives = images_with_face = 0
+    for filename, img in images:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            locations = detect_faces(img, width, detector=name)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+
+        boxes = [(l, t, r - l, b - t) for t, r, b, l in locations]
+        images_with_face += bool(boxes)
+        if annotations is not None:
+            expected = annotations.get(filename, [])
+            h, fp = match_boxes(boxes, expected)
+            hits += h
+            expected_total += len(expected)
+            false_positives += fp
+
+    total_s = sum(timings) / 1000
+    result = {
+        "backend": name,
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "throughput_ips": len(images) / total_s if total_s else None,
+        "images_with_face": images_with_face,
+    }
+    if annotations is not None:
+        result["recall"] = hits / expected_total if expected_total else None
+        result["false_positives"] = false_positives
+    else:
+        result["recall"] = images_with_face / len(images)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folder')
+    parser.add_argument('--backends', default=','.join(DETECTORS))
+    parser.add_argument('--annotations', help='plik JSON z ramkami twarzy')
+    parser.add_argument('--width', type=int, default=640, help='szerokość obrazu do detekcji (0 = pełna)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='zapisz wyniki do pliku JSON')
+    args = parser.parse_args()
+
+    filenames = sorted(f for f in os.listdir(args.folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+    if not filenames:
+        sys.exit(f"Brak zdjęć w {args.folder}")
+    images = []
+    for filename in filenames:
+        with open(os.path.join(args.folder, filename), 'rb') as f:
+            images.append((filename, decode_image(f.read())))
+
+    annotations = None
+    if args.annotations:
+        with open(args.annotations) as f:
+            annotations = json.load(f)
+
+    results = []
+    for name in args.backends.split(','):
+        try:
+            result = bench_backend(name.strip(), images, annotations, args.width, args.repeat)
+        except Exception as e:
+            print(f"{name:6s} pominięty: {e}")
+            continue
+        results.append(result)
+        # Adnotacje bez żadnej twarzy - recall nie jest liczony
+        recall = 'n/a' if result['recall'] is None else f"{result['recall']:.3f}"
+        print(f"{result['backend']:6s} p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+              f"{result['throughput_ips']:7.1f} zdj/s  recall {recall}")
+
+    report = {"images": len(images), "detection_width": args.width, "results": results}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
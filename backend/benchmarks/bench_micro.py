@@ -0,0 +1,95 @@
+"""
+Mikrobenchmarki funkcji silnika: get_face_data, verify_face, generate_qr.
+
+Każda funkcja jest wywoływana --repeat razy (po rozgrzewce); raport zawiera
+p50/p95/p99 i liczbę wywołań na sekundę. Bez --photo obraz jest syntetyczny
+(bez twarzy), więc get_face_data/verify_face mierzą samą detekcję.
+
+Uruchomienie (z folderu backend):
+    python benchmarks/bench_micro.py --photo jan.jpg --repeat 50 --json micro.json
+    python benchmarks/bench_micro.py --photo jan.jpg --compare micro_bazowe.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from bench_utils import summarize, write_report, compare
+from ai_engine import get_face_data, verify_face, generate_qr, dump_encoding
+from image_ingest import decode_image
+
+
+def bench(fn, repeat, warmup=3):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    result = summarize(timings)
+    result["mean_ms"] = sum(timings) / len(timings)
+    result["calls_per_s"] = 1000 / result["mean_ms"] if result["mean_ms"] else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--photo', help='zdjęcie z twarzą')
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--json', help='zapisz wyniki do pliku JSON')
+    parser.add_argument('--compare', help='plik JSON z wynikami bazowymi')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='dopuszczalna regresja (ułamek)')
+    args = parser.parse_args()
+
+    if args.photo:
+        with open(args.photo, 'rb') as f:
+            img = decode_image(f.read())
+    else:
+        img = np.random.default_rng(0).integers(0, 255, size=(480, 640, 3), dtype=np.uint8)
+
+    # Wzorzec: wektor ze zdjęcia (ta sama osoba) albo zerowy
+    known, _ = get_face_data(img)
+    if known is None:
+        known = dump_encoding(np.zeros(128))
+
+    qr_dir = tempfile.mkdtemp()
+    counter = iter(range(10 ** 9))
+
+    functions = {
+        "get_face_data": lambda: get_face_data(img),
+        "verify_face": lambda: verify_face(known, img),
+        "generate_qr": lambda: generate_qr(f"bench{next(counter):08d}", qr_dir),
+    }
+    results = {}
+    for name, fn in functions.items():
+        results[name] = bench(fn, args.repeat)
+        r = results[name]
+        print(f"{name:15s} p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  {r['calls_per_s']:8.1f} wywołań/s")
+
+    report = {
+        "photo": os.path.basename(args.photo) if args.photo else None,
+        "image_shape": list(img.shape),
+        "repeat": args.repeat,
+        "functions": results,
+    }
+    if args.json:
+        write_report(report, args.json)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, "functions", args.tolerance)
+        if regressions:
+            print("Regresje: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
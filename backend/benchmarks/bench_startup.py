@@ -0,0 +1,116 @@
+"""
+Profil startu backendu: czas importu modułów i rozgrzewki modeli.
+
+Każdy pomiar to osobny proces (zimny interpreter): python -X importtime
+-c "import <moduł>". Raport zawiera p50/p95 czasu całkowitego, moduły
+o największym łącznym czasie importu oraz czas warm_up() (import dlib,
+przebieg próbny detekcji i kodowania) na tymczasowej bazie.
+
+Uruchomienie (z folderu backend):
+    python benchmarks/bench_startup.py --repeat 5 --json startup.json
+    python benchmarks/bench_startup.py --module ai_engine --top 15
+    python benchmarks/bench_startup.py --compare startup_bazowe.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__)) + '/..'
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_utils import summarize, write_report, compare
+
+WARM_UP_CODE = (
+    "import json, time\n"
+    "start = time.perf_counter()\n"
+    "import app\n"
+    "imported = time.perf_counter() - start\n"
+    "timings = app.warm_up()\n"
+    "print(json.dumps(dict(timings, app_import=imported)))\n"
+)
+
+
+def run_python(code, env, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def parse_importtime(stderr):
+    """{moduł najwyższego poziomu: łączny czas importu w ms} z wyjścia -X importtime"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Wcięcie nazwy = głębokość zagnieżdżenia; bierzemy tylko bezpośrednie importy
+        if len(name) - len(name.lstrip()) <= 3:
+            name = name.strip()
+            modules[name] = modules.get(name, 0) + int(cumulative) / 1000
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', action='append', help='moduł do zaimportowania (domyślnie app i ai_engine)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='liczba najwolniejszych modułów w raporcie')
+    parser.add_argument('--no-warm-up', action='store_true', help='pomiń pomiar warm_up()')
+    parser.add_argument('--json', help='zapisz wyniki do pliku JSON')
+    parser.add_argument('--compare', help='plik JSON z wynikami bazowymi')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='dopuszczalna regresja (ułamek)')
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'startup.db')}", EAGER_WARM_UP='0')
+
+    results, slowest = {}, {}
+    for module in args.module or ['app', 'ai_engine']:
+        code = f"import {module}"
+        run_python(code, env)  # pierwszy przebieg: pliki .pyc i bufor systemu plików
+        timings, imports = [], {}
+        for _ in range(args.repeat):
+            elapsed, result = run_python(code, env, importtime=True)
+            timings.append(elapsed)
+            for name, ms in parse_importtime(result.stderr).items():
+                imports.setdefault(name, []).append(ms)
+        results[f"import_{module}"] = summarize(timings)
+        top = sorted(((sum(v) / len(v), k) for k, v in imports.items()), reverse=True)[:args.top]
+        slowest[module] = {name: round(ms, 2) for ms, name in top}
+        r = results[f"import_{module}"]
+        print(f"import {module:12s} p50 {r['p50_ms']:8.1f} ms  p95 {r['p95_ms']:8.1f} ms")
+        for name, ms in slowest[module].items():
+            print(f"    {name:30s} {ms:8.1f} ms")
+
+    warm_up = None
+    if not args.no_warm_up:
+        _, result = run_python(WARM_UP_CODE, env)
+        warm_up = {k: round(v * 1000, 1) for k, v in json.loads(result.stdout.splitlines()[-1]).items()}
+        print("warm_up (ms): " + ", ".join(f"{k} {v}" for k, v in warm_up.items()))
+
+    report = {
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "imports": results,
+        "slowest_modules_ms": slowest,
+        "warm_up_ms": warm_up,
+    }
+    if args.json:
+        write_report(report, args.json)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, "imports", args.tolerance)
+        if regressions:
+            print("Regresje: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Wspólne funkcje benchmarków: percentyle, zapis i porównanie wyników JSON."""
+import datetime
+import json
+import os
+import subprocess
+
+import numpy as np
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    return float(np.percentile(values, p))
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": max(values) if values else None,
+    }
+
+
+def git_commit():
+    """Skrót bieżącego commita (do porównywania wyników między commitami)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(report, path):
+    report = dict(report, commit=git_commit(), created_at=datetime.datetime.now().isoformat(timespec='seconds'))
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def compare(current, baseline, key, tolerance):
+    """
+    Porównuje p95 (i przepustowość, jeśli jest) dla wpisów current[key]
+    z plikiem bazowym. Zwraca listę regresji większych niż tolerance (ułamek).
+    """
+    regressions = []
+    for name, result in current.get(key, {}).items():
+        base = baseline.get(key, {}).get(name)
+        if not base:
+            continue
+        new_p95, old_p95 = result.get("p95_ms"), base.get("p95_ms")
+        if new_p95 and old_p95:
+            change = new_p95 / old_p95 - 1
+            print(f"{name:20s} p95 {old_p95:9.2f} -> {new_p95:9.2f} ms ({change:+.1%})")
+            if change > tolerance:
+                regressions.append(f"{name}: p95 {change:+.1%}")
+    new_rps, old_rps = current.get("throughput_rps"), baseline.get("throughput_rps")
+    if new_rps and old_rps:
+        change = new_rps / old_rps - 1
+        print(f"{'throughput':20s}     {old_rps:9.1f} -> {new_rps:9.1f} rps ({change:+.1%})")
+        if -change > tolerance:
+            regressions.append(f"throughput {change:+.1%}")
+    return regressions
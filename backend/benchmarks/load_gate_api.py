@@ -0,0 +1,276 @@
+"""
+Test obciążeniowy i regresyjny API bramek.
+
+Odtwarza syntetyczną mieszankę żądań przy zadanej współbieżności:
+    good        - poprawny kod QR i twarz właściciela  (/api/verify_entry)
+    wrong_qr    - nieznany kod QR                       (/api/verify_entry)
+    wrong_face  - poprawny kod QR, cudza twarz          (/api/verify_entry)
+    identify    - identyfikacja 1:N bez kodu QR         (/api/identify)
+i raportuje przepustowość oraz opóźnienia p50/p95/p99 dla każdego rodzaju.
+
+Domyślnie używa klienta testowego Flaska na tymczasowej bazie. Z --url
+wysyła żądania do działającego serwera (np. python app.py); identify
+wymaga wtedy klucza bramek (--token, domyślnie EDGE_SYNC_TOKEN).
+Bez zdjęć (--good-photo/--other-photo) klatki są syntetyczne i nie zawierają
+twarzy - mierzony jest wtedy narzut API, a good/wrong_face kończą się DENIED_FACE.
+
+Wyniki JSON zawierają skrót commita; --compare porównuje je z plikiem
+bazowym i kończy się kodem 1 przy regresji większej niż --tolerance.
+
+Każde żądanie ma domyślnie własny gate_id, więc łączenie powtórzonych
+skanów nie zmienia pomiaru rozpoznawania. --gates N rozkłada żądania na
+N bramek - symulacja godzin szczytu z ponawianiem. Limit żądań jest liczony
+per adres IP, więc lokalnie jest wyłączony (GATE_RATE_LIMIT=0); z --url
+serwer też powinien działać z GATE_RATE_LIMIT=0.
+
+Uruchomienie (z folderu backend):
+    python benchmarks/load_gate_api.py --concurrency 8 --requests 500 --json wyniki.json
+    python benchmarks/load_gate_api.py --good-photo jan_1.jpg --enroll-photo jan_2.jpg --other-photo anna.jpg
+    python benchmarks/load_gate_api.py --mix good=60,wrong_qr=20,wrong_face=20,identify=0
+    python benchmarks/load_gate_api.py --url http://127.0.0.1:5000 --qr abcd1234 --good-photo jan.jpg
+    python benchmarks/load_gate_api.py --json nowe.json --compare bazowe.json --tolerance 0.1
+    python benchmarks/load_gate_api.py --gates 4 --requests 400    # powtórzone skany na 4 bramkach
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from bench_utils import summarize, write_report, compare
+
+KINDS = ('good', 'wrong_qr', 'wrong_face', 'identify')
+ENDPOINTS = {'good': '/api/verify_entry', 'wrong_qr': '/api/verify_entry',
+             'wrong_face': '/api/verify_entry', 'identify': '/api/identify'}
+
+
+def synthetic_frame(seed):
+    rng = np.random.default_rng(seed)
+    img = Image.fromarray(rng.integers(0, 255, size=(480, 640, 3), dtype=np.uint8))
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def parse_mix(text):
+    weights = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind.strip() not in KINDS:
+            raise SystemExit(f"Nieznany rodzaj żądania: {kind} (dostępne: {', '.join(KINDS)})")
+        weights[kind.strip()] = float(weight)
+    return weights
+
+
+class FlaskTarget:
+    """Żądania przez klienta testowego Flaska (bez sieci)"""
+
+    def __init__(self, app, token=''):
+        self.app = app
+        self.token = token
+        self._local = threading.local()
+
+    def post(self, path, fields, files):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        data = dict(fields)
+        for name, content in files.items():
+            data[name] = (BytesIO(content), f'{name}.jpg')
+        response = client.post(path, data=data, content_type='multipart/form-data',
+                               headers={'X-Edge-Token': self.token})
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpTarget:
+    """Żądania HTTP do działającego serwera (multipart/form-data)"""
+
+    def __init__(self, base_url, token='', timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def post(self, path, fields, files):
+        boundary = uuid.uuid4().hex
+        body = BytesIO()
+        for name, value in fields.items():
+            body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+        for name, content in files.items():
+            body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{name}.jpg"\r\n'
+                       f'Content-Type: image/jpeg\r\n\r\n'.encode())
+            body.write(content)
+            body.write(b'\r\n')
+        body.write(f'--{boundary}--\r\n'.encode())
+
+        request = urllib.request.Request(
+            self.base_url + path, data=body.getvalue(),
+            headers={'Content-Type': f'multipart/form-data; boundary={boundary}', 'X-Edge-Token': self.token}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            try:
+                payload = json.loads(e.read() or b'null')
+            except ValueError:
+                payload = None
+            return e.code, payload
+
+
+def local_target(tmp_dir):
+    """Aplikacja na tymczasowej bazie; pliki zapisywane do katalogu tymczasowego"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    # Wszystkie żądania z jednego adresu - limit per IP odrzuciłby większość pomiaru
+    os.environ.setdefault('GATE_RATE_LIMIT', '0')
+    # /api/identify wymaga klucza bramek
+    os.environ.setdefault('EDGE_SYNC_TOKEN', uuid.uuid4().hex)
+    import app as app_module
+    app_module.INCIDENT_FOLDER = app_module.FACES_FOLDER = app_module.QR_FOLDER = tmp_dir
+    app_module.snapshot_store.root = tmp_dir
+    return app_module, FlaskTarget(app_module.app, app_module.EDGE_SYNC_TOKEN)
+
+
+def enroll_synthetic(app_module):
+    """Użytkownik z zerowym wektorem (tryb bez zdjęć)"""
+    from models import User
+    from ai_engine import dump_encoding
+    session = app_module.Session()
+    session.add(User(name="Test Obciążeniowy", qr_code_data="benchqr", face_encoding=dump_encoding(np.zeros(128))))
+    session.commit()
+    app_module.Session.remove()
+    return "benchqr"
+
+
+def run_load(target, plan, frames, qr, concurrency, gates=0, gate_prefix='bench'):
+    latencies = {kind: [] for kind in KINDS}
+    statuses = {kind: {} for kind in KINDS}
+    lock = threading.Lock()
+    position = iter(range(len(plan)))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(position, None)
+            if i is None:
+                return
+            kind = plan[i]
+            fields = {} if kind == 'identify' else {'qr_code': f"zly_{i}" if kind == 'wrong_qr' else qr}
+            fields['gate_id'] = f"{gate_prefix}{i % gates if gates else i}"
+            start = time.perf_counter()
+            try:
+                status, _ = target.post(ENDPOINTS[kind], fields, {'frame': frames[kind]})
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies[kind].append(elapsed)
+                statuses[kind][str(status)] = statuses[kind].get(str(status), 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total_s = time.perf_counter() - start
+    return latencies, statuses, total_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help='łączna liczba żądań')
+    parser.add_argument('--mix', default='good=70,wrong_qr=15,wrong_face=15', help='wagi rodzajów żądań')
+    parser.add_argument('--good-photo', help='klatka z twarzą zarejestrowanej osoby')
+    parser.add_argument('--enroll-photo', help='zdjęcie do rejestracji (domyślnie --good-photo)')
+    parser.add_argument('--other-photo', help='klatka z twarzą innej osoby (wrong_face)')
+    parser.add_argument('--url', help='adres działającego serwera zamiast klienta testowego')
+    parser.add_argument('--qr', help='kod QR istniejącego użytkownika (zamiast rejestracji)')
+    parser.add_argument('--token', default=os.environ.get('EDGE_SYNC_TOKEN', ''), help='klucz bramek dla identify (z --url)')
+    parser.add_argument('--warmup', type=int, default=10, help='żądania rozgrzewające (poza pomiarem)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--gates', type=int, default=0, help='liczba bramek (0 = osobna bramka dla każdego żądania)')
+    parser.add_argument('--json', help='zapisz wyniki do pliku JSON')
+    parser.add_argument('--compare', help='plik JSON z wynikami bazowymi')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='dopuszczalna regresja (ułamek)')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    good = read_file(args.good_photo) if args.good_photo else synthetic_frame(1)
+    frames = {
+        'good': good,
+        'wrong_qr': good,
+        'wrong_face': read_file(args.other_photo) if args.other_photo else synthetic_frame(2),
+        'identify': good,
+    }
+
+    tmp_dir = tempfile.mkdtemp()
+    if args.url:
+        target = HttpTarget(args.url, args.token)
+    else:
+        app_module, target = local_target(tmp_dir)
+
+    qr = args.qr
+    enroll_photo = args.enroll_photo or args.good_photo
+    if qr is None and enroll_photo:
+        status, payload = target.post('/api/register', {'name': 'Test Obciążeniowy'}, {'photo': read_file(enroll_photo)})
+        if status != 200:
+            raise SystemExit(f"Rejestracja nie powiodła się ({status}): {payload}")
+        qr = payload['qr_code']
+    elif qr is None:
+        if args.url:
+            raise SystemExit("Z --url podaj --qr albo --good-photo/--enroll-photo")
+        qr = enroll_synthetic(app_module)
+
+    rng = random.Random(args.seed)
+    kinds = [k for k in KINDS if mix.get(k)]
+    plan = rng.choices(kinds, weights=[mix[k] for k in kinds], k=args.requests)
+
+    if args.warmup:
+        run_load(target, plan[:args.warmup], frames, qr, 1, gate_prefix='warmup')
+    latencies, statuses, total_s = run_load(target, plan, frames, qr, args.concurrency, args.gates)
+
+    report = {
+        "target": args.url or "flask_test_client",
+        "concurrency": args.concurrency,
+        "gates": args.gates,
+        "requests": args.requests,
+        "mix": mix,
+        "synthetic_frames": not args.good_photo,
+        "throughput_rps": args.requests / total_s,
+        "latency": summarize([v for values in latencies.values() for v in values]),
+        "kinds": {kind: dict(summarize(latencies[kind]), endpoint=ENDPOINTS[kind], statuses=statuses[kind])
+                  for kind in kinds},
+    }
+    if args.json:
+        report = write_report(report, args.json)
+    print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, "kinds", args.tolerance)
+        if regressions:
+            print("Regresje: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
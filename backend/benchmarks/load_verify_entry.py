@@ -0,0 +1,147 @@
+"""
+Test obciążeniowy /api/verify_entry - równoległe bramki zapisujące do access_logs.
+
+Uruchamia aplikację na tymczasowej bazie SQLite, wysyła żądania z wielu
+wątków (mieszanka znanego i nieznanego kodu QR) i raportuje opóźnienia
+p50/p95/p99, czas wykonania INSERT-ów (oczekiwanie na blokadę zapisu)
+oraz liczbę błędów "database is locked".
+
+Uruchomienie (z folderu backend):
+    python benchmarks/load_verify_entry.py --threads 8 --requests 400
+    python benchmarks/load_verify_entry.py --threads 8 --no-wal    # porównanie bez WAL
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from bench_utils import summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help='łączna liczba żądań')
+    parser.add_argument('--no-wal', action='store_true', help='wyłącz tryb WAL (porównanie)')
+    parser.add_argument('--json', help='zapisz wyniki do pliku JSON')
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(db_dir, 'load.db')}"
+    # Wszystkie żądania z jednego adresu - limit per IP odrzuciłby większość pomiaru
+    os.environ.setdefault('GATE_RATE_LIMIT', '0')
+
+    import database
+    if args.no_wal:
+        database.SQLITE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL"}
+
+    from sqlalchemy import event
+    from sqlalchemy.exc import OperationalError
+    import app as app_module
+    from app import app, Session, engine
+    from models import User
+    from ai_engine import dump_encoding
+
+    # Snapshoty incydentów trafiają do katalogu tymczasowego, nie do static/
+    app_module.INCIDENT_FOLDER = app_module.snapshot_store.root = db_dir
+
+    session = Session()
+    session.add(User(name="Test Obciążeniowy", qr_code_data="loadtest", face_encoding=dump_encoding(np.zeros(128))))
+    session.commit()
+    Session.remove()
+
+    insert_ms, lock_errors = [], []
+    stats_lock = threading.Lock()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info['query_start'] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('INSERT'):
+            with stats_lock:
+                insert_ms.append((time.perf_counter() - conn.info['query_start']) * 1000)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if 'locked' in str(context.original_exception):
+            with stats_lock:
+                lock_errors.append(str(context.original_exception))
+
+    img = Image.new('RGB', (640, 480), color='gray')
+    img_bytes = BytesIO()
+    img.save(img_bytes, format='JPEG')
+    frame = img_bytes.getvalue()
+
+    latencies = {"known_qr": [], "unknown_qr": []}
+    statuses = {}
+    counter = iter(range(args.requests))
+    counter_lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with counter_lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            kind = "known_qr" if i % 2 == 0 else "unknown_qr"
+            qr = "loadtest" if kind == "known_qr" else f"zly_{i}"
+            start = time.perf_counter()
+            try:
+                response = client.post(
+                    '/api/verify_entry',
+                    # Osobna bramka na żądanie - bez łączenia powtórzonych skanów
+                    data={'qr_code': qr, 'gate_id': f"load{i}", 'frame': (BytesIO(frame), 'frame.jpg')},
+                    content_type='multipart/form-data'
+                )
+                status = response.status_code
+            except OperationalError:
+                status = 'locked'
+            elapsed = (time.perf_counter() - start) * 1000
+            with stats_lock:
+                latencies[kind].append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total_s = time.perf_counter() - start
+
+    all_latencies = latencies["known_qr"] + latencies["unknown_qr"]
+    report = {
+        "threads": args.threads,
+        "requests": args.requests,
+        "wal": not args.no_wal,
+        "throughput_rps": args.requests / total_s,
+        "latency": summarize(all_latencies),
+        "latency_known_qr": summarize(latencies["known_qr"]),
+        "latency_unknown_qr": summarize(latencies["unknown_qr"]),
+        "insert_ms": summarize(insert_ms),
+        "insert_mean_ms": statistics.mean(insert_ms) if insert_ms else None,
+        "lock_errors": len(lock_errors),
+        "statuses": {str(k): v for k, v in statuses.items()},
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
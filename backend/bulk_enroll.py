@@ -0,0 +1,231 @@
+"""
+Masowa rejestracja pracowników (ZIP albo folder ze zdjęciami + CSV z imionami).
+
+Plik CSV musi mieć nagłówek z kolumnami "filename" i "name", np.:
+    filename,name
+    jan.jpg,Jan Kowalski
+    anna.jpg,Anna Nowak
+
+Uruchomienie (z folderu backend):
+    python bulk_enroll.py zdjecia.zip imiona.csv --workers 4 --report raport.json
+    python bulk_enroll.py folder_ze_zdjeciami/ imiona.csv
+
+Skrypt zapisuje pracowników bezpośrednio w bazie, z pominięciem działającego
+serwera. Weryfikacja kodem QR działa od razu, lista pracowników i delty dla
+bramek brzegowych odświeżają się po USERS_VERSION_TTL sekundach, a
+identyfikacja bez kodu QR (indeks 1:N) widzi nowe osoby dopiero po restarcie
+serwera. Przy działającym serwerze lepiej użyć POST /api/register/bulk.
+"""
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from models import User
+from ai_engine import get_face_data, generate_qr
+from image_ingest import decode_image
+from recognition_pool import init_worker
+
+
+def encode_photo(data):
+    """Zwraca (zapisany wektor, None) albo (None, opis błędu)"""
+    if data is None:
+        return None, "Brak pliku ze zdjęciem"
+    try:
+        encoding_data, _ = get_face_data(decode_image(data))
+    except Exception as e:
+        return None, f"Nie można odczytać zdjęcia ({e})"
+    if encoding_data is None:
+        return None, "Nie wykryto twarzy"
+    return encoding_data, None
+
+
+def read_names(csv_source):
+    """Czyta CSV (ścieżka, bajty albo plik) i zwraca listę (filename, name)"""
+    if isinstance(csv_source, (bytes, bytearray)):
+        text = csv_source.decode('utf-8-sig')
+    elif hasattr(csv_source, 'read'):
+        text = csv_source.read()
+        if isinstance(text, bytes):
+            text = text.decode('utf-8-sig')
+    else:
+        with open(csv_source, encoding='utf-8-sig') as f:
+            text = f.read()
+
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or not {'filename', 'name'} <= set(reader.fieldnames):
+        raise ValueError("CSV musi zawierać kolumny: filename, name")
+    return [((row.get('filename') or '').strip(), (row.get('name') or '').strip()) for row in reader]
+
+
+def load_photos(source, filenames, max_files=None, max_bytes=None):
+    """
+    Zwraca słownik filename -> bajty dla plików z ZIP-a albo folderu.
+    Brakujące pliki mają wartość None. Nazwy są spłaszczane do basename,
+    więc ścieżki typu ../ nie wychodzą poza źródło.
+
+    max_files / max_bytes ograniczają liczbę wpisów archiwum i łączny
+    rozmiar rozpakowanych zdjęć - sprawdzane z katalogu ZIP-a przed
+    rozpakowaniem (ValueError po przekroczeniu).
+    """
+    wanted = {os.path.basename(f) for f in filenames if f}
+    photos = dict.fromkeys(wanted)
+
+    if isinstance(source, str) and os.path.isdir(source):
+        for name in wanted:
+            path = os.path.join(source, name)
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    photos[name] = f.read()
+        return photos
+
+    with zipfile.ZipFile(source) as archive:
+        infos = archive.infolist()
+        if max_files and len(infos) > max_files:
+            raise ValueError(f"Za dużo plików w archiwum ({len(infos)}, limit {max_files})")
+        selected = {}
+        for info in infos:
+            name = os.path.basename(info.filename)
+            if name in wanted and not info.is_dir() and name not in selected:
+                selected[name] = info
+        # Rozmiar z katalogu ZIP - odczyt i tak nie zwróci więcej niż file_size bajtów
+        total = sum(info.file_size for info in selected.values())
+        if max_bytes and total > max_bytes:
+            raise ValueError(f"Zdjęcia po rozpakowaniu zajmują {total // (1024 * 1024)} MB (limit {max_bytes // (1024 * 1024)} MB)")
+        for name, info in selected.items():
+            photos[name] = archive.read(info)
+    return photos
+
+
+def enroll(rows, photos, Session, faces_folder, qr_folder, workers=1):
+    """
+    Rejestruje pracowników z listy (filename, name).
+
+    Detekcja i kodowanie działają równolegle w puli procesów, wszyscy
+    poprawni użytkownicy są zapisywani w jednej transakcji, a kody QR
+    generowane hurtowo. Zwraca (raport dla każdego wiersza, lista
+    utworzonych użytkowników jako słowniki).
+    """
+    report = []
+    pending = []
+    for row_no, (filename, name) in enumerate(rows, start=1):
+        entry = {"row": row_no, "filename": filename, "name": name}
+        if not filename or not name:
+            entry.update(status="error", error="Brak danych")
+            report.append(entry)
+            continue
+        pending.append(entry)
+        report.append(entry)
+
+    datas = [photos.get(os.path.basename(e["filename"])) for e in pending]
+
+    executor = None
+    if workers > 1 and len(pending) > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker
+        )
+    try:
+        mapper = executor.map if executor else map
+        results = list(mapper(encode_photo, datas))
+
+        created = []
+        for entry, data, (encoding_data, error) in zip(pending, datas, results):
+            if error:
+                entry.update(status="error", error=error)
+                continue
+            photo_filename = f"{uuid.uuid4()}.jpg"
+            created.append({
+                "entry": entry,
+                "data": data,
+                "name": entry["name"],
+                "qr_code_data": str(uuid.uuid4())[:8],
+                "face_encoding": encoding_data,
+                "photo_filename": photo_filename,
+                "photo_path": f"/static/faces/{photo_filename}",
+            })
+
+        if created:
+            session = Session()
+            try:
+                users = [User(
+                    name=c["name"],
+                    qr_code_data=c["qr_code_data"],
+                    face_encoding=c["face_encoding"],
+                    photo_path=c["photo_path"]
+                ) for c in created]
+                session.add_all(users)
+                session.commit()
+                for c, user in zip(created, users):
+                    c["id"] = user.id
+            except Exception as e:
+                session.rollback()
+                for c in created:
+                    c["entry"].update(status="error", error=f"Błąd zapisu do bazy ({e})")
+                return report, []
+            finally:
+                session.close()
+
+            # Pliki zapisujemy dopiero po udanym commicie
+            for c in created:
+                with open(os.path.join(faces_folder, c["photo_filename"]), 'wb') as f:
+                    f.write(c["data"])
+
+            qr_codes = [c["qr_code_data"] for c in created]
+            list(mapper(generate_qr, qr_codes, repeat(qr_folder)))
+
+            for c in created:
+                c["entry"].update(status="ok", id=c["id"], qr_code=c["qr_code_data"])
+    finally:
+        if executor:
+            executor.shutdown()
+
+    return report, [{
+        "id": c["id"],
+        "name": c["name"],
+        "qr_code_data": c["qr_code_data"],
+        "face_encoding": c["face_encoding"],
+    } for c in created]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('photos', help='plik ZIP albo folder ze zdjęciami')
+    parser.add_argument('names', help='plik CSV z kolumnami filename,name')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--report', help='zapisz raport do pliku JSON')
+    args = parser.parse_args()
+
+    from app import Session, FACES_FOLDER, QR_FOLDER
+
+    rows = read_names(args.names)
+    photos = load_photos(args.photos, [f for f, _ in rows])
+    report, created = enroll(rows, photos, Session, FACES_FOLDER, QR_FOLDER, workers=args.workers)
+
+    for entry in report:
+        if entry["status"] == "ok":
+            print(f"{entry['row']:5d} OK    {entry['name']} ({entry['qr_code']})")
+        else:
+            print(f"{entry['row']:5d} BŁĄD  {entry['name'] or entry['filename']}: {entry['error']}")
+    print(f"Dodano {len(created)} z {len(report)}")
+    if created:
+        print("Uruchomiony serwer widzi nowych pracowników w identyfikacji 1:N dopiero po restarcie")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if len(created) < len(report):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
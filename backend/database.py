@@ -0,0 +1,60 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, scoped_session
+
+from models import Base
+
+# Ustawienia SQLite dla wielu bramek naraz:
+# WAL - odczyty nie blokują zapisu, synchronous=NORMAL - jeden fsync na checkpoint,
+# busy_timeout - zamiast natychmiastowego "database is locked" czekamy na blokadę
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def create_db_engine(db_url, pool_size=10, max_overflow=20, pool_timeout=10):
+    """Tworzy silnik bazy z pulą połączeń i (dla SQLite) trybem WAL"""
+    if db_url.startswith('sqlite'):
+        engine = create_engine(
+            db_url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_pre_ping=True,
+            connect_args={"check_same_thread": False, "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000}
+        )
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+        return engine
+
+    return create_engine(
+        db_url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_pre_ping=True
+    )
+
+
+def init_db(engine):
+    """Tworzy brakujące tabele i indeksy (także na istniejących bazach)"""
+    Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def create_session_factory(engine):
+    """
+    Sesje przypisane do wątku (scoped_session). Session() w obrębie jednego
+    żądania zwraca tę samą sesję, a Session.remove() na końcu żądania
+    gwarantuje jej zamknięcie i zwrot połączenia do puli.
+    """
+    return scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
@@ -0,0 +1,156 @@
+import os
+import threading
+
+from lazy_imports import lazy_import
+
+cv2 = lazy_import('cv2')
+face_recognition = lazy_import('face_recognition')
+
+# Wybór detektora twarzy: hog (domyślny), cnn, haar, dnn
+FACE_DETECTOR = os.environ.get('FACE_DETECTOR', 'hog')
+
+
+class FaceDetector:
+    """
+    Wspólny interfejs detektorów twarzy.
+    detect(img) przyjmuje obraz RGB (uint8) i zwraca listę ramek
+    (top, right, bottom, left) - ten sam format co face_recognition.
+    """
+    name = None
+
+    def detect(self, img):
+        raise NotImplementedError
+
+
+class HogDetector(FaceDetector):
+    """HOG z dlib (face_recognition) - dotychczasowy detektor"""
+    name = 'hog'
+
+    def __init__(self, upsample=1):
+        self.upsample = upsample
+
+    def detect(self, img):
+        return face_recognition.face_locations(img, number_of_times_to_upsample=self.upsample, model='hog')
+
+
+class CnnDetector(HogDetector):
+    """CNN (MMOD) z dlib - dokładniejszy, ale na CPU wielokrotnie wolniejszy od HOG"""
+    name = 'cnn'
+
+    def detect(self, img):
+        return face_recognition.face_locations(img, number_of_times_to_upsample=self.upsample, model='cnn')
+
+
+def _xywh_to_trbl(x, y, w, h, shape):
+    # Prawa i dolna krawędź z oryginalnego prostokąta, dopiero potem przycięcie
+    # lewej i górnej - twarz wystająca poza kadr nie przesuwa się w prawo/w dół
+    height, width = shape[:2]
+    right, bottom = min(width, int(x + w)), min(height, int(y + h))
+    return max(0, int(y)), right, bottom, max(0, int(x))
+
+
+class HaarDetector(FaceDetector):
+    """Kaskada Haara z OpenCV - najszybsza, mniej odporna na obrót i oświetlenie"""
+    name = 'haar'
+
+    def __init__(self, cascade_path=None, scale_factor=1.1, min_neighbors=5, min_size=40):
+        if not hasattr(cv2, 'CascadeClassifier'):
+            raise ValueError("Ta wersja OpenCV nie zawiera kaskad Haara (CascadeClassifier)")
+        cascade_path = cascade_path or os.environ.get('FACE_HAAR_CASCADE')
+        if not cascade_path and hasattr(cv2, 'data'):
+            cascade_path = os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+        self.classifier = cv2.CascadeClassifier(cascade_path)
+        if self.classifier.empty():
+            raise ValueError(f"Nie można wczytać kaskady Haara: {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        # CascadeClassifier nie jest bezpieczny wątkowo
+        self._lock = threading.Lock()
+
+    def detect(self, img):
+        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        with self._lock:
+            faces = self.classifier.detectMultiScale(
+                gray,
+                scaleFactor=self.scale_factor,
+                minNeighbors=self.min_neighbors,
+                minSize=(self.min_size, self.min_size)
+            )
+        boxes = [_xywh_to_trbl(x, y, w, h, img.shape) for x, y, w, h in faces]
+        # Największa twarz jako pierwsza (jak najbliżej kamery)
+        return sorted(boxes, key=lambda b: (b[1] - b[3]) * (b[2] - b[0]), reverse=True)
+
+
+class DnnDetector(FaceDetector):
+    """
+    Sieć YuNet (cv2.FaceDetectorYN) na CPU. Wymaga pliku modelu ONNX
+    (np. face_detection_yunet_2023mar.onnx) wskazanego w FACE_DNN_MODEL.
+    """
+    name = 'dnn'
+
+    def __init__(self, model_path=None, score_threshold=0.8):
+        self.model_path = self.check_model(model_path)
+        self.score_threshold = score_threshold
+        self._local = threading.local()
+
+    @staticmethod
+    def check_model(model_path=None):
+        """Ścieżka do pliku modelu (argument albo FACE_DNN_MODEL); brak pliku - ValueError"""
+        model_path = model_path or os.environ.get('FACE_DNN_MODEL')
+        if not model_path:
+            raise ValueError("Brak modelu YuNet - ustaw FACE_DNN_MODEL na ścieżkę do pliku .onnx")
+        if not os.path.isfile(model_path):
+            raise ValueError(f"Model YuNet nie istnieje: {model_path} (FACE_DNN_MODEL)")
+        return model_path
+
+    def _net(self, width, height):
+        # Osobna instancja na wątek; rozmiar wejścia ustawiany pod klatkę
+        net = getattr(self._local, 'net', None)
+        if net is None:
+            net = cv2.FaceDetectorYN.create(self.model_path, "", (width, height), self.score_threshold)
+            self._local.net = net
+        net.setInputSize((width, height))
+        return net
+
+    def detect(self, img):
+        height, width = img.shape[:2]
+        _, faces = self._net(width, height).detect(cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        faces = sorted(faces, key=lambda f: f[-1], reverse=True)
+        return [_xywh_to_trbl(f[0], f[1], f[2], f[3], img.shape) for f in faces]
+
+
+DETECTORS = {
+    'hog': HogDetector,
+    'cnn': CnnDetector,
+    'haar': HaarDetector,
+    'dnn': DnnDetector,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def validate_detector(name=None):
+    """
+    Sprawdza konfigurację detektora bez ładowania modeli (przy starcie
+    aplikacji, zanim pierwsze żądanie na bramce trafi na błąd): znaną
+    nazwę i - dla dnn - istniejący plik modelu. Zwraca nazwę; błąd - ValueError.
+    """
+    name = name or FACE_DETECTOR
+    if name not in DETECTORS:
+        raise ValueError(f"Nieznany detektor: {name} (dostępne: {', '.join(DETECTORS)})")
+    if name == 'dnn':
+        DnnDetector.check_model()
+    return name
+
+
+def get_detector(name=None):
+    """Zwraca (współdzieloną) instancję detektora o podanej nazwie"""
+    name = validate_detector(name)
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = DETECTORS[name]()
+        return _instances[name]
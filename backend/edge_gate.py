@@ -0,0 +1,354 @@
+"""
+Bramka offline - weryfikacja wejść lokalnie, bez serwera centralnego.
+
+Bramka trzyma migawkę wzorców aktywnych pracowników (edge_snapshot,
+plik mapowany w pamięci) i podejmuje decyzje sama, więc opóźnienie nie
+zależy od sieci, a awaria serwera nie zatrzymuje wejść. W tle co
+--sync-interval sekund pobiera deltę listy pracowników (nowi, zmienieni,
+usunięci) i wysyła zaległe logi wejść. Gdy serwer jest niedostępny,
+logi czekają w pliku na dysku bramki.
+
+Uruchomienie (z folderu backend):
+    python edge_gate.py --server http://serwer:5000 --token KLUCZ --port 5001
+Serwer: EDGE_SYNC_TOKEN=KLUCZ (ten sam klucz dla wszystkich bramek).
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+from flask import Flask, request, jsonify
+from flask_cors import CORS
+
+from ai_engine import verify_face_with_encoding, locate_faces, warm_up
+from detectors import validate_detector
+from edge_snapshot import EdgeSnapshot
+from face_quality import REJECT_REASONS
+from image_ingest import UploadedImage
+
+
+def rect_to_json(rect):
+    return {k: int(rect[k]) for k in ('x', 'y', 'w', 'h')}
+
+
+class SyncError(Exception):
+    """Serwer centralny niedostępny albo odrzucił żądanie synchronizacji"""
+
+
+class EdgeSyncClient:
+    """Klient endpointów /api/edge/* serwera centralnego (urllib, bez zależności)"""
+
+    def __init__(self, server_url, token='', timeout=10):
+        self.server_url = server_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, path, data=None):
+        headers = {'X-Edge-Token': self.token}
+        if data is not None:
+            data = json.dumps(data).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.server_url + path, data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            raise SyncError(f"{path}: HTTP {e.code}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise SyncError(f"{path}: {e}") from e
+
+    def fetch_snapshot(self, path):
+        """Pobiera pełną migawkę do pliku path (atomowo); zwraca jej wersję"""
+        headers, body = self._request('/api/edge/snapshot')
+        tmp_path = path + '.download'
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return headers.get('X-Users-Version')
+
+    def fetch_delta(self, since):
+        _, body = self._request('/api/edge/delta?' + urllib.parse.urlencode({'since': since or ''}))
+        return json.loads(body)
+
+    def upload_logs(self, gate_id, batch_id, entries):
+        _, body = self._request('/api/edge/logs', {'gate_id': gate_id, 'batch_id': batch_id, 'entries': entries})
+        return json.loads(body)
+
+
+class LogOutbox:
+    """
+    Logi wejść czekające na wysłanie (JSON lines, fsync po każdym wpisie).
+
+    Przed wysłaniem bieżący plik jest zamykany w partię z własnym
+    identyfikatorem (<plik>.<batch_id>.batch). Partia jest usuwana dopiero
+    po potwierdzeniu przez serwer, a ponowienie wysyła ten sam batch_id -
+    serwer zapisuje każdą partię raz. Urwane linie (np. zanik zasilania
+    w trakcie zapisu) trafiają do <plik>.corrupt i nie blokują wysyłki.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.uploaded = 0
+        self.corrupt = 0
+
+    def append(self, user_name, status, timestamp=None):
+        entry = {
+            "user_name": user_name,
+            "status": status,
+            "timestamp": (timestamp or datetime.datetime.now()).isoformat(),
+        }
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _batches(self):
+        with self._lock:
+            if os.path.exists(self.path) and os.path.getsize(self.path):
+                os.replace(self.path, f"{self.path}.{uuid.uuid4().hex}.batch")
+        return sorted(glob.glob(glob.escape(self.path) + '.*.batch'), key=os.path.getmtime)
+
+    def upload(self, send):
+        """Wysyła partie po kolei funkcją send(batch_id, wpisy); przerywa przy pierwszym błędzie"""
+        sent = 0
+        for batch_path in self._batches():
+            batch_id = batch_path[len(self.path) + 1:-len('.batch')]
+            entries = self._read_batch(batch_path)
+            if entries:
+                send(batch_id, entries)
+            os.remove(batch_path)
+            sent += len(entries)
+        self.uploaded += sent
+        return sent
+
+    def _read_batch(self, batch_path):
+        entries, corrupt = [], []
+        with open(batch_path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    if not isinstance(entry, dict):
+                        raise ValueError("wpis nie jest obiektem")
+                    entries.append(entry)
+                except ValueError:
+                    corrupt.append(line if line.endswith("\n") else line + "\n")
+        if corrupt:
+            with self._lock:
+                with open(self.path + '.corrupt', 'a', encoding='utf-8') as f:
+                    f.writelines(corrupt)
+                self.corrupt += len(corrupt)
+            print(f"Partia {os.path.basename(batch_path)}: {len(corrupt)} uszkodzonych linii "
+                  f"przeniesiono do {self.path}.corrupt")
+        return entries
+
+    def pending(self):
+        count = 0
+        for path in [self.path] + glob.glob(glob.escape(self.path) + '.*.batch'):
+            if os.path.exists(path):
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    count += sum(1 for line in f if line.strip())
+        return count
+
+
+class EdgeGate:
+    """
+    Decyzje wejścia na podstawie lokalnej migawki + synchronizacja w tle.
+
+    verify() zwraca (treść odpowiedzi, kod HTTP) w tym samym formacie co
+    /api/verify_entry serwera. sync() pobiera deltę (albo pełną migawkę,
+    gdy serwer nie zna już wersji bramki, np. po restarcie) i wysyła
+    zaległe logi; błąd sieci nie przerywa pracy bramki.
+    """
+
+    def __init__(self, snapshot_path, outbox_path, client=None, gate_id=None, sync_interval=30, check_quality=True):
+        self.snapshot_path = snapshot_path
+        self.snapshot = EdgeSnapshot.open(snapshot_path) if os.path.exists(snapshot_path) else None
+        self.outbox = LogOutbox(outbox_path)
+        self.client = client
+        self.gate_id = gate_id or uuid.uuid4().hex[:8]
+        self.sync_interval = sync_interval
+        self.check_quality = check_quality
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.decisions = 0
+        self.syncs = 0
+        self.full_syncs = 0
+        self.sync_errors = 0
+        self.last_sync = None
+        self.last_error = None
+
+    def verify(self, qr_code, image):
+        snapshot = self.snapshot
+        if snapshot is None:
+            return {"error": "Brak migawki wzorców - bramka nie była jeszcze zsynchronizowana"}, 503
+
+        cached = snapshot.lookup(qr_code)
+        if cached is None:
+            faces = [rect_to_json(f) for f in locate_faces(image)]
+            self._log("Nieznany QR", "DENIED_QR")
+            return {"status": "denied", "reason": "Zły kod QR", "score": 0,
+                    "face_rect": faces[0] if faces else None, "faces": faces}, 403
+
+        user_name, templates = cached
+        match, score, face_rect, _, _, quality = verify_face_with_encoding(
+            templates, image, check_quality=self.check_quality
+        )
+        face_rect = rect_to_json(face_rect) if face_rect else None
+        faces = [face_rect] if face_rect else []
+        safe_score = int(score) if score is not None else 0
+
+        if quality is not None:
+            return {"status": "retry", "reason": REJECT_REASONS[quality], "quality": quality, "score": 0,
+                    "face_rect": face_rect, "faces": faces}, 422
+        if match:
+            self._log(user_name, "SUCCESS")
+            return {"status": "success", "user": user_name, "score": safe_score,
+                    "face_rect": face_rect, "faces": faces}, 200
+        self._log(user_name, "DENIED_FACE")
+        return {"status": "denied", "reason": f"Niska zgodność ({safe_score}%)", "score": safe_score,
+                "face_rect": face_rect, "faces": faces}, 403
+
+    def _log(self, user_name, status):
+        self.outbox.append(user_name, status)
+        with self._lock:
+            self.decisions += 1
+
+    def _full_sync(self):
+        self.client.fetch_snapshot(self.snapshot_path)
+        self.snapshot = EdgeSnapshot.open(self.snapshot_path)
+        with self._lock:
+            self.full_syncs += 1
+
+    def sync(self):
+        """Pobiera zmiany i wysyła zaległe logi; zwraca False przy błędzie synchronizacji"""
+        if self.client is None:
+            return False
+        with self._sync_lock:
+            try:
+                if self.snapshot is None:
+                    self._full_sync()
+                else:
+                    delta = self.client.fetch_delta(self.snapshot.version)
+                    if delta["full"]:
+                        self._full_sync()
+                    elif delta["added"] or delta["removed"]:
+                        self.snapshot.apply_delta(delta)
+                        # Zapis i ponowne otwarcie - wzorce z delty też trafiają do pliku mapowanego
+                        self.snapshot.save(self.snapshot_path)
+                        self.snapshot = EdgeSnapshot.open(self.snapshot_path)
+                    else:
+                        self.snapshot.version = delta["version"]
+                self.outbox.upload(lambda batch_id, entries: self.client.upload_logs(self.gate_id, batch_id, entries))
+            except SyncError as e:
+                with self._lock:
+                    self.sync_errors += 1
+                    self.last_error = str(e)
+                print(f"Synchronizacja bramki nieudana: {e}")
+                return False
+            with self._lock:
+                self.syncs += 1
+                self.last_sync = datetime.datetime.now().isoformat(timespec='seconds')
+            return True
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._worker, name='edge-sync', daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while not self._stopped.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Błąd synchronizacji bramki: {e}")
+            self._stopped.wait(self.sync_interval)
+
+    def shutdown(self):
+        self._stopped.set()
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def stats(self):
+        snapshot = self.snapshot
+        with self._lock:
+            return {
+                "gate_id": self.gate_id,
+                "users": len(snapshot) if snapshot is not None else 0,
+                "version": snapshot.version if snapshot is not None else None,
+                "decisions": self.decisions,
+                "pending_logs": self.outbox.pending(),
+                "uploaded_logs": self.outbox.uploaded,
+                "corrupt_logs": self.outbox.corrupt,
+                "syncs": self.syncs,
+                "full_syncs": self.full_syncs,
+                "sync_errors": self.sync_errors,
+                "last_sync": self.last_sync,
+                "last_error": self.last_error,
+            }
+
+
+def create_app(gate):
+    """Lokalny serwer bramki z tym samym /api/verify_entry co serwer centralny"""
+    app = Flask(__name__)
+    CORS(app)
+
+    @app.route('/api/verify_entry', methods=['POST'])
+    def verify_entry():
+        frame = request.files.get('frame')
+        if not frame:
+            return jsonify({"error": "Brak danych"}), 400
+        body, status = gate.verify(request.form.get('qr_code'), UploadedImage.from_upload(frame))
+        return jsonify(body), status
+
+    @app.route('/api/edge/status', methods=['GET'])
+    def edge_status():
+        return jsonify(gate.stats())
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', required=True, help='adres serwera centralnego')
+    parser.add_argument('--token', default=os.environ.get('EDGE_SYNC_TOKEN', ''), help='klucz bramki (EDGE_SYNC_TOKEN)')
+    parser.add_argument('--gate-id', help='identyfikator bramki w logach serwera')
+    parser.add_argument('--snapshot', default='edge_snapshot.bin', help='plik migawki wzorców')
+    parser.add_argument('--outbox', default='edge_outbox.jsonl', help='plik zaległych logów')
+    parser.add_argument('--sync-interval', type=float, default=30)
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+    try:
+        validate_detector()
+    except ValueError as e:
+        parser.error(str(e))
+
+    gate = EdgeGate(args.snapshot, args.outbox, client=EdgeSyncClient(args.server, args.token),
+                    gate_id=args.gate_id, sync_interval=args.sync_interval)
+    # Modele i pierwsza synchronizacja przed przyjęciem ruchu
+    warm_up()
+    if not gate.sync() and gate.snapshot is None:
+        print(f"Brak migawki i połączenia z serwerem: {gate.last_error}")
+    gate.start()
+    create_app(gate).run(host='0.0.0.0', port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import base64
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+from face_templates import TemplateSet
+
+# Plik migawki dla bramek offline: nagłówek, indeks JSON (id, imię, QR, próg,
+# zakres wierszy) i macierz float32 wszystkich wzorców (+ centroidy)
+# wyrównana do 64 bajtów - czytana przez np.memmap, bez dekodowania.
+# Nagłówek: magic b'FEDG', wersja formatu (1 B), zarezerwowany (1 B),
+# wymiar wektora (uint16), liczba wierszy (uint32), długość indeksu (uint32).
+SNAPSHOT_MAGIC = b'FEDG'
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_HEADER = struct.Struct('<4sBBHII')
+SNAPSHOT_ALIGN = 64
+SNAPSHOT_DTYPE = np.dtype('<f4')
+
+
+def _matrix_offset(index_len):
+    size = SNAPSHOT_HEADER.size + index_len
+    return -(-size // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+
+
+def dump_edge_snapshot(f, version, users, dim=128):
+    """
+    Zapisuje migawkę do pliku f. users - iterowalne (id, imię, QR, TemplateSet);
+    version - wersja listy użytkowników (UserListCache), od której liczone są delty.
+    """
+    index, matrices, row = [], [], 0
+    for user_id, name, qr, templates in users:
+        matrix = np.asarray(templates._matrix, dtype=SNAPSHOT_DTYPE)
+        index.append({"id": user_id, "name": name, "qr": qr, "row": row,
+                      "rows": len(matrix), "threshold": float(templates.threshold)})
+        matrices.append(matrix)
+        row += len(matrix)
+    if matrices:
+        dim = matrices[0].shape[1]
+
+    index_data = json.dumps({"version": version, "users": index}, ensure_ascii=False).encode('utf-8')
+    f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, 0, dim, row, len(index_data)))
+    f.write(index_data)
+    f.write(b'\0' * (_matrix_offset(len(index_data)) - SNAPSHOT_HEADER.size - len(index_data)))
+    for matrix in matrices:
+        f.write(matrix.tobytes())
+    return len(index)
+
+
+def user_payload(user_id, name, qr, templates):
+    """Użytkownik w delcie JSON (macierz wzorców jako base64 float32)"""
+    matrix = np.asarray(templates._matrix, dtype=SNAPSHOT_DTYPE)
+    return {"id": user_id, "name": name, "qr": qr, "threshold": float(templates.threshold),
+            "rows": len(matrix), "matrix": base64.b64encode(matrix.tobytes()).decode('ascii')}
+
+
+def templates_from_payload(payload):
+    matrix = np.frombuffer(base64.b64decode(payload["matrix"]), dtype=SNAPSHOT_DTYPE)
+    return TemplateSet.from_matrix(payload["id"], matrix.reshape(payload["rows"], -1), payload["threshold"])
+
+
+class EdgeSnapshot:
+    """
+    Lokalna kopia wzorców aktywnych pracowników na bramce.
+
+    Macierz z pliku jest mapowana w pamięci (np.memmap) - otwarcie migawki
+    nie czyta ani nie dekoduje wektorów, a wpisy są widokami na plik.
+    Delty z serwera (dodani / zmienieni i usunięci pracownicy) są nakładane
+    w pamięci; save() zapisuje aktualny stan do nowego pliku.
+    lookup(qr) zwraca (imię, TemplateSet) - tak jak EncodingCache.get.
+    """
+
+    def __init__(self, version=None, entries=()):
+        self.version = version
+        self._by_qr = {}
+        self._qr_by_id = {}
+        self._lock = threading.Lock()
+        for user_id, name, qr, templates in entries:
+            self._by_qr[qr] = (user_id, name, templates)
+            self._qr_by_id[user_id] = qr
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            magic, fmt, _, dim, rows, index_len = SNAPSHOT_HEADER.unpack(f.read(SNAPSHOT_HEADER.size))
+            if magic != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT:
+                raise ValueError(f"Nieobsługiwany plik migawki (format {fmt})")
+            index = json.loads(f.read(index_len).decode('utf-8'))
+
+        if rows:
+            matrix = np.memmap(path, dtype=SNAPSHOT_DTYPE, mode='r', offset=_matrix_offset(index_len), shape=(rows, dim))
+        else:
+            matrix = np.empty((0, dim), dtype=SNAPSHOT_DTYPE)
+        entries = (
+            (u["id"], u["name"], u["qr"],
+             TemplateSet.from_matrix(u["id"], matrix[u["row"]:u["row"] + u["rows"]], u["threshold"]))
+            for u in index["users"]
+        )
+        return cls(index["version"], entries)
+
+    def lookup(self, qr_code):
+        entry = self._by_qr.get(qr_code)
+        if entry is None:
+            return None
+        return entry[1], entry[2]
+
+    def apply_delta(self, delta):
+        """Nakłada deltę z /api/edge/delta (dodani lub zmienieni zastępują poprzedni wpis)"""
+        with self._lock:
+            for user_id in delta["removed"]:
+                self._by_qr.pop(self._qr_by_id.pop(user_id, None), None)
+            for payload in delta["added"]:
+                old_qr = self._qr_by_id.pop(payload["id"], None)
+                self._by_qr.pop(old_qr, None)
+                self._by_qr[payload["qr"]] = (payload["id"], payload["name"], templates_from_payload(payload))
+                self._qr_by_id[payload["id"]] = payload["qr"]
+            self.version = delta["version"]
+
+    def save(self, path):
+        """Zapis atomowy (plik tymczasowy + os.replace) - czytelnicy starego pliku nie są przerywani"""
+        with self._lock:
+            users = [(user_id, name, qr, templates) for qr, (user_id, name, templates) in self._by_qr.items()]
+            version = self.version
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            dump_edge_snapshot(f, version, users)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self._by_qr)
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from ai_engine import load_encoding
+
+
+class EncodingCache:
+    """
+    Cache zdekodowanych wektorów twarzy (128-d) kluczowany kodem QR.
+
+    Pozwala ominąć zapytanie do bazy i dekodowanie wektora przy każdym wejściu.
+    Pojemność jest ograniczona - najdawniej używane wpisy są usuwane (LRU).
+    Cache jest lokalny dla procesu, więc przy kilku workerach każdy
+    z nich trzyma własną kopię, a invalidate() (usunięcie użytkownika,
+    nowy wzorzec) dociera tylko do procesu, który obsłużył zmianę.
+    Dlatego wpis żyje najwyżej ttl sekund - po tym czasie pozostałe
+    procesy czytają użytkownika ponownie z bazy. ttl=0 - bez wygasania
+    (bezpieczne tylko przy jednym procesie aplikacji).
+    """
+
+    def __init__(self, max_size=10000, ttl=0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, qr_code):
+        """Zwraca (user_name, encoding) albo None, jeśli kodu nie ma w cache"""
+        with self._lock:
+            entry = self._entries.get(qr_code)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] is not None and entry[0] <= self.clock():
+                del self._entries[qr_code]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(qr_code)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, qr_code, user_name, encoding):
+        """Zapisuje wektor twarzy; przyjmuje ndarray, TemplateSet albo dane z bazy"""
+        if isinstance(encoding, (bytes, bytearray, memoryview)):
+            encoding = load_encoding(encoding)
+        if isinstance(encoding, np.ndarray):
+            encoding.setflags(write=False)
+
+        expires = self.clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[qr_code] = (expires, user_name, encoding)
+            self._entries.move_to_end(qr_code)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return user_name, encoding
+
+    def invalidate(self, qr_code):
+        with self._lock:
+            self._entries.pop(qr_code, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def warm(self, users, encoding_of=None):
+        """
+        Wypełnia cache listą użytkowników (np. przy starcie aplikacji).
+        encoding_of(user) zwraca wpis do zapisania - domyślnie user.face_encoding.
+        """
+        count = 0
+        for user in users:
+            if count >= self.max_size:
+                break
+            self.put(user.qr_code_data, user.name, encoding_of(user) if encoding_of else user.face_encoding)
+            count += 1
+        return count
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
@@ -0,0 +1,161 @@
+import threading
+
+import numpy as np
+
+from ai_engine import load_encoding, MATCH_THRESHOLD
+from face_templates import TemplateSet
+
+ENCODING_DIM = 128
+
+
+class FaceIndex:
+    """
+    Indeks 1:N - wzorce wszystkich aktywnych pracowników w jednej
+    ciągłej macierzy float32.
+
+    Użytkownik zajmuje jeden wiersz na wzorzec (przy kilku wzorcach także
+    wiersz centroidu, jak w TemplateSet), a każdy wiersz niesie próg
+    użytkownika - o dopasowaniu decyduje ten sam próg co przy weryfikacji
+    kodem QR. Odległości do całej załogi liczone są jedną operacją
+    macierzową (||a - b||^2 = ||a||^2 + ||b||^2 - 2ab), a najbliższe
+    wiersze wybierane przez argpartition. Dodawanie i usuwanie działa
+    przyrostowo: macierz rośnie skokowo (podwajanie pojemności), a usunięty
+    wiersz zastępowany jest ostatnim, więc dane zawsze zajmują ciągły
+    blok [0:size].
+    """
+
+    def __init__(self, initial_capacity=1024):
+        self._matrix = np.zeros((initial_capacity, ENCODING_DIM), dtype=np.float32)
+        self._sq_norms = np.zeros(initial_capacity, dtype=np.float32)
+        self._user_ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._thresholds = np.zeros(initial_capacity, dtype=np.float64)
+        self._names = [None] * initial_capacity
+        self._rows = {}  # user_id -> numery wierszy
+        self._max_rows = 1  # najwięcej wierszy jednego użytkownika
+        self._size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, user_id):
+        return user_id in self._rows
+
+    def _grow(self):
+        capacity = max(1, self._matrix.shape[0]) * 2
+        matrix = np.zeros((capacity, ENCODING_DIM), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        user_ids = np.zeros(capacity, dtype=np.int64)
+        user_ids[:self._size] = self._user_ids[:self._size]
+        thresholds = np.zeros(capacity, dtype=np.float64)
+        thresholds[:self._size] = self._thresholds[:self._size]
+        self._matrix, self._sq_norms, self._user_ids, self._thresholds = matrix, sq_norms, user_ids, thresholds
+        self._names.extend([None] * (capacity - len(self._names)))
+
+    def add(self, user_id, name, encoding):
+        """
+        Dodaje (albo nadpisuje) wzorce użytkownika. encoding to TemplateSet
+        (wszystkie wzorce i próg użytkownika) albo pojedynczy wektor (próg bazowy).
+        """
+        if isinstance(encoding, TemplateSet):
+            vectors = encoding.templates if len(encoding) == 1 else np.vstack([encoding.templates, encoding.centroid])
+            threshold = encoding.threshold
+        else:
+            vectors = [load_encoding(encoding)]
+            threshold = MATCH_THRESHOLD
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, ENCODING_DIM)
+
+        with self._lock:
+            self.remove(user_id)
+            rows = []
+            for vector in vectors:
+                if self._size == self._matrix.shape[0]:
+                    self._grow()
+                row = self._size
+                self._size += 1
+                self._matrix[row] = vector
+                self._sq_norms[row] = np.dot(vector, vector)
+                self._user_ids[row] = user_id
+                self._thresholds[row] = threshold
+                self._names[row] = name
+                rows.append(row)
+            self._rows[user_id] = rows
+            self._max_rows = max(self._max_rows, len(rows))
+
+    def remove(self, user_id):
+        """Usuwa wzorce użytkownika; ostatnie wiersze trafiają na ich miejsce"""
+        with self._lock:
+            rows = self._rows.pop(user_id, None)
+            if rows is None:
+                return False
+            # Od końca - przenoszony ostatni wiersz nigdy nie jest wierszem usuwanym
+            for row in sorted(rows, reverse=True):
+                last = self._size - 1
+                if row != last:
+                    self._matrix[row] = self._matrix[last]
+                    self._sq_norms[row] = self._sq_norms[last]
+                    self._user_ids[row] = self._user_ids[last]
+                    self._thresholds[row] = self._thresholds[last]
+                    self._names[row] = self._names[last]
+                    moved = self._rows[int(self._user_ids[row])]
+                    moved[moved.index(last)] = row
+                self._names[last] = None
+                self._size = last
+            return True
+
+    def load(self, users, templates=None):
+        """
+        Buduje indeks od zera z listy użytkowników (np. przy starcie).
+        templates(user) zwraca TemplateSet użytkownika; bez niego - tylko główny wektor.
+        """
+        with self._lock:
+            self._rows.clear()
+            self._max_rows = 1
+            self._size = 0
+            for user in users:
+                self.add(user.id, user.name, templates(user) if templates else user.face_encoding)
+        return len(self._rows)
+
+    def search(self, encoding, top_k=5):
+        """
+        Zwraca top-k najbliższych pracowników jako listę słowników
+        {"user_id", "name", "distance", "threshold"} posortowaną rosnąco
+        po odległości (najbliższy wzorzec użytkownika).
+        """
+        query = np.asarray(load_encoding(encoding), dtype=np.float32).reshape(ENCODING_DIM)
+
+        with self._lock:
+            n = self._size
+            if n == 0:
+                return []
+            matrix = self._matrix[:n]
+            sq_dist = self._sq_norms[:n] - 2.0 * (matrix @ query) + np.dot(query, query)
+            np.maximum(sq_dist, 0.0, out=sq_dist)
+
+            # k użytkowników na pewno mieści się w k * (najwięcej wierszy na użytkownika)
+            # najbliższych wierszach - bliżej niż najlepszy wiersz k-tego są tylko wiersze
+            # k-1 lepszych użytkowników
+            k = min(top_k * self._max_rows, n)
+            if k < n:
+                best = np.argpartition(sq_dist, k - 1)[:k]
+            else:
+                best = np.arange(n)
+            best = best[np.argsort(sq_dist[best])]
+
+            results, seen = [], set()
+            for row in best:
+                user_id = int(self._user_ids[row])
+                if user_id in seen:
+                    continue
+                seen.add(user_id)
+                results.append({
+                    "user_id": user_id,
+                    "name": self._names[row],
+                    "distance": float(np.sqrt(sq_dist[row])),
+                    "threshold": float(self._thresholds[row]),
+                })
+                if len(results) == top_k:
+                    break
+            return results
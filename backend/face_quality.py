@@ -0,0 +1,87 @@
+import os
+import threading
+
+from lazy_imports import lazy_import
+
+cv2 = lazy_import('cv2')
+
+# Progi jakości twarzy sprawdzane przed kodowaniem (kosztownym) wektora.
+# Minimalny rozmiar twarzy w pikselach (krótszy bok ramki)
+QUALITY_MIN_FACE_SIZE = int(os.environ.get('QUALITY_MIN_FACE_SIZE', 60))
+# Minimalna ostrość - wariancja Laplasjanu wycinka twarzy w skali szarości
+QUALITY_MIN_SHARPNESS = float(os.environ.get('QUALITY_MIN_SHARPNESS', 30))
+# Dopuszczalna średnia jasność wycinka twarzy (0-255)
+QUALITY_MIN_BRIGHTNESS = float(os.environ.get('QUALITY_MIN_BRIGHTNESS', 40))
+QUALITY_MAX_BRIGHTNESS = float(os.environ.get('QUALITY_MAX_BRIGHTNESS', 220))
+
+# Powody odrzucenia i komunikaty dla osoby przy bramce
+REJECT_REASONS = {
+    "face_too_small": "Twarz za mała - podejdź bliżej kamery",
+    "blurry": "Obraz rozmyty - nie ruszaj się",
+    "too_dark": "Za ciemno - stań w świetle",
+    "too_bright": "Obraz prześwietlony",
+}
+
+
+def assess_face(img, box, min_size=None, min_sharpness=None, min_brightness=None, max_brightness=None):
+    """
+    Sprawdza jakość twarzy w ramce (top, right, bottom, left) obrazu RGB.
+    Zwraca powód odrzucenia (klucz REJECT_REASONS) albo None.
+    Kolejność od najtańszego testu: rozmiar, jasność, ostrość.
+    """
+    min_size = QUALITY_MIN_FACE_SIZE if min_size is None else min_size
+    min_sharpness = QUALITY_MIN_SHARPNESS if min_sharpness is None else min_sharpness
+    min_brightness = QUALITY_MIN_BRIGHTNESS if min_brightness is None else min_brightness
+    max_brightness = QUALITY_MAX_BRIGHTNESS if max_brightness is None else max_brightness
+
+    top, right, bottom, left = box
+    if min(right - left, bottom - top) < min_size:
+        return "face_too_small"
+
+    gray = cv2.cvtColor(img[max(0, top):bottom, max(0, left):right], cv2.COLOR_RGB2GRAY)
+    if gray.size == 0:
+        return "face_too_small"
+
+    brightness = float(gray.mean())
+    if brightness < min_brightness:
+        return "too_dark"
+    if brightness > max_brightness:
+        return "too_bright"
+
+    if cv2.Laplacian(gray, cv2.CV_64F).var() < min_sharpness:
+        return "blurry"
+    return None
+
+
+class QualityStats:
+    """
+    Liczniki bramki jakości (w procesie aplikacji - wyniki wracają z puli
+    rozpoznawania). Rozkład powodów odrzuceń pomaga ustawić kamery.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejected = dict.fromkeys(REJECT_REASONS, 0)
+
+    def record(self, reason):
+        with self._lock:
+            self.checked += 1
+            if reason is not None:
+                self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            rejected = sum(self.rejected.values())
+            return {
+                "checked": self.checked,
+                "passed": self.checked - rejected,
+                "rejected": rejected,
+                "rejected_by_reason": dict(self.rejected),
+                "thresholds": {
+                    "min_face_size": QUALITY_MIN_FACE_SIZE,
+                    "min_sharpness": QUALITY_MIN_SHARPNESS,
+                    "min_brightness": QUALITY_MIN_BRIGHTNESS,
+                    "max_brightness": QUALITY_MAX_BRIGHTNESS,
+                },
+            }
@@ -0,0 +1,59 @@
+import numpy as np
+
+# Maksymalny próg dla użytkownika o dużym rozrzucie wzorców
+MAX_TEMPLATE_THRESHOLD = 0.55
+# Waga rozrzutu wzorców przy wyznaczaniu progu użytkownika
+SPREAD_WEIGHT = 0.5
+
+
+class TemplateSet:
+    """
+    Wzorce twarzy jednego użytkownika (kilka zdjęć, np. w różnym oświetleniu).
+
+    Wzorce trzymane są w jednej macierzy float32 razem z centroidem, więc
+    porównanie z klatką to jedna operacja wektorowa. Rozrzut (średnia
+    odległość wzorców od centroidu) podnosi próg użytkownika - przy jednym
+    wzorcu próg jest równy bazowemu, a jego wzrost jest ograniczony
+    przez MAX_TEMPLATE_THRESHOLD.
+    """
+
+    def __init__(self, user_id, encodings, base_threshold=0.5):
+        self.user_id = user_id
+        self.templates = np.ascontiguousarray(np.atleast_2d(np.asarray(encodings, dtype=np.float32)))
+        self.centroid = self.templates.mean(axis=0)
+        if len(self.templates) > 1:
+            self.spread = float(np.linalg.norm(self.templates - self.centroid, axis=1).mean())
+        else:
+            self.spread = 0.0
+        self.threshold = min(base_threshold + SPREAD_WEIGHT * self.spread, max(base_threshold, MAX_TEMPLATE_THRESHOLD))
+        # Macierz porównań: wszystkie wzorce + centroid
+        self._matrix = np.vstack([self.templates, self.centroid])
+        self._matrix.setflags(write=False)
+
+    @classmethod
+    def from_matrix(cls, user_id, matrix, threshold):
+        """
+        TemplateSet z gotowej macierzy porównań (wzorce + centroid w ostatnim
+        wierszu) - bez kopiowania, np. widok na plik mapowany w pamięci.
+        """
+        self = cls.__new__(cls)
+        self.user_id = user_id
+        self._matrix = matrix
+        self.templates = matrix[:-1]
+        self.centroid = matrix[-1]
+        self.spread = None
+        self.threshold = threshold
+        return self
+
+    def __len__(self):
+        return len(self.templates)
+
+    def distances(self, encoding):
+        return np.linalg.norm(self._matrix - np.asarray(encoding, dtype=np.float32), axis=1)
+
+    def match(self, encoding):
+        """Zwraca (najmniejsza odległość, próg użytkownika)"""
+        return float(self.distances(encoding).min()), self.threshold
+
+    def nearest_template_distance(self, encoding):
+        return float(self.distances(encoding)[:-1].min())
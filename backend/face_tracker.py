@@ -0,0 +1,109 @@
+import numpy as np
+
+from lazy_imports import lazy_import
+
+cv2 = lazy_import('cv2')
+
+SIGNATURE_SIZE = 16
+
+
+def _iou(a, b):
+    """Część wspólna / suma dwóch ramek (top, right, bottom, left)"""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FaceTracker:
+    """
+    Śledzenie twarzy między kolejnymi klatkami jednej kamery.
+
+    Zamiast pełnej detekcji na całej klatce szukamy twarzy tylko w obszarze
+    ostatniej ramki powiększonej o margines. Pełna detekcja uruchamiana
+    jest dopiero po zgubieniu śladu. Jeśli wycinek twarzy praktycznie się
+    nie zmienił (ta sama pozycja i niemal identyczna miniatura), zwracany
+    jest poprzedni wektor bez uruchamiania enkodera.
+
+    Obiekt jest mały i serializowalny, więc może podróżować do procesu
+    workera i z powrotem razem z klatką.
+    """
+
+    def __init__(self, margin=0.5, reuse_iou=0.9, reuse_diff=3.0):
+        self.margin = margin
+        self.reuse_iou = reuse_iou
+        self.reuse_diff = reuse_diff
+        self.box = None
+        self._signature = None
+        self._encoding_box = None
+        self._encoding = None
+        self.roi_hits = 0
+        self.full_detections = 0
+        self.encoding_reuses = 0
+
+    def reset(self):
+        self.box = None
+        self.reset_encoding()
+
+    def reset_encoding(self):
+        self._signature = None
+        self._encoding_box = None
+        self._encoding = None
+
+    def _roi(self, shape):
+        top, right, bottom, left = self.box
+        height, width = shape[:2]
+        dy = int((bottom - top) * self.margin)
+        dx = int((right - left) * self.margin)
+        return max(0, top - dy), min(width, right + dx), min(height, bottom + dy), max(0, left - dx)
+
+    def locate(self, img, detect_fn):
+        """Zwraca ramki twarzy (top, right, bottom, left); najpierw szuka w obszarze śladu"""
+        if self.box is not None:
+            r_top, r_right, r_bottom, r_left = self._roi(img.shape)
+            locations = detect_fn(img[r_top:r_bottom, r_left:r_right])
+            if locations:
+                self.roi_hits += 1
+                locations = [(t + r_top, r + r_left, b + r_top, l + r_left) for t, r, b, l in locations]
+                self.box = locations[0]
+                return locations
+
+        self.full_detections += 1
+        locations = detect_fn(img)
+        self.box = locations[0] if locations else None
+        if self.box is None:
+            self.reset_encoding()
+        return locations
+
+    def _make_signature(self, img, location):
+        top, right, bottom, left = location
+        crop = img[top:bottom, left:right]
+        if crop.size == 0:
+            return None
+        gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
+        return cv2.resize(gray, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def cached_encoding(self, img, location):
+        """Poprzedni wektor, jeśli wycinek twarzy się nie zmienił; inaczej None"""
+        if self._encoding is None or _iou(location, self._encoding_box) < self.reuse_iou:
+            return None
+        signature = self._make_signature(img, location)
+        if signature is None or float(np.mean(np.abs(signature - self._signature))) > self.reuse_diff:
+            return None
+        self.encoding_reuses += 1
+        return self._encoding
+
+    def store_encoding(self, img, location, encoding):
+        self._signature = self._make_signature(img, location)
+        self._encoding_box = location
+        self._encoding = encoding if self._signature is not None else None
+
+    def stats(self):
+        return {
+            "roi_hits": self.roi_hits,
+            "full_detections": self.full_detections,
+            "encoding_reuses": self.encoding_reuses,
+        }
@@ -0,0 +1,272 @@
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from face_tracker import FaceTracker
+
+# Ciągły strumień klatek w treści jednego żądania: [długość uint32 big-endian][JPEG]...
+FRAME_HEADER = struct.Struct('>I')
+
+
+def _read_exact(stream, size):
+    chunks = []
+    while size:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def read_frames(stream, max_frame_bytes):
+    """Kolejne klatki ze strumienia (np. request.stream); ValueError przy urwanej lub za dużej klatce"""
+    while True:
+        header = _read_exact(stream, FRAME_HEADER.size)
+        if not header:
+            return
+        if len(header) < FRAME_HEADER.size:
+            raise ValueError("urwany nagłówek klatki")
+        (size,) = FRAME_HEADER.unpack(header)
+        if not 0 < size <= max_frame_bytes:
+            raise ValueError(f"klatka ma {size} B (limit {max_frame_bytes} B)")
+        data = _read_exact(stream, size)
+        if len(data) < size:
+            raise ValueError("urwana klatka")
+        yield data
+
+
+class StreamSession:
+    """Sesja strumienia klatek jednej kamery, powiązana z zeskanowanym kodem QR"""
+
+    def __init__(self, qr_code, gate_id, user_name, known_encoding, ttl, tracker=None):
+        self.id = uuid.uuid4().hex
+        self.tracker = tracker
+        self.qr_code = qr_code
+        self.gate_id = gate_id
+        self.user_name = user_name
+        self.known_encoding = known_encoding
+        self.expires_at = time.monotonic() + ttl
+        self.decision = None
+        self.best_score = 0
+        self.last_face_frame = None
+        self.last_face_rect = None
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_verified = 0
+        self._pending = None
+        self._verifying = False
+        self.closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def expired(self):
+        return time.monotonic() > self.expires_at
+
+    def to_dict(self):
+        result = {
+            "stream_id": self.id,
+            "status": self.decision["status"] if self.decision else "pending",
+            "user": self.user_name,
+            "score": self.best_score,
+            "frames_received": self.frames_received,
+            "frames_dropped": self.frames_dropped,
+            "frames_verified": self.frames_verified,
+            "face_rect": self.last_face_rect,
+        }
+        if self.decision:
+            result.update(self.decision)
+        return result
+
+
+class FrameStreamManager:
+    """
+    Ciągła weryfikacja strumienia klatek z kamer bramek.
+
+    Klatki nie są kolejkowane: nowa klatka zastępuje poprzednią, jeszcze
+    nieprzetworzoną (liczona jako porzucona), więc weryfikowana jest zawsze
+    najnowsza. Weryfikację wykonuje wątek żądania, które dostarczyło klatkę
+    przy wolnym weryfikatorze - pozostałe żądania tylko podmieniają klatkę
+    i wracają od razu. Pierwsza zgodna klatka kończy sesję decyzją "success".
+    Na bramkę przypada jedna aktywna sesja, a sesji jest najwyżej
+    max_sessions (gate_id podaje klient) - po przekroczeniu najstarsza
+    jest zamykana i zwracana przez purge_expired() jak wygasła.
+
+    Sesja ma własny FaceTracker, więc kolejne klatki nie wymagają pełnej
+    detekcji; nowa sesja na tej samej bramce przejmuje tracker poprzedniej.
+    Tracker znika razem z sesją. verify_fn(known_encoding, frame, tracker)
+    zwraca (match, score, face_rect, tracker) - tracker wraca z wywołania,
+    bo w puli procesów jest modyfikowany w innym procesie.
+    """
+
+    def __init__(self, verify_fn, session_ttl=15, max_sessions=1000):
+        self.verify_fn = verify_fn
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._by_gate = {}
+        self._evicted = []
+        self._tracker_totals = {}
+        self._lock = threading.Lock()
+
+    def open(self, qr_code, gate_id, user_name, known_encoding):
+        """Otwiera sesję; zwraca (nowa sesja, zastąpiona sesja albo None)"""
+        with self._lock:
+            replaced = self._sessions.pop(self._by_gate.pop(gate_id, None), None)
+        tracker = replaced.tracker if replaced and replaced.tracker is not None else FaceTracker()
+        # Pozycja twarzy może zostać, ale wektor poprzedniej osoby - nie
+        tracker.reset_encoding()
+        session = StreamSession(qr_code, gate_id, user_name, known_encoding, self.session_ttl, tracker)
+        with self._lock:
+            self._sessions[session.id] = session
+            self._by_gate[gate_id] = session.id
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                self._by_gate.pop(evicted.gate_id, None)
+                self._evicted.append(evicted)
+        if replaced:
+            self._finish(replaced, keep_tracker=True)
+        return session, replaced
+
+    def get(self, stream_id):
+        with self._lock:
+            return self._sessions.get(stream_id)
+
+    def close(self, stream_id):
+        with self._lock:
+            session = self._sessions.pop(stream_id, None)
+            if session and self._by_gate.get(session.gate_id) == stream_id:
+                del self._by_gate[session.gate_id]
+        if session:
+            self._finish(session)
+        return session
+
+    def _finish(self, session, keep_tracker=False):
+        # Tracker zamkniętej sesji jest zwalniany (liczniki zostają w statystykach),
+        # chyba że przejmuje go nowa sesja na tej samej bramce
+        with session._cond:
+            session.closed = True
+            tracker = None if keep_tracker else session.tracker
+            session.tracker = None
+            session._cond.notify_all()
+        if tracker is not None:
+            with self._lock:
+                for key, value in tracker.stats().items():
+                    self._tracker_totals[key] = self._tracker_totals.get(key, 0) + value
+
+    def purge_expired(self):
+        """Usuwa przeterminowane (i wyparte limitem) sesje i zwraca je (np. do zalogowania odmowy)"""
+        with self._lock:
+            expired = [s.id for s in self._sessions.values() if s.expired]
+            evicted, self._evicted = self._evicted, []
+        for session in evicted:
+            self._finish(session)
+        return evicted + [s for s in (self.close(sid) for sid in expired) if s]
+
+    def push_frame(self, session, image):
+        """
+        Dostarcza klatkę do sesji. Zwraca True tylko w wątku, który ustalił
+        decyzję "success" (np. do jednokrotnego zalogowania wejścia).
+        Jeśli inny wątek już weryfikuje, klatka czeka w slocie i funkcja
+        wraca od razu.
+        """
+        with session._cond:
+            session.frames_received += 1
+            if session.decision or session.closed:
+                return False
+            if session._pending is not None:
+                session.frames_dropped += 1
+            session._pending = image
+            if session._verifying:
+                return False
+            session._verifying = True
+
+        while True:
+            with session._cond:
+                image, session._pending = session._pending, None
+                if image is None or session.decision or session.expired or session.closed:
+                    # Zwolnienie weryfikatora pod tym samym zamkiem, pod którym
+                    # sprawdzono slot - żadna klatka nie zostanie bez obsługi
+                    session._verifying = False
+                    return False
+
+            try:
+                match, score, face_rect, tracker = self.verify_fn(session.known_encoding, image, session.tracker)
+            except Exception:
+                with session._cond:
+                    session._verifying = False
+                raise
+
+            with session._cond:
+                if not session.closed:
+                    session.tracker = tracker
+                session.frames_verified += 1
+                session.best_score = max(session.best_score, int(score or 0))
+                if face_rect:
+                    session.last_face_frame = image
+                    session.last_face_rect = face_rect
+                if match:
+                    session.decision = {"status": "success", "score": int(score), "face_rect": face_rect}
+                    session._pending = None
+                    session._verifying = False
+                    session._cond.notify_all()
+                    return True
+                session._cond.notify_all()
+
+    def push_stream(self, session, frames):
+        """
+        Klatki z jednego długiego połączenia (iterowalne, czytane na bieżąco).
+        Czytanie nie czeka na weryfikację: weryfikator działa w osobnym wątku,
+        a klatki nadesłane w tym czasie tylko podmieniają slot - jak przy
+        push_frame z wielu żądań. Kończy się po decyzji, zamknięciu lub
+        wygaśnięciu sesji albo razem ze strumieniem; zwraca True, jeśli
+        decyzję "success" ustaliło to wywołanie.
+        """
+        result = {}
+        verifier = None
+
+        def verify(image):
+            try:
+                if self.push_frame(session, image):
+                    result["success"] = True
+            except Exception as e:
+                result["error"] = e
+
+        try:
+            for image in frames:
+                if verifier is None or not verifier.is_alive():
+                    verifier = threading.Thread(target=verify, args=(image,), name='stream-verify', daemon=True)
+                    verifier.start()
+                elif self.push_frame(session, image):
+                    # Weryfikator skończył w międzyczasie - klatkę sprawdził ten wątek
+                    result["success"] = True
+                if session.decision or session.closed or session.expired or "error" in result:
+                    break
+        finally:
+            if verifier is not None:
+                verifier.join(max(0.0, session.expires_at - time.monotonic()))
+        if "error" in result:
+            raise result["error"]
+        return result.get("success", False)
+
+    def wait(self, session, timeout):
+        """Czeka na decyzję (long-poll) najwyżej timeout sekund"""
+        deadline = time.monotonic() + timeout
+        with session._cond:
+            while session.decision is None and not session.expired:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                session._cond.wait(remaining)
+        return session
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._tracker_totals, active_streams=len(self._sessions))
+            trackers = [s.tracker for s in self._sessions.values() if s.tracker is not None]
+        for tracker in trackers:
+            for key, value in tracker.stats().items():
+                result[key] = result.get(key, 0) + value
+        return result
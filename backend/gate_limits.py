@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """
+    Limit żądań na bramkę (token bucket).
+
+    Każda bramka ma kubełek o pojemności burst, uzupełniany w tempie rate
+    żetonów na sekundę - krótka seria skanów przechodzi, ciągłe ponawianie
+    nie. Kubełki nieużywane najdłużej są usuwane po przekroczeniu
+    max_gates (usunięty kubełek wraca jako pełny). rate=0 wyłącza limit.
+    """
+
+    def __init__(self, rate, burst, max_gates=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_gates = max_gates
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def allow(self, gate_id):
+        """Zwraca (czy przepuścić, sekundy do następnego żetonu)"""
+        if not self.rate:
+            return True, 0
+        now = self.clock()
+        with self._lock:
+            tokens, last = self._buckets.pop(gate_id, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+                self.allowed += 1
+            else:
+                self.limited += 1
+            self._buckets[gate_id] = (tokens, now)
+            while len(self._buckets) > self.max_gates:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / self.rate
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "gates": len(self._buckets),
+                "allowed": self.allowed,
+                "limited": self.limited,
+            }
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DecisionCoalescer:
+    """
+    Jedna decyzja dla powtórzonych skanów tego samego kodu QR na bramce.
+
+    Żądania z tym samym kluczem, które przyjdą w trakcie rozpoznawania,
+    czekają na wynik pierwszego (bez własnej pracy dlib, logu i snapshotu).
+    Gotowa decyzja jest dodatkowo pamiętana przez ttl sekund, więc skan
+    powtórzony chwilę po odpowiedzi też jej nie liczy od nowa. Do cache
+    trafiają tylko wyniki, dla których cacheable(wynik) jest prawdą.
+    ttl=0 - samo łączenie żądań w toku.
+    """
+
+    def __init__(self, ttl=2.0, max_entries=10000, wait_timeout=30, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self.clock = clock
+        self._decisions = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.coalesced = 0
+        self.cached = 0
+
+    def run(self, key, fn, cacheable=lambda result: True):
+        """Zwraca (wynik, źródło): "computed", "coalesced" albo "cached" """
+        with self._lock:
+            entry = self._decisions.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self.cached += 1
+                    return entry[1], "cached"
+                del self._decisions[key]
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                with self._lock:
+                    self.coalesced += 1
+                return call.result, "coalesced"
+            # Pierwsze żądanie utknęło - liczymy samodzielnie
+            return fn(), "computed"
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if call.error is None:
+                    self.computed += 1
+                    # Wpis do cache przed zwolnieniem oczekujących - bez okna na ponowne liczenie
+                    if self.ttl and cacheable(call.result):
+                        now = self.clock()
+                        self._decisions[key] = (now + self.ttl, call.result)
+                        # Stały ttl - najstarsze wpisy wygasają pierwsze
+                        while self._decisions and (len(self._decisions) > self.max_entries
+                                                   or next(iter(self._decisions.values()))[0] <= now):
+                            self._decisions.popitem(last=False)
+            call.done.set()
+        return call.result, "computed"
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "in_flight": len(self._in_flight),
+                "cached_decisions": len(self._decisions),
+                "computed": self.computed,
+                "coalesced": self.coalesced,
+                "cached": self.cached,
+            }
@@ -0,0 +1,50 @@
+import numpy as np
+
+from lazy_imports import lazy_import
+from metrics import timed
+
+cv2 = lazy_import('cv2')
+
+
+def decode_image(data):
+    """Dekoduje bajty JPEG/PNG do tablicy RGB (uint8, HxWx3)"""
+    with timed('decode'):
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        img = cv2.imdecode(buffer, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+        if img is None:
+            raise ValueError("Nie można zdekodować obrazu")
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+class UploadedImage:
+    """
+    Zdjęcie z żądania HTTP wczytane raz do pamięci.
+
+    Bajty są czytane z uploadu tylko raz, a obraz dekodowany najwyżej raz
+    (przy pierwszym dostępie do .array). Ta sama tablica trafia do detekcji
+    i kodowania, a zapis snapshotu używa oryginalnych bajtów - bez
+    ponownego seek(0)/read() i bez ponownego kodowania JPEG.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._array = None
+
+    @classmethod
+    def from_upload(cls, file_storage):
+        file_storage.seek(0)
+        return cls(file_storage.read())
+
+    @property
+    def array(self):
+        if self._array is None:
+            self._array = decode_image(self.data)
+        return self._array
+
+    def __getstate__(self):
+        # Do procesu workera wysyłamy tylko bajty (dekodowanie po tamtej stronie)
+        return {"data": self.data, "_array": None}
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.data)
@@ -0,0 +1,114 @@
+import queue
+import threading
+
+from lazy_imports import lazy_import
+from metrics import timed
+
+cv2 = lazy_import('cv2')
+
+
+def crop_face(img, face_rect, margin=0.25):
+    """Wycinek obrazu z twarzą (x, y, w, h) powiększony o margines"""
+    height, width = img.shape[:2]
+    dx, dy = int(face_rect['w'] * margin), int(face_rect['h'] * margin)
+    x0, y0 = max(0, face_rect['x'] - dx), max(0, face_rect['y'] - dy)
+    x1 = min(width, face_rect['x'] + face_rect['w'] + dx)
+    y1 = min(height, face_rect['y'] + face_rect['h'] + dy)
+    return img[y0:y1, x0:x1]
+
+
+@timed('snapshot_save')
+def write_snapshot(image, path, jpeg_quality=0, face_rect=None, margin=0.25):
+    """
+    Zapisuje snapshot incydentu.
+
+    Domyślnie zapisuje oryginalne bajty JPEG bez ponownego kodowania.
+    jpeg_quality > 0 koduje obraz ponownie z niższą jakością, a face_rect
+    zawęża zapis do wycinka z twarzą (z marginesem).
+    """
+    if not jpeg_quality and not face_rect:
+        image.save(path)
+        return
+
+    img = image.array
+    if face_rect:
+        img = crop_face(img, face_rect, margin)
+
+    ok, encoded = cv2.imencode(
+        '.jpg', cv2.cvtColor(img, cv2.COLOR_RGB2BGR),
+        [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality or 90]
+    )
+    if not ok:
+        raise ValueError("Nie można zakodować snapshotu")
+    with open(path, 'wb') as f:
+        f.write(encoded.tobytes())
+
+
+class BackgroundWriter:
+    """
+    Kolejka zapisów na dysk (snapshoty incydentów) obsługiwana
+    przez wątek w tle - odpowiedź do bramki wychodzi przed zapisem pliku.
+
+    Przy pełnej kolejce zadanie wykonuje się synchronicznie (nic nie ginie),
+    a flush()/shutdown() czekają na zapisanie wszystkiego, co zlecono.
+    """
+
+    def __init__(self, max_queue=1000):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.written = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name='io-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self, fn, args, kwargs):
+        try:
+            fn(*args, **kwargs)
+            with self._lock:
+                self.written += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print(f"Błąd zapisu w tle: {e}")
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                self._run(*task)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, fn, *args, **kwargs):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((fn, args, kwargs))
+        except queue.Full:
+            self._run(fn, args, kwargs)
+
+    def flush(self):
+        """Czeka, aż wszystkie zlecone zapisy trafią na dysk"""
+        self._queue.join()
+
+    def shutdown(self):
+        with self._lock:
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "written": self.written,
+                "failed": self.failed,
+            }
@@ -0,0 +1,52 @@
+import importlib
+import threading
+import time
+
+# Czas importu modułów ładowanych leniwie (profil startu)
+_load_times = {}
+
+
+class LazyModule:
+    """
+    Moduł importowany przy pierwszym dostępie do atrybutu.
+
+    Ciężkie biblioteki (face_recognition ładuje modele dlib, cv2) nie
+    spowalniają importu aplikacji ani testów - koszt ponosi pierwsze
+    rozpoznanie albo jawna rozgrzewka (ai_engine.warm_up).
+    """
+
+    def __init__(self, name):
+        self.__dict__.update(_name=name, _module=None, _lock=threading.Lock())
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    self.__dict__['_module'] = importlib.import_module(self._name)
+                    # Kilka pośredników tego samego modułu - liczy się pierwszy import
+                    _load_times.setdefault(self._name, time.perf_counter() - start)
+                module = self._module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'załadowany' if self._module is not None else 'niezaładowany'
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def load(module):
+    """Wymusza import leniwego modułu (rozgrzewka); zwraca prawdziwy moduł"""
+    return module._load() if isinstance(module, LazyModule) else module
+
+
+def load_times():
+    """{nazwa modułu: sekundy importu} dla już załadowanych modułów"""
+    return dict(_load_times)
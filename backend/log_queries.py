@@ -0,0 +1,155 @@
+import base64
+import csv
+import datetime
+import io
+import json
+
+from sqlalchemy import and_, or_, func, extract
+
+from models import AccessLog
+from snapshot_store import thumbnail_path
+
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = ["id", "time", "user", "status", "snapshot"]
+
+
+def log_to_dict(log):
+    thumbnail = thumbnail_path(log.snapshot_path)
+    return {
+        "id": log.id,
+        "time": str(log.timestamp),
+        "user": log.user_name,
+        "status": log.status,
+        "snapshot": f"/static/incidents/{log.snapshot_path}" if log.snapshot_path else None,
+        "thumbnail": f"/static/incidents/{thumbnail}" if thumbnail else None
+    }
+
+
+def _parse_time(value, name):
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Niepoprawna data w parametrze {name}: {value}")
+
+
+def parse_filters(args):
+    """Filtry z parametrów zapytania: user, status (lista po przecinku), since, until"""
+    filters = {}
+    if args.get('user'):
+        filters['user'] = args['user']
+    if args.get('status'):
+        filters['status'] = [s.strip() for s in args['status'].split(',') if s.strip()]
+    if args.get('since'):
+        filters['since'] = _parse_time(args['since'], 'since')
+    if args.get('until'):
+        filters['until'] = _parse_time(args['until'], 'until')
+    return filters
+
+
+def apply_filters(query, filters):
+    if 'user' in filters:
+        query = query.filter(AccessLog.user_name == filters['user'])
+    if 'status' in filters:
+        query = query.filter(AccessLog.status.in_(filters['status']))
+    if 'since' in filters:
+        query = query.filter(AccessLog.timestamp >= filters['since'])
+    if 'until' in filters:
+        query = query.filter(AccessLog.timestamp < filters['until'])
+    return query
+
+
+def encode_cursor(log):
+    raw = f"{log.timestamp.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return datetime.datetime.fromisoformat(timestamp), int(log_id)
+    except Exception:
+        raise ValueError("Niepoprawny kursor")
+
+
+def _after_cursor(query, timestamp, log_id):
+    # Sortowanie malejące po (timestamp, id) - następna strona to wiersze "starsze" od kursora
+    return query.filter(or_(
+        AccessLog.timestamp < timestamp,
+        and_(AccessLog.timestamp == timestamp, AccessLog.id < log_id)
+    ))
+
+
+def fetch_page(session, filters, limit=50, cursor=None):
+    """
+    Strona logów (najnowsze pierwsze) z paginacją kluczową (keyset).
+    Zwraca (lista logów, kursor następnej strony albo None).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = apply_filters(session.query(AccessLog), filters)
+    if cursor:
+        query = _after_cursor(query, *decode_cursor(cursor))
+
+    logs = query.order_by(AccessLog.timestamp.desc(), AccessLog.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(logs[limit - 1]) if len(logs) > limit else None
+    return logs[:limit], next_cursor
+
+
+def hourly_counts(session, filters):
+    """Liczba wpisów na godzinę dla każdego statusu"""
+    # extract() kompiluje się na każdym dialekcie (SQLite, PostgreSQL, MySQL), strftime tylko w SQLite
+    parts = [extract(field, AccessLog.timestamp).label(field) for field in ('year', 'month', 'day', 'hour')]
+    query = apply_filters(session.query(*parts, AccessLog.status, func.count(AccessLog.id)), filters)
+    rows = query.group_by(*parts, AccessLog.status).order_by(*parts).all()
+
+    result = {}
+    for year, month, day, hour, status, count in rows:
+        hour_value = f"{int(year):04d}-{int(month):02d}-{int(day):02d} {int(hour):02d}:00"
+        result.setdefault(hour_value, {})[status] = count
+    return [{"hour": h, "counts": counts, "total": sum(counts.values())} for h, counts in result.items()]
+
+
+def iter_logs(Session, filters, batch_size=EXPORT_BATCH_SIZE):
+    """Wszystkie pasujące logi partiami (stała pamięć niezależnie od liczby wierszy)"""
+    cursor = None
+    while True:
+        session = Session()
+        try:
+            query = apply_filters(session.query(AccessLog), filters)
+            if cursor:
+                query = _after_cursor(query, *cursor)
+            batch = query.order_by(AccessLog.timestamp.desc(), AccessLog.id.desc()).limit(batch_size).all()
+            rows = [log_to_dict(log) for log in batch]
+            if batch:
+                cursor = (batch[-1].timestamp, batch[-1].id)
+        finally:
+            session.close()
+
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            return
+
+
+def export_lines(Session, filters, fmt='csv'):
+    """Generator kolejnych linii eksportu w formacie CSV albo NDJSON"""
+    if fmt == 'ndjson':
+        chunk = []
+        for row in iter_logs(Session, filters):
+            chunk.append(json.dumps(row, ensure_ascii=False) + "\n")
+            if len(chunk) >= EXPORT_BATCH_SIZE:
+                yield "".join(chunk)
+                chunk = []
+        yield "".join(chunk)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for row in iter_logs(Session, filters):
+        writer.writerow(row)
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
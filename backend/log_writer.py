@@ -0,0 +1,179 @@
+import datetime
+import json
+import os
+import threading
+
+from sqlalchemy import insert
+
+from models import AccessLog
+from metrics import timed, count_decision
+
+
+class AccessLogWriter:
+    """
+    Zapis logów wejść w tle (write-behind).
+
+    Wpisy trafiają do bufora w pamięci, a wątek w tle zapisuje je partiami
+    w jednej transakcji - gdy bufor osiągnie batch_size albo minie
+    flush_interval sekund. Czas wpisu jest ustalany w chwili zdarzenia,
+    nie zapisu. Gdy baza jest zablokowana, partia trafia do pliku
+    awaryjnego (JSON lines), który jest wczytywany przy kolejnym udanym
+    zapisie. shutdown() zapisuje wszystko, co zostało w buforze.
+    """
+
+    def __init__(self, Session, batch_size=100, flush_interval=0.5, spill_path=None):
+        self.Session = Session
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.batches = 0
+        self.spilled = 0
+        self.corrupt = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._worker, name='access-log-writer', daemon=True)
+                self._thread.start()
+
+    def log(self, user_name, status, snapshot_path=None, timestamp=None):
+        """Dodaje wpis do bufora (bez dostępu do bazy w wątku żądania)"""
+        entry = {
+            "user_name": user_name,
+            "status": status,
+            "snapshot_path": snapshot_path,
+            "timestamp": timestamp or datetime.datetime.now(),
+        }
+        count_decision(status)
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.batch_size
+        # Wątek uruchamiany ponownie także wtedy, gdy zakończył się błędem
+        if (self._thread is None or not self._thread.is_alive()) and not self._stopped.is_set():
+            self.start()
+        if full:
+            self._wakeup.set()
+
+    def _worker(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Błąd wątku zapisu logów: {e}")
+
+    def _take_batch(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        return batch
+
+    def _read_spill(self):
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return []
+        entries, good, corrupt = [], [], []
+        with open(self.spill_path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    entry["timestamp"] = datetime.datetime.fromisoformat(entry["timestamp"])
+                except (ValueError, KeyError, TypeError):
+                    # Np. urwana linia po awarii w trakcie dopisywania
+                    corrupt.append(line if line.endswith("\n") else line + "\n")
+                    continue
+                entries.append(entry)
+                good.append(line if line.endswith("\n") else line + "\n")
+        if corrupt:
+            # Uszkodzone linie trafiają do osobnego pliku, w pliku awaryjnym zostają poprawne
+            with open(self.spill_path + '.corrupt', 'a', encoding='utf-8') as f:
+                f.writelines(corrupt)
+            tmp_path = self.spill_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(good)
+            os.replace(tmp_path, self.spill_path)
+            self.corrupt += len(corrupt)
+            print(f"Pominięto {len(corrupt)} uszkodzonych linii pliku awaryjnego logów")
+        return entries
+
+    def _requeue(self, batch):
+        with self._lock:
+            self._buffer[:0] = batch
+
+    def _spill(self, batch):
+        if not self.spill_path:
+            # Bez pliku awaryjnego wpisy wracają do bufora na następną próbę
+            self._requeue(batch)
+            return
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            for entry in batch:
+                f.write(json.dumps(dict(entry, timestamp=entry["timestamp"].isoformat()), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.spilled += len(batch)
+
+    def flush(self):
+        """Zapisuje bufor (oraz zaległy plik awaryjny) w jednej transakcji"""
+        with self._flush_lock:
+            # Plik awaryjny czytany przed pobraniem bufora - błąd odczytu nie gubi wpisów
+            try:
+                spilled = self._read_spill()
+            except OSError as e:
+                print(f"Błąd odczytu pliku awaryjnego logów: {e}")
+                spilled = None
+            batch = self._take_batch()
+            if not batch and not spilled:
+                return 0
+
+            session = self.Session()
+            try:
+                with timed('log_write'):
+                    session.execute(insert(AccessLog), (spilled or []) + batch)
+                    session.commit()
+            except Exception as e:
+                session.rollback()
+                print(f"Błąd zapisu logów, zapis do pliku awaryjnego: {e}")
+                try:
+                    self._spill(batch)
+                except OSError as spill_error:
+                    # Pełny dysk, brak uprawnień - wpisy wracają do bufora
+                    print(f"Błąd zapisu pliku awaryjnego logów: {spill_error}")
+                    self._requeue(batch)
+                return 0
+            finally:
+                session.close()
+
+            if spilled:
+                os.remove(self.spill_path)
+            count = len(spilled or []) + len(batch)
+            self.written += count
+            self.batches += 1
+            return count
+
+    def shutdown(self):
+        self._stopped.set()
+        self._wakeup.set()
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "buffered": len(self._buffer),
+                "written": self.written,
+                "batches": self.batches,
+                "spilled": self.spilled,
+                "corrupt_spill_lines": self.corrupt,
+            }
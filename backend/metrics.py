@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from functools import wraps
+
+# Zbieranie metryk (0 = timery są pustymi operacjami, dekoratory zwracają oryginalną funkcję)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+
+# Granice przedziałów histogramów czasu (sekundy)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _labels(name, value, extra=None):
+    parts = [f'{name}="{value}"'] if name else []
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Histogram w formacie Prometheusa, opcjonalnie z jedną etykietą"""
+
+    def __init__(self, name, help_text, label=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        for label_value, (counts, total, count) in sorted(series.items(), key=lambda s: str(s[0])):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label, label_value, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label, label_value, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label, label_value)} {_format(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label, label_value)} {count}")
+        return lines
+
+
+class Counter:
+    """Licznik narastający, opcjonalnie z jedną etykietą"""
+
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value=None, amount=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_value, value in sorted(values.items(), key=lambda v: str(v[0])):
+            lines.append(f"{self.name}{_labels(self.label, label_value)} {_format(value)}")
+        return lines
+
+
+class Gauge:
+    """Wartość chwilowa odczytywana z funkcji w momencie eksportu"""
+
+    def __init__(self, name, help_text, fn):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_format(self.fn())}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name, help_text, fn):
+        return self.register(Gauge(name, help_text, fn))
+
+    def render(self):
+        """Wszystkie metryki w formacie tekstowym Prometheusa"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'faceid_stage_seconds', 'Czas etapów weryfikacji wejścia', label='stage'
+))
+ACCESS_DECISIONS = REGISTRY.register(Counter(
+    'faceid_access_decisions_total', 'Liczba wpisów AccessLog według statusu', label='status'
+))
+
+# W procesie workera puli pomiary są buforowane i odsyłane razem z wynikiem
+_buffer = None
+
+
+def buffer_observations():
+    """Włącza buforowanie pomiarów (proces workera puli rozpoznawania)"""
+    global _buffer
+    _buffer = []
+
+
+def drain_observations():
+    """Zwraca i czyści zbuforowane pomiary [(etap, sekundy), ...]"""
+    global _buffer
+    observations, _buffer = _buffer, []
+    return observations or []
+
+
+def record_stage(stage, seconds):
+    if _buffer is not None:
+        _buffer.append((stage, seconds))
+    else:
+        STAGE_SECONDS.observe(seconds, stage)
+
+
+def replay_observations(observations):
+    """Dopisuje do histogramów pomiary odesłane z workera"""
+    for stage, seconds in observations:
+        STAGE_SECONDS.observe(seconds, stage)
+
+
+class _StageTimer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+    def __call__(self, fn):
+        stage = self.stage
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - start)
+        return wrapper
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __call__(self, fn):
+        return fn
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timed(stage):
+    """
+    Pomiar czasu etapu - jako menedżer kontekstu albo dekorator:
+        with timed('detect'): ...
+        @timed('verify_entry')
+    Przy METRICS_ENABLED=0 zwraca pusty obiekt (dekorator nie opakowuje funkcji).
+    """
+    if not METRICS_ENABLED:
+        return _NOOP_TIMER
+    return _StageTimer(stage)
+
+
+def count_decision(status):
+    if METRICS_ENABLED:
+        ACCESS_DECISIONS.inc(status)
@@ -0,0 +1,106 @@
+"""
+Migracja wektorów twarzy z pickle do formatu binarnego (ai_engine.dump_encoding).
+
+Aplikacja domyślnie nie czyta już rekordów pickle (ALLOW_LEGACY_PICKLE=0) -
+przy starym formacie w bazie nie wystartuje, dopóki nie uruchomi się migracji.
+
+Uruchomienie (z folderu backend):
+    python migrate_encodings.py                     # baza aplikacji, float32
+    python migrate_encodings.py --dtype float16     # mniejszy rozmiar
+    python migrate_encodings.py --db sciezka/do/faceid_system.db --dry-run
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from models import User
+from ai_engine import dump_encoding, is_legacy_encoding, load_encoding, ENCODING_DTYPE_CODES, ENCODING_MAGIC
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def count_legacy(session):
+    """Liczba użytkowników z wektorem w starym formacie (porównanie nagłówka w SQL)"""
+    return session.query(func.count(User.id)).filter(
+        func.substr(User.face_encoding, 1, len(ENCODING_MAGIC)) != ENCODING_MAGIC
+    ).scalar()
+
+
+def migrate(db_url, dtype='float32', batch_size=500, dry_run=False, vacuum=True):
+    engine = create_engine(db_url)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+
+    converted = skipped = failed = 0
+    bytes_before = bytes_after = 0
+    batch = []
+    try:
+        for user_id, blob in session.query(User.id, User.face_encoding).all():
+            if not is_legacy_encoding(blob):
+                skipped += 1
+                continue
+            try:
+                new_blob = dump_encoding(load_encoding(blob, allow_pickle=True), dtype=dtype)
+            except Exception as e:
+                print(f"Użytkownik {user_id}: błąd konwersji ({e})")
+                failed += 1
+                continue
+
+            bytes_before += len(blob)
+            bytes_after += len(new_blob)
+            converted += 1
+            batch.append({"id": user_id, "face_encoding": new_blob})
+            if len(batch) >= batch_size and not dry_run:
+                session.bulk_update_mappings(User, batch)
+                batch = []
+
+        if dry_run:
+            session.rollback()
+        else:
+            if batch:
+                session.bulk_update_mappings(User, batch)
+            session.commit()
+    finally:
+        session.close()
+
+    if vacuum and not dry_run and converted and db_url.startswith('sqlite'):
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level='AUTOCOMMIT').execute(text('VACUUM'))
+
+    return {
+        "converted": converted,
+        "skipped": skipped,
+        "failed": failed,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=os.path.join(BACKEND_DIR, 'faceid_system.db'))
+    parser.add_argument('--dtype', choices=sorted(ENCODING_DTYPE_CODES), default='float32')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--no-vacuum', action='store_true')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f"Brak bazy: {args.db}")
+
+    result = migrate(
+        f"sqlite:///{args.db}",
+        dtype=args.dtype,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        vacuum=not args.no_vacuum
+    )
+    print(f"Przekonwertowano: {result['converted']}, pominięto: {result['skipped']}, błędy: {result['failed']}")
+    print(f"Rozmiar wektorów: {result['bytes_before']} B -> {result['bytes_after']} B")
+
+
+if __name__ == '__main__':
+    main()
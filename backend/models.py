@@ -1,5 +1,5 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, LargeBinary
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, LargeBinary, Index, ForeignKey
+from sqlalchemy.orm import declarative_base, relationship
 import datetime
 
 Base = declarative_base()
@@ -11,17 +11,41 @@ class User(Base):
     name = Column(String, nullable=False)
     qr_code_data = Column(String, unique=True, nullable=False)
     
-    # Tutaj przechowujemy wektor twarzy (dane binarne z pickle)
+    # Tutaj przechowujemy wektor twarzy (format binarny z ai_engine.dump_encoding)
     face_encoding = Column(LargeBinary, nullable=False) 
     
     photo_path = Column(String)
     is_active = Column(Boolean, default=True)
 
+    # Dodatkowe wzorce twarzy (face_encoding pozostaje wzorcem głównym)
+    templates = relationship('FaceTemplate', cascade='all, delete-orphan', order_by='FaceTemplate.id')
+
+class FaceTemplate(Base):
+    __tablename__ = 'face_templates'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    face_encoding = Column(LargeBinary, nullable=False)
+    source = Column(String, default='enroll') # "enroll" (zdjęcie od admina) albo "adaptive" (z udanego wejścia)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+class EdgeUpload(Base):
+    __tablename__ = 'edge_uploads'
+
+    # Partia logów z bramki offline - ponowne wysłanie tej samej partii jest pomijane
+    batch_id = Column(String, primary_key=True)
+    gate_id = Column(String)
+    entries = Column(Integer)
+    received_at = Column(DateTime, default=datetime.datetime.now)
+
 class AccessLog(Base):
     __tablename__ = 'access_logs'
 
     id = Column(Integer, primary_key=True)
     user_name = Column(String)
-    timestamp = Column(DateTime, default=datetime.datetime.now)
-    status = Column(String) # np. "SUCCESS", "DENIED_QR", "DENIED_FACE"
-    snapshot_path = Column(String) # Ścieżka do zdjęcia z incydentu
\ No newline at end of file
+    timestamp = Column(DateTime, default=datetime.datetime.now, index=True)
+    status = Column(String, index=True) # np. "SUCCESS", "DENIED_QR", "DENIED_FACE"
+    snapshot_path = Column(String) # Ścieżka do zdjęcia z incydentu
+
+    # Filtrowanie historii po pracowniku z sortowaniem po czasie
+    __table_args__ = (Index('ix_access_logs_user_time', 'user_name', 'timestamp'),)
\ No newline at end of file
@@ -0,0 +1,155 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+
+
+class PoolSaturated(Exception):
+    """Kolejka rozpoznawania jest pełna - żądanie należy odrzucić (503)"""
+
+
+def init_worker():
+    """
+    Inicjalizacja procesu workera: modele dlib ładowane raz na proces,
+    a przebieg próbny rozgrzewa detektor i koder przed pierwszym zadaniem.
+    Używana też przez pulę masowej rejestracji (bulk_enroll).
+    """
+    import ai_engine
+    ai_engine.warm_up()
+    metrics.buffer_observations()
+
+
+def _run_measured(fn, *args):
+    # Pomiary etapów z workera wracają razem z wynikiem do procesu aplikacji
+    metrics.drain_observations()
+    result = fn(*args)
+    return result, metrics.drain_observations()
+
+
+class RecognitionPool:
+    """
+    Pula procesów dla obliczeń dlib (detekcja + kodowanie twarzy).
+
+    Obliczenia CPU nie blokują wątków Flaska ani GIL-a, więc przepustowość
+    rośnie z liczbą rdzeni. Liczba zadań w toku jest ograniczona
+    (max_pending) - po jej przekroczeniu run() od razu rzuca PoolSaturated
+    zamiast ustawiać kolejne żądania w kolejce. Zadanie, które nie skończy
+    się w ciągu timeout sekund, też kończy się PoolSaturated (503 zamiast
+    500); jego miejsce zwalnia się dopiero, gdy worker je zakończy.
+    Gdy worker zginie (OOM killer, crash dlib), pula jest zepsuta - zostaje
+    wtedy porzucona, żądanie dostaje PoolSaturated, a kolejne tworzy nową.
+
+    workers=0 oznacza wykonanie w wątku żądania (bez puli procesów);
+    limit zadań działa wtedy tylko, jeśli max_pending podano jawnie.
+    """
+
+    def __init__(self, workers=0, max_pending=None, timeout=30, initializer=init_worker):
+        self.workers = workers
+        self.initializer = initializer
+        if not max_pending and workers > 0:
+            max_pending = workers * 4
+        self.max_pending = max_pending or None
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending else None
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.broken = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn - bezpieczne przy wielowątkowym serwerze (bez fork po wątkach)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=self.initializer
+                )
+            return self._executor
+
+    def _discard_broken(self, executor):
+        """Porzuca zepsutą pulę - następne żądanie uruchomi nowe workery"""
+        with self._lock:
+            self.broken += 1
+            if self._executor is executor:
+                self._executor = None
+        print("Pula rozpoznawania uszkodzona (worker zakończył się) - tworzenie nowej")
+        executor.shutdown(wait=False)
+
+    def start(self):
+        """Uruchamia workery od razu (modele ładowane przed ruchem na bramkach)"""
+        if self.workers > 0:
+            executor = self._get_executor()
+            for future in [executor.submit(self.initializer) for _ in range(self.workers)]:
+                future.result()
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def run(self, fn, *args):
+        """Wykonuje fn(*args) w puli i czeka na wynik"""
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated()
+
+        with self._lock:
+            self.pending += 1
+
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_measured, fn, *args)
+        except BrokenProcessPool:
+            self._release()
+            self._discard_broken(executor)
+            raise PoolSaturated()
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            result, observations = future.result(timeout=self.timeout)
+        except BrokenProcessPool:
+            self._discard_broken(executor)
+            raise PoolSaturated()
+        except FutureTimeoutError:
+            # Zadanie jeszcze w kolejce nie zajmie workera; trwające liczy się do końca
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise PoolSaturated()
+        metrics.replay_observations(observations)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "broken": self.broken,
+            }
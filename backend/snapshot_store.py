@@ -0,0 +1,195 @@
+import datetime
+import hashlib
+import os
+import shutil
+import threading
+
+from io_writer import write_snapshot, crop_face
+from lazy_imports import lazy_import
+
+cv2 = lazy_import('cv2')
+
+THUMB_SUFFIX = '.thumb.jpg'
+
+
+def thumbnail_path(snapshot_path):
+    """Ścieżka miniatury dla snapshotu (None dla starych plików bez katalogu dnia)"""
+    if not snapshot_path or '/' not in snapshot_path:
+        return None
+    return snapshot_path[:-len('.jpg')] + THUMB_SUFFIX
+
+
+class SnapshotStore:
+    """
+    Magazyn snapshotów incydentów.
+
+    Pliki trafiają do katalogów dziennych (RRRR/MM/DD), a nazwą jest skrót
+    SHA-1 bajtów klatki - identyczne klatki z tego samego dnia (np. powtórki
+    z zawieszonej kamery) są zapisywane raz. Obok zdjęcia zapisywana jest
+    miniatura dla listy logów, więc pełny obraz pobierany jest dopiero
+    w szczegółach logu.
+
+    Wątek w tle (sweep) usuwa dni starsze niż retention_days, a przy
+    przekroczeniu max_bytes - najstarsze dni (stare pliki bez katalogu dnia
+    jako pierwsze). on_removed(ścieżki) pozwala wyczyścić odwołania w bazie.
+    """
+
+    def __init__(self, root, retention_days=0, max_bytes=0, thumb_width=160, sweep_interval=3600, on_removed=None):
+        self.root = root
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+        self.thumb_width = thumb_width
+        self.sweep_interval = sweep_interval
+        self.on_removed = on_removed
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.deduplicated = 0
+        self.removed = 0
+        self.stored_bytes = None
+        self.last_sweep = None
+
+    def reserve(self, image, day=None):
+        """Ścieżka względna snapshotu - ustalana w wątku żądania (trafia do logu od razu)"""
+        digest = hashlib.sha1(image.data).hexdigest()[:20]
+        day = day or datetime.date.today()
+        return f"{day:%Y/%m/%d}/{digest}.jpg"
+
+    def write(self, image, snapshot_path, face_rect=None, jpeg_quality=0, crop=False):
+        """Zapisuje snapshot i miniaturę; zwraca False, jeśli taki plik już istnieje"""
+        path = os.path.join(self.root, snapshot_path)
+        if os.path.exists(path):
+            with self._lock:
+                self.deduplicated += 1
+            return False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        write_snapshot(image, tmp_path, jpeg_quality=jpeg_quality, face_rect=face_rect if crop else None)
+        os.replace(tmp_path, path)
+        self._write_thumbnail(image, os.path.join(self.root, thumbnail_path(snapshot_path)), face_rect)
+        with self._lock:
+            self.written += 1
+        return True
+
+    def _write_thumbnail(self, image, path, face_rect):
+        img = crop_face(image.array, face_rect) if face_rect else image.array
+        height, width = img.shape[:2]
+        if width > self.thumb_width:
+            img = cv2.resize(img, (self.thumb_width, max(1, int(height * self.thumb_width / width))),
+                             interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(img, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 70])
+        if ok:
+            with open(path, 'wb') as f:
+                f.write(encoded.tobytes())
+
+    def _units(self):
+        """Jednostki sprzątania od najstarszej: (data, rozmiar, ścieżki snapshotów, ścieżka do usunięcia)"""
+        units = []
+        if not os.path.isdir(self.root):
+            return units
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith('.jpg'):
+                # Stare snapshoty bez katalogu dnia
+                stat = entry.stat()
+                day = datetime.date.fromtimestamp(stat.st_mtime)
+                units.append((day, stat.st_size, [entry.name], entry.path))
+            elif entry.is_dir() and entry.name.isdigit():
+                for month in os.scandir(entry.path):
+                    if not (month.is_dir() and month.name.isdigit()):
+                        continue
+                    for day_dir in os.scandir(month.path):
+                        if not (day_dir.is_dir() and day_dir.name.isdigit()):
+                            continue
+                        try:
+                            day = datetime.date(int(entry.name), int(month.name), int(day_dir.name))
+                        except ValueError:
+                            continue
+                        size, snapshots = 0, []
+                        for f in os.scandir(day_dir.path):
+                            size += f.stat().st_size
+                            if f.name.endswith('.jpg') and not f.name.endswith(THUMB_SUFFIX):
+                                snapshots.append(f"{entry.name}/{month.name}/{day_dir.name}/{f.name}")
+                        units.append((day, size, snapshots, day_dir.path))
+        # Przy tej samej dacie stare pojedyncze pliki idą przed katalogami dni
+        units.sort(key=lambda u: (u[0], os.path.isdir(u[3])))
+        return units
+
+    def _remove(self, unit):
+        _, _, snapshots, path = unit
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            # Puste katalogi miesiąca i roku
+            for parent in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+                try:
+                    os.rmdir(parent)
+                except OSError:
+                    break
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return snapshots
+
+    def sweep(self, today=None):
+        """Usuwa snapshoty starsze niż retention_days i najstarsze ponad limit max_bytes"""
+        today = today or datetime.date.today()
+        units = self._units()
+        removed = []
+
+        if self.retention_days:
+            cutoff = today - datetime.timedelta(days=self.retention_days)
+            while units and units[0][0] < cutoff:
+                removed.extend(self._remove(units.pop(0)))
+
+        total = sum(u[1] for u in units)
+        if self.max_bytes:
+            # Dzisiejszy katalog zostaje zawsze (bieżące incydenty)
+            while total > self.max_bytes and len(units) > 1 and units[0][0] < today:
+                unit = units.pop(0)
+                total -= unit[1]
+                removed.extend(self._remove(unit))
+
+        with self._lock:
+            self.removed += len(removed)
+            self.stored_bytes = total
+            self.last_sweep = datetime.datetime.now().isoformat(timespec='seconds')
+        if removed and self.on_removed:
+            self.on_removed(removed)
+        return removed
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._worker, name='snapshot-sweeper', daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while not self._stopped.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Błąd sprzątania snapshotów: {e}")
+            self._stopped.wait(self.sweep_interval)
+
+    def shutdown(self):
+        self._stopped.set()
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "written": self.written,
+                "deduplicated": self.deduplicated,
+                "removed": self.removed,
+                "stored_bytes": self.stored_bytes,
+                "retention_days": self.retention_days,
+                "max_bytes": self.max_bytes,
+                "last_sweep": self.last_sweep,
+            }
@@ -90,6 +90,15 @@ class TestAPIIntegration(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 400)
 
+    def test_6_identify_requires_auth(self):
+        """Identification 1:N only for gates (X-Edge-Token) and admin"""
+        data = lambda: {'frame': (BytesIO(self._create_test_image()), 'frame.jpg')}
+        anonymous = app.test_client().post('/api/identify', data=data(), content_type='multipart/form-data')
+        self.assertEqual(anonymous.status_code, 403)
+        response = self.app.post('/api/identify', data=data(), content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["status"], "unknown")
+
     # ============== HELPERS ==============
 
     def _create_test_image(self):
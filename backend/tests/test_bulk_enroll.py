@@ -0,0 +1,79 @@
+import unittest
+import os
+import sys
+import tempfile
+import zipfile
+from io import BytesIO
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from bulk_enroll import read_names, load_photos, enroll
+from models import User, Base
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+class TestBulkEnroll(unittest.TestCase):
+    """Masowa rejestracja z ZIP + CSV"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp, 'test.db')}")
+        Base.metadata.create_all(self.engine)
+        self.TestSession = sessionmaker(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_1_csv_requires_columns(self):
+        """CSV bez wymaganych kolumn jest odrzucany"""
+        self.assertEqual(read_names(b"filename,name\na.jpg,Jan\n"), [("a.jpg", "Jan")])
+        with self.assertRaises(ValueError):
+            read_names(b"plik,imie\na.jpg,Jan\n")
+
+    def test_2_zip_paths_are_flattened(self):
+        """Zdjęcia z ZIP-a są wyszukiwane po samej nazwie pliku"""
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('ekipa/jan.jpg', b'abc')
+        archive.seek(0)
+        photos = load_photos(archive, ['../jan.jpg', 'brak.jpg'])
+        self.assertEqual(photos, {'jan.jpg': b'abc', 'brak.jpg': None})
+
+    def test_2b_zip_limits_checked_before_extracting(self):
+        """Za dużo wpisów albo za duże zdjęcia po rozpakowaniu - ValueError"""
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('jan.jpg', b'\0' * 4096)
+            zf.writestr('anna.jpg', b'abc')
+        with self.assertRaises(ValueError):
+            load_photos(BytesIO(archive.getvalue()), ['jan.jpg'], max_files=1)
+        with self.assertRaises(ValueError):
+            load_photos(BytesIO(archive.getvalue()), ['jan.jpg'], max_bytes=1024)
+        photos = load_photos(BytesIO(archive.getvalue()), ['anna.jpg'], max_files=2, max_bytes=1024)
+        self.assertEqual(photos, {'anna.jpg': b'abc'})
+
+    def test_3_per_row_report(self):
+        """Każdy wiersz dostaje status; błędne wiersze nie trafiają do bazy"""
+        rows = [("pusty.jpg", "Jan"), ("brak.jpg", "Anna"), ("", "Bez pliku")]
+        photos = {"pusty.jpg": self._create_test_image(), "brak.jpg": None}
+        report, created = enroll(rows, photos, self.TestSession, self.tmp, self.tmp, workers=1)
+
+        self.assertEqual([r["row"] for r in report], [1, 2, 3])
+        self.assertTrue(all(r["status"] == "error" for r in report))
+        self.assertEqual(created, [])
+        session = self.TestSession()
+        self.assertEqual(session.query(User).count(), 0)
+        session.close()
+
+    def _create_test_image(self):
+        """Create a valid test JPG image"""
+        img = Image.new('RGB', (100, 100), color='white')
+        img_bytes = BytesIO()
+        img.save(img_bytes, format='JPEG')
+        return img_bytes.getvalue()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+import detectors
+from detectors import get_detector, validate_detector, HogDetector, CnnDetector, DnnDetector
+
+
+class TestDetectors(unittest.TestCase):
+    """Wybór backendu detekcji i walidacja konfiguracji przy starcie"""
+
+    def test_1_backend_selection(self):
+        """Nazwa z argumentu albo FACE_DETECTOR; instancja współdzielona"""
+        self.assertIsInstance(get_detector('hog'), HogDetector)
+        self.assertIs(get_detector('hog'), get_detector('hog'))
+        with mock.patch.object(detectors, 'FACE_DETECTOR', 'cnn'):
+            self.assertEqual(validate_detector(), 'cnn')
+            self.assertIsInstance(get_detector(), CnnDetector)
+        self.assertEqual(get_detector('hog').detect(np.zeros((120, 160, 3), dtype=np.uint8)), [])
+
+    def test_2_unknown_backend(self):
+        with mock.patch.object(detectors, 'FACE_DETECTOR', 'yolo'):
+            with self.assertRaises(ValueError):
+                validate_detector()
+
+    def test_3_missing_dnn_model(self):
+        """dnn bez pliku modelu - błąd od razu, bez ładowania OpenCV"""
+        with mock.patch.dict(os.environ, {'FACE_DNN_MODEL': ''}):
+            with self.assertRaises(ValueError):
+                validate_detector('dnn')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = os.path.join(tmp_dir, 'yunet.onnx')
+            with mock.patch.dict(os.environ, {'FACE_DNN_MODEL': model_path}):
+                with self.assertRaises(ValueError):
+                    validate_detector('dnn')
+                open(model_path, 'wb').close()
+                self.assertEqual(validate_detector('dnn'), 'dnn')
+                self.assertEqual(DnnDetector().model_path, model_path)
+
+    def test_4_box_outside_frame(self):
+        """Prostokąt wystający poza kadr jest przycinany, a nie przesuwany"""
+        self.assertEqual(detectors._xywh_to_trbl(-20, -10, 100, 80, (480, 640, 3)), (0, 80, 70, 0))
+        self.assertEqual(detectors._xywh_to_trbl(600, 450, 100, 80, (480, 640, 3)), (450, 640, 480, 600))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+import unittest
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+import ai_engine
+from ai_engine import dump_encoding, load_template_set
+from edge_snapshot import EdgeSnapshot, dump_edge_snapshot, user_payload
+from edge_gate import EdgeGate, EdgeSyncClient, LogOutbox, SyncError
+
+RECT = {"x": 10, "y": 10, "w": 80, "h": 80}
+
+
+def encoding(seed):
+    return np.random.default_rng(seed).normal(0, 0.1, 128).astype(np.float32)
+
+
+def user(user_id, name, qr, seeds):
+    return user_id, name, qr, load_template_set(user_id, [dump_encoding(encoding(s)) for s in seeds])
+
+
+class StandInServer:
+    """Zastępczy serwer centralny: /api/edge/snapshot, /api/edge/delta, /api/edge/logs"""
+
+    def __init__(self, users, version="e-1"):
+        self.users = users
+        self.version = version
+        self.delta = None
+        self.batches = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code, body, content_type='application/json', headers=()):
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == '/api/edge/snapshot':
+                    buffer = io.BytesIO()
+                    dump_edge_snapshot(buffer, server.version, server.users)
+                    return self._send(200, buffer.getvalue(), 'application/octet-stream',
+                                      [('X-Users-Version', server.version)])
+                delta = server.delta or {"version": server.version, "full": False, "added": [], "removed": []}
+                self._send(200, json.dumps(delta).encode())
+
+            def do_POST(self):
+                data = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                duplicate = data['batch_id'] in server.batches
+                server.batches[data['batch_id']] = data['entries']
+                self._send(200, json.dumps({"duplicate": duplicate}).encode())
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestEdgeGate(unittest.TestCase):
+    """Bramka offline: migawka wzorców, delty i zaległe logi"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.tmp_dir, 'snapshot.bin')
+        self.outbox_path = os.path.join(self.tmp_dir, 'outbox.jsonl')
+        self.server = StandInServer([user(1, "Jan", "qr1", [1, 2]), user(2, "Anna", "qr2", [3])])
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _gate(self):
+        return EdgeGate(self.snapshot_path, self.outbox_path, client=EdgeSyncClient(self.server.url, timeout=2))
+
+    def test_1_snapshot_is_memory_mapped(self):
+        """Migawka z pliku: wzorce jako widoki na np.memmap, progi jak na serwerze"""
+        with open(self.snapshot_path, 'wb') as f:
+            dump_edge_snapshot(f, "e-1", self.server.users)
+        snapshot = EdgeSnapshot.open(self.snapshot_path)
+        self.assertEqual((len(snapshot), snapshot.version), (2, "e-1"))
+
+        name, templates = snapshot.lookup("qr1")
+        self.assertEqual(name, "Jan")
+        self.assertIsInstance(templates._matrix.base, np.memmap)
+        original = self.server.users[0][3]
+        self.assertAlmostEqual(templates.threshold, original.threshold, places=6)
+        self.assertEqual(templates.match(encoding(1)), original.match(encoding(1)))
+        self.assertIsNone(snapshot.lookup("nieznany"))
+
+    def test_2_local_decisions_go_to_outbox(self):
+        """Decyzja bez serwera: dopasowanie z migawki, log czeka w pliku"""
+        gate = self._gate()
+        self.assertTrue(gate.sync())
+        self.server.close()
+
+        probe = (dump_encoding(encoding(1) + 0.001), RECT, None)
+        with mock.patch.object(ai_engine, 'get_face_data_checked', return_value=probe):
+            body, status = gate.verify("qr1", np.zeros((120, 120, 3), dtype=np.uint8))
+            self.assertEqual((status, body["user"]), (200, "Jan"))
+            body, status = gate.verify("qr2", np.zeros((120, 120, 3), dtype=np.uint8))
+            self.assertEqual((status, body["status"]), (403, "denied"))
+        self.assertEqual(gate.outbox.pending(), 2)
+        self.assertFalse(gate.sync())
+        self.assertEqual(gate.stats()["sync_errors"], 1)
+
+    def test_3_delta_adds_and_removes_users(self):
+        """Delta: nowy użytkownik dostępny od razu i po ponownym otwarciu pliku, usunięty znika"""
+        gate = self._gate()
+        gate.sync()
+        new_user = user(3, "Piotr", "qr3", [4])
+        self.server.delta = {"version": "e-2", "full": False, "added": [user_payload(*new_user)], "removed": [2]}
+        self.assertTrue(gate.sync())
+
+        self.assertEqual(gate.snapshot.lookup("qr3")[0], "Piotr")
+        self.assertIsNone(gate.snapshot.lookup("qr2"))
+        reopened = EdgeSnapshot.open(self.snapshot_path)
+        self.assertEqual((len(reopened), reopened.version), (2, "e-2"))
+        self.assertEqual(reopened.lookup("qr3")[1].match(encoding(4))[0], new_user[3].match(encoding(4))[0])
+
+        # Serwer nie zna wersji bramki - pełna migawka
+        self.server.delta = {"version": "f-0", "full": True}
+        self.server.version = "f-0"
+        gate.sync()
+        self.assertEqual((gate.full_syncs, len(gate.snapshot)), (2, 2))
+
+    def test_4_outbox_retries_same_batch(self):
+        """Nieudana wysyłka zostawia partię; ponowienie ma ten sam batch_id"""
+        outbox = LogOutbox(self.outbox_path)
+        outbox.append("Jan", "SUCCESS")
+        outbox.append("Anna", "DENIED_FACE")
+        sent = []
+
+        def failing(batch_id, entries):
+            sent.append(batch_id)
+            raise SyncError("brak sieci")
+
+        with self.assertRaises(SyncError):
+            outbox.upload(failing)
+        outbox.append("Piotr", "SUCCESS")
+        self.assertEqual(outbox.pending(), 3)
+
+        outbox.upload(lambda batch_id, entries: sent.append((batch_id, len(entries))))
+        self.assertEqual(sent[1], (sent[0], 2))
+        self.assertEqual(sent[2][1], 1)
+        self.assertEqual(outbox.pending(), 0)
+
+    def test_5_corrupt_outbox_line_is_quarantined(self):
+        """Urwana linia (np. zanik zasilania) trafia do .corrupt, reszta partii idzie na serwer"""
+        outbox = LogOutbox(self.outbox_path)
+        outbox.append("Jan", "SUCCESS")
+        with open(self.outbox_path, 'a', encoding='utf-8') as f:
+            f.write('{"user_name": "Anna", "stat')
+        sent = []
+        self.assertEqual(outbox.upload(lambda batch_id, entries: sent.extend(entries)), 1)
+        self.assertEqual([e["user_name"] for e in sent], ["Jan"])
+        self.assertEqual((outbox.corrupt, outbox.pending()), (1, 0))
+        with open(self.outbox_path + '.corrupt', encoding='utf-8') as f:
+            self.assertIn('"stat', f.read())
+
+
+class TestEdgeEndpoints(unittest.TestCase):
+    """Endpointy serwera centralnego dla bramek"""
+
+    def setUp(self):
+        from app import app
+        self.app = app.test_client()
+        with self.app.session_transaction() as sess:
+            sess['admin_logged_in'] = True
+
+    def test_1_requires_token_or_admin(self):
+        from app import app
+        self.assertEqual(app.test_client().get('/api/edge/snapshot').status_code, 403)
+
+    def test_2_snapshot_and_delta(self):
+        response = self.app.get('/api/edge/snapshot')
+        self.assertEqual(response.status_code, 200)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'snapshot.bin')
+            with open(path, 'wb') as f:
+                f.write(response.data)
+            snapshot = EdgeSnapshot.open(path)
+        self.assertEqual(snapshot.version, response.headers['X-Users-Version'])
+
+        delta = self.app.get('/api/edge/delta', query_string={'since': snapshot.version}).get_json()
+        self.assertFalse(delta["full"])
+        self.assertTrue(self.app.get('/api/edge/delta', query_string={'since': 'inna-0'}).get_json()["full"])
+
+    def test_3_log_batch_saved_once(self):
+        """Ponowione wysłanie tej samej partii nie dubluje logów"""
+        batch = {"gate_id": "test", "batch_id": os.urandom(8).hex(),
+                 "entries": [{"user_name": "Edge Test", "status": "SUCCESS", "timestamp": "2026-01-05T08:00:00"}]}
+        first = self.app.post('/api/edge/logs', json=batch).get_json()
+        second = self.app.post('/api/edge/logs', json=batch).get_json()
+        self.assertEqual((first["accepted"], first["duplicate"]), (1, False))
+        self.assertTrue(second["duplicate"])
+        self.assertEqual(self.app.post('/api/edge/logs', json={"batch_id": "x", "entries": [{}]}).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+import pickle
+from unittest import mock
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+import ai_engine
+from encoding_cache import EncodingCache
+
+
+class TestEncodingCache(unittest.TestCase):
+    """Cache wektorów twarzy kluczowany kodem QR"""
+
+    def test_1_hit_and_miss_counters(self):
+        """Trafienia i chybienia są liczone"""
+        cache = EncodingCache(max_size=10)
+        self.assertIsNone(cache.get("abc"))
+        cache.put("abc", "Jan", np.zeros(128))
+        name, encoding = cache.get("abc")
+        self.assertEqual(name, "Jan")
+        self.assertEqual(encoding.shape, (128,))
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_2_pickle_is_decoded(self):
+        """Dane z bazy (pickle, jawnie dozwolone) są dekodowane przy zapisie"""
+        cache = EncodingCache()
+        with mock.patch.object(ai_engine, 'ALLOW_LEGACY_PICKLE', True):
+            cache.put("abc", "Jan", pickle.dumps(np.ones(128)))
+        _, encoding = cache.get("abc")
+        self.assertIsInstance(encoding, np.ndarray)
+        self.assertTrue(np.allclose(encoding, 1.0))
+
+    def test_3_lru_eviction(self):
+        """Najdawniej używany wpis jest usuwany po przekroczeniu pojemności"""
+        cache = EncodingCache(max_size=2)
+        cache.put("a", "A", np.zeros(128))
+        cache.put("b", "B", np.zeros(128))
+        cache.get("a")
+        cache.put("c", "C", np.zeros(128))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_4_invalidate(self):
+        """Usunięcie użytkownika unieważnia wpis"""
+        cache = EncodingCache()
+        cache.put("abc", "Jan", np.zeros(128))
+        cache.invalidate("abc")
+        self.assertIsNone(cache.get("abc"))
+        self.assertEqual(len(cache), 0)
+
+    def test_5_entries_expire_after_ttl(self):
+        """Po ttl wpis jest czytany ponownie z bazy (zmiany z innych procesów)"""
+        now = [0.0]
+        cache = EncodingCache(ttl=60, clock=lambda: now[0])
+        cache.put("abc", "Jan", np.zeros(128))
+        now[0] = 59
+        self.assertIsNotNone(cache.get("abc"))
+        now[0] = 60
+        self.assertIsNone(cache.get("abc"))
+        self.assertEqual((cache.stats()["expired"], len(cache)), (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import sys
+import pickle
+import subprocess
+import tempfile
+from unittest import mock
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+import ai_engine
+from ai_engine import dump_encoding, load_encoding, is_legacy_encoding
+from migrate_encodings import migrate, count_legacy
+from models import User, Base
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+class TestEncodingFormat(unittest.TestCase):
+    """Binarny format wektorów twarzy i migracja z pickle"""
+
+    def setUp(self):
+        self.encoding = np.random.default_rng(0).normal(scale=0.1, size=128)
+
+    def test_1_round_trip_float32(self):
+        """Zapis float32 ma 8 B nagłówka + 512 B danych"""
+        blob = dump_encoding(self.encoding)
+        self.assertEqual(len(blob), 8 + 128 * 4)
+        self.assertFalse(is_legacy_encoding(blob))
+        loaded = load_encoding(blob)
+        self.assertEqual(loaded.dtype, np.float32)
+        self.assertTrue(np.allclose(loaded, self.encoding, atol=1e-6))
+
+    def test_2_round_trip_float16(self):
+        """float16 zachowuje odległości z dokładnością do progu"""
+        loaded = load_encoding(dump_encoding(self.encoding, dtype='float16'))
+        self.assertLess(np.linalg.norm(loaded - self.encoding), 0.01)
+
+    def test_3_legacy_pickle(self):
+        """Stare rekordy z pickle są rozpoznawane"""
+        blob = pickle.dumps(self.encoding)
+        self.assertTrue(is_legacy_encoding(blob))
+        self.assertTrue(np.allclose(load_encoding(blob, allow_pickle=True), self.encoding))
+        with self.assertRaises(ValueError):
+            load_encoding(blob, allow_pickle=False)
+
+    def test_3b_pickle_needs_explicit_opt_in(self):
+        """Domyślnie (bez ALLOW_LEGACY_PICKLE=1) pickle nie jest czytany"""
+        blob = pickle.dumps(self.encoding)
+        with mock.patch.object(ai_engine, 'ALLOW_LEGACY_PICKLE', False):
+            with self.assertRaises(ValueError):
+                load_encoding(blob)
+
+    def test_4_migration(self):
+        """Migracja przepisuje rekordy pickle i pomija już zmigrowane"""
+        db_fd, db_path = tempfile.mkstemp()
+        try:
+            engine = create_engine(f"sqlite:///{db_path}")
+            Base.metadata.create_all(engine)
+            session = sessionmaker(bind=engine)()
+            session.add(User(name="A", qr_code_data="a", face_encoding=pickle.dumps(self.encoding)))
+            session.add(User(name="B", qr_code_data="b", face_encoding=dump_encoding(self.encoding)))
+            session.commit()
+            self.assertEqual(count_legacy(session), 1)
+            session.close()
+            engine.dispose()
+
+            result = migrate(f"sqlite:///{db_path}")
+            self.assertEqual(result["converted"], 1)
+            self.assertEqual(result["skipped"], 1)
+            self.assertLess(result["bytes_after"], result["bytes_before"])
+
+            session = sessionmaker(bind=create_engine(f"sqlite:///{db_path}"))()
+            self.assertEqual(count_legacy(session), 0)
+            for user in session.query(User).all():
+                self.assertFalse(is_legacy_encoding(user.face_encoding))
+            session.close()
+        finally:
+            os.close(db_fd)
+            os.unlink(db_path)
+
+
+    def test_5_app_refuses_to_start_with_pickle(self):
+        """Niezmigrowane wektory pickle - import aplikacji kończy się błędem z instrukcją"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'legacy.db')
+            engine = create_engine(f"sqlite:///{db_path}")
+            Base.metadata.create_all(engine)
+            session = sessionmaker(bind=engine)()
+            session.add(User(name="A", qr_code_data="a", face_encoding=pickle.dumps(self.encoding)))
+            session.commit()
+            session.close()
+            engine.dispose()
+
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", ALLOW_LEGACY_PICKLE='0')
+            result = subprocess.run([sys.executable, '-c', 'import app'], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    env=env, capture_output=True, text=True, timeout=120)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("migrate_encodings.py", result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
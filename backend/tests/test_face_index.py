@@ -0,0 +1,73 @@
+import unittest
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from ai_engine import rank_matches
+from face_index import FaceIndex
+from face_templates import TemplateSet
+
+
+class TestFaceIndex(unittest.TestCase):
+    """Identyfikacja 1:N na macierzy wektorów"""
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.encodings = rng.normal(scale=0.1, size=(50, 128))
+        self.index = FaceIndex(initial_capacity=4)
+        for i, enc in enumerate(self.encodings):
+            self.index.add(i + 1, f"Pracownik {i + 1}", enc)
+
+    def test_1_top_k_matches_brute_force(self):
+        """Wynik top-k zgodny z pełnym przeszukaniem"""
+        query = self.encodings[10] + 0.001
+        results = self.index.search(query, top_k=5)
+        expected = np.argsort(np.linalg.norm(self.encodings - query, axis=1))[:5] + 1
+        self.assertEqual([r["user_id"] for r in results], list(expected))
+        self.assertEqual(results[0]["name"], "Pracownik 11")
+
+    def test_2_remove_keeps_index_consistent(self):
+        """Usunięcie użytkownika nie psuje pozostałych wpisów"""
+        self.assertTrue(self.index.remove(11))
+        self.assertFalse(self.index.remove(11))
+        self.assertEqual(len(self.index), 49)
+        self.assertNotIn(11, self.index)
+        last = self.index.search(self.encodings[49], top_k=1)[0]
+        self.assertEqual(last["user_id"], 50)
+        self.assertAlmostEqual(last["distance"], 0.0, places=3)
+
+    def test_3_empty_index(self):
+        """Pusty indeks zwraca pustą listę"""
+        self.assertEqual(FaceIndex().search(np.zeros(128)), [])
+
+    def test_4_user_templates_and_threshold(self):
+        """Dodatkowe wzorce i próg użytkownika (TemplateSet) decydują o dopasowaniu"""
+        primary = np.zeros(128)
+        extra = np.zeros(128)
+        extra[0] = 0.3
+        templates = TemplateSet(100, [primary, extra], base_threshold=0.5)
+        self.assertGreater(templates.threshold, 0.5)
+        self.index.add(100, "Wiele wzorców", templates)
+        self.assertEqual(len(self.index), 51)
+
+        # Blisko dodatkowego wzorca, daleko od głównego
+        query = np.zeros(128)
+        query[0] = 0.3 + templates.threshold - 0.01
+        best = rank_matches(self.index, query, top_k=3)[0]
+        self.assertEqual(best["user_id"], 100)
+        self.assertGreater(best["distance"], 0.5)
+        self.assertTrue(best["match"])
+        self.assertEqual(len({m["user_id"] for m in rank_matches(self.index, query, top_k=3)}), 3)
+
+        # Nadpisanie pojedynczym wektorem - próg bazowy, stare wzorce usunięte
+        self.index.add(100, "Wiele wzorców", primary)
+        self.assertEqual(len(self.index), 51)
+        self.assertFalse(rank_matches(self.index, query, top_k=1)[0]["match"])
+        self.assertTrue(self.index.remove(100))
+        self.assertNotIn(100, [m["user_id"] for m in self.index.search(primary, top_k=50)])
+
+
+if __name__ == '__main__':
+    unittest.main()
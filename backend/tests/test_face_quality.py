@@ -0,0 +1,43 @@
+import unittest
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from face_quality import assess_face, QualityStats
+
+
+class TestFaceQuality(unittest.TestCase):
+    """Bramka jakości twarzy przed kodowaniem"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.sharp = rng.integers(60, 200, size=(300, 300, 3), dtype=np.uint8)
+        self.box = (50, 250, 250, 50)  # top, right, bottom, left
+
+    def test_1_good_face_passes(self):
+        """Duża, ostra i dobrze oświetlona twarz przechodzi"""
+        self.assertIsNone(assess_face(self.sharp, self.box))
+
+    def test_2_rejection_reasons(self):
+        """Każdy test zwraca własny powód odrzucenia"""
+        self.assertEqual(assess_face(self.sharp, (50, 80, 80, 50)), "face_too_small")
+        self.assertEqual(assess_face(self.sharp // 10, self.box), "too_dark")
+        self.assertEqual(assess_face(np.full_like(self.sharp, 250), self.box), "too_bright")
+        self.assertEqual(assess_face(np.full_like(self.sharp, 128), self.box), "blurry")
+
+    def test_3_stats_count_reasons(self):
+        """Liczniki odrzuceń według powodu"""
+        stats = QualityStats()
+        for reason in (None, "blurry", "blurry", "too_dark"):
+            stats.record(reason)
+        result = stats.stats()
+        self.assertEqual(result["checked"], 4)
+        self.assertEqual(result["passed"], 1)
+        self.assertEqual(result["rejected"], 3)
+        self.assertEqual(result["rejected_by_reason"]["blurry"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from face_templates import TemplateSet, MAX_TEMPLATE_THRESHOLD
+from encoding_cache import EncodingCache
+
+
+class TestFaceTemplates(unittest.TestCase):
+    """Wiele wzorców twarzy na użytkownika"""
+
+    def setUp(self):
+        self.base = np.zeros(128, dtype=np.float32)
+
+    def test_1_single_template_keeps_base_threshold(self):
+        """Jeden wzorzec - próg i odległość jak przy pojedynczym wektorze"""
+        templates = TemplateSet(1, [self.base], base_threshold=0.5)
+        self.assertEqual(templates.threshold, 0.5)
+        probe = self.base.copy()
+        probe[0] = 0.3
+        distance, threshold = templates.match(probe)
+        self.assertAlmostEqual(distance, 0.3, places=5)
+        self.assertEqual(threshold, 0.5)
+
+    def test_2_nearest_template_wins(self):
+        """Zgodność liczona do najbliższego wzorca (np. zdjęcie w okularach)"""
+        other = self.base.copy()
+        other[1] = 0.8
+        templates = TemplateSet(1, [self.base, other], base_threshold=0.5)
+        probe = other.copy()
+        probe[2] = 0.1
+        distance, _ = templates.match(probe)
+        self.assertAlmostEqual(distance, 0.1, places=5)
+        self.assertAlmostEqual(templates.nearest_template_distance(other), 0.0, places=5)
+
+    def test_3_spread_raises_threshold_up_to_cap(self):
+        """Rozrzut wzorców podnosi próg, ale nie ponad limit"""
+        near = self.base.copy()
+        near[0] = 0.1
+        templates = TemplateSet(1, [self.base, near], base_threshold=0.5)
+        self.assertAlmostEqual(templates.spread, 0.05, places=5)
+        self.assertAlmostEqual(templates.threshold, 0.525, places=5)
+
+        far = self.base.copy()
+        far[0] = 2.0
+        self.assertEqual(TemplateSet(1, [self.base, far], base_threshold=0.5).threshold, MAX_TEMPLATE_THRESHOLD)
+
+    def test_4_cache_stores_template_set(self):
+        """EncodingCache przechowuje TemplateSet bez dekodowania"""
+        cache = EncodingCache()
+        templates = TemplateSet(7, [self.base])
+        self.assertIs(cache.put("abc", "Jan", templates)[1], templates)
+        self.assertIs(cache.get("abc")[1], templates)
+
+
+if __name__ == '__main__':
+    unittest.main()
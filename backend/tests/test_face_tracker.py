@@ -0,0 +1,72 @@
+import unittest
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from face_tracker import FaceTracker
+
+
+class FakeDetector:
+    """Detektor zwracający stałą ramkę we współrzędnych całej klatki"""
+
+    def __init__(self, frame_shape, box):
+        self.frame_shape = frame_shape
+        self.box = box
+        self.calls = []
+
+    def __call__(self, img):
+        self.calls.append(img.shape[:2])
+        if img.shape[:2] == self.frame_shape:
+            return [self.box] if self.box else []
+        # Obszar śledzenia: ramka przesunięta o jego lewy górny róg
+        return [self.roi_box] if self.box else []
+
+
+class TestFaceTracker(unittest.TestCase):
+    """Śledzenie twarzy między klatkami"""
+
+    def setUp(self):
+        self.frame = np.random.default_rng(0).integers(0, 255, size=(480, 640, 3), dtype=np.uint8)
+        self.box = (100, 300, 300, 100)  # top, right, bottom, left
+
+    def test_1_roi_after_first_detection(self):
+        """Po pierwszej klatce detekcja działa tylko na obszarze śladu"""
+        tracker = FaceTracker(margin=0.5)
+        detector = FakeDetector((480, 640), self.box)
+        self.assertEqual(tracker.locate(self.frame, detector), [self.box])
+
+        # Obszar śledzenia zaczyna się w (top=0, left=0) - ramka w ROI ma te same współrzędne
+        detector.roi_box = self.box
+        self.assertEqual(tracker.locate(self.frame, detector), [self.box])
+        self.assertEqual(detector.calls, [(480, 640), (400, 400)])
+        self.assertEqual(tracker.stats(), {"roi_hits": 1, "full_detections": 1, "encoding_reuses": 0})
+
+    def test_2_lost_track_falls_back_to_full_frame(self):
+        """Brak twarzy w obszarze śladu - pełna detekcja"""
+        tracker = FaceTracker()
+        detector = FakeDetector((480, 640), self.box)
+        tracker.locate(self.frame, detector)
+        detector.box = None
+        self.assertEqual(tracker.locate(self.frame, detector), [])
+        self.assertIsNone(tracker.box)
+        self.assertEqual(tracker.stats()["full_detections"], 2)
+
+    def test_3_encoding_reused_for_unchanged_crop(self):
+        """Ten sam wycinek - poprzedni wektor; zmieniony wycinek - brak"""
+        tracker = FaceTracker()
+        tracker.store_encoding(self.frame, self.box, b"wektor")
+        self.assertEqual(tracker.cached_encoding(self.frame, self.box), b"wektor")
+
+        changed = self.frame.copy()
+        changed[100:300, 100:300] = 0
+        self.assertIsNone(tracker.cached_encoding(changed, self.box))
+        self.assertIsNone(tracker.cached_encoding(self.frame, (150, 350, 350, 150)))
+
+        tracker.reset_encoding()
+        self.assertIsNone(tracker.cached_encoding(self.frame, self.box))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+import sys
+import threading
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from frame_stream import FrameStreamManager, read_frames, FRAME_HEADER
+
+
+def framed(*frames):
+    return b''.join(FRAME_HEADER.pack(len(f)) + f for f in frames)
+
+
+class TestFrameStream(unittest.TestCase):
+    """Strumień klatek - weryfikowana jest tylko najnowsza klatka"""
+
+    def test_1_stale_frames_are_dropped(self):
+        """Klatki nadesłane w trakcie weryfikacji są zastępowane najnowszą"""
+        started, release = threading.Event(), threading.Event()
+        verified = []
+
+        def verify(known, frame, tracker):
+            verified.append(frame)
+            if frame == "f1":
+                started.set()
+                release.wait(5)
+            return frame == "f4", 90 if frame == "f4" else 10, {"x": 0, "y": 0, "w": 1, "h": 1}, tracker
+
+        manager = FrameStreamManager(verify)
+        stream, _ = manager.open("qr", "bramka-1", "Jan", None)
+
+        results = {}
+        verifier = threading.Thread(target=lambda: results.setdefault("f1", manager.push_frame(stream, "f1")))
+        verifier.start()
+        started.wait(5)
+        for frame in ("f2", "f3", "f4"):
+            self.assertFalse(manager.push_frame(stream, frame))
+        release.set()
+        verifier.join(5)
+
+        self.assertEqual(verified, ["f1", "f4"])
+        self.assertTrue(results["f1"])
+        self.assertEqual(stream.decision["status"], "success")
+        self.assertEqual(stream.frames_dropped, 2)
+
+    def test_2_one_session_per_gate(self):
+        """Nowa sesja na tej samej bramce zastępuje poprzednią"""
+        manager = FrameStreamManager(lambda known, frame, tracker: (False, 0, None, tracker))
+        first, _ = manager.open("qr1", "bramka-1", "Jan", None)
+        second, replaced = manager.open("qr2", "bramka-1", "Anna", None)
+        self.assertIs(replaced, first)
+        self.assertIsNone(manager.get(first.id))
+        self.assertIs(manager.get(second.id), second)
+
+    def test_3_expired_sessions_are_purged(self):
+        """Wygasłe sesje są usuwane i zwracane do zalogowania"""
+        manager = FrameStreamManager(lambda known, frame, tracker: (False, 0, None, tracker), session_ttl=-1)
+        stream, _ = manager.open("qr", "bramka-1", "Jan", None)
+        self.assertEqual(manager.purge_expired(), [stream])
+        self.assertEqual(manager.stats()["active_streams"], 0)
+
+    def test_4_sessions_are_capped(self):
+        """Limit sesji: najstarsza jest zamykana, tracker znika razem z sesją"""
+        manager = FrameStreamManager(lambda known, frame, tracker: (False, 0, None, tracker), max_sessions=2)
+        streams = [manager.open("qr", f"bramka-{i}", "Jan", None)[0] for i in range(3)]
+        self.assertIsNone(manager.get(streams[0].id))
+        self.assertEqual(manager.purge_expired(), [streams[0]])
+        self.assertIsNone(streams[0].tracker)
+        self.assertFalse(manager.push_frame(streams[0], "f1"))
+        self.assertEqual(manager.stats()["active_streams"], 2)
+
+        # Ta sama bramka - nowa sesja przejmuje tracker, zamknięcie go zwalnia
+        tracker = streams[2].tracker
+        reopened, replaced = manager.open("qr2", "bramka-2", "Anna", None)
+        self.assertIs(replaced, streams[2])
+        self.assertIs(reopened.tracker, tracker)
+        manager.close(reopened.id)
+        self.assertIsNone(reopened.tracker)
+        self.assertEqual(manager.stats()["active_streams"], 1)
+
+
+    def test_5_frames_from_one_body(self):
+        """Klatki z treści jednego żądania: długość + bajty; urwana klatka - ValueError"""
+        self.assertEqual(list(read_frames(BytesIO(framed(b"f1", b"f22")), 10)), [b"f1", b"f22"])
+        with self.assertRaises(ValueError):
+            list(read_frames(BytesIO(framed(b"f1")[:-1]), 10))
+        with self.assertRaises(ValueError):
+            list(read_frames(BytesIO(framed(b"x" * 11)), 10))
+
+    def test_6_push_stream_stops_at_decision(self):
+        """Strumień kończy się na pierwszej zgodnej klatce; dalsze klatki nie są czytane"""
+        read = []
+
+        def frames():
+            for frame in ("f1", "f2", "f3", "f4"):
+                read.append(frame)
+                yield frame
+
+        manager = FrameStreamManager(lambda known, frame, tracker: (frame == "f2", 90, None, tracker))
+        stream, _ = manager.open("qr", "bramka-1", "Jan", None)
+        # Weryfikacja działa w osobnym wątku - czekamy na nią przed kolejną klatką
+        def paced():
+            for frame in frames():
+                yield frame
+                manager.wait(stream, 0.05)
+
+        self.assertTrue(manager.push_stream(stream, paced()))
+        self.assertEqual(stream.decision["status"], "success")
+        self.assertNotIn("f4", read)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from gate_limits import TokenBucketLimiter, DecisionCoalescer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGateLimits(unittest.TestCase):
+    """Limit żądań na bramkę i łączenie powtórzonych skanów"""
+
+    def test_1_token_bucket_allows_burst_then_limits(self):
+        """Seria do pojemności kubełka przechodzi, potem czas do następnego żetonu"""
+        clock = FakeClock()
+        limiter = TokenBucketLimiter(rate=2, burst=3, clock=clock)
+        self.assertEqual([limiter.allow("g1")[0] for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(limiter.allow("g1")[1], 0.5)
+        # Inna bramka ma własny kubełek
+        self.assertTrue(limiter.allow("g2")[0])
+        clock.now += 0.5
+        self.assertTrue(limiter.allow("g1")[0])
+        self.assertEqual(limiter.stats()["limited"], 2)
+
+    def test_2_disabled_limiter(self):
+        limiter = TokenBucketLimiter(rate=0, burst=1)
+        self.assertTrue(all(limiter.allow("g1")[0] for _ in range(100)))
+
+    def test_3_concurrent_requests_share_one_decision(self):
+        """Żądania w toku z tym samym kluczem czekają na wynik pierwszego"""
+        coalescer = DecisionCoalescer(ttl=0)
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def decide():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "decyzja"
+
+        leader = threading.Thread(target=lambda: results.append(coalescer.run("k", decide)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(coalescer.run("k", decide))) for _ in range(3)]
+        for t in followers:
+            t.start()
+        # Czas na dołączenie do żądania w toku
+        time.sleep(0.1)
+        release.set()
+        for t in [leader] + followers:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(source for _, source in results), ["coalesced"] * 3 + ["computed"])
+        # ttl=0 - po zakończeniu kolejne żądanie liczone od nowa
+        self.assertEqual(coalescer.run("k", lambda: "nowa")[1], "computed")
+
+    def test_4_decision_cache_expires(self):
+        """Decyzja pamiętana przez ttl; wyniki niecache'owalne liczone za każdym razem"""
+        clock = FakeClock()
+        coalescer = DecisionCoalescer(ttl=2, clock=clock)
+        self.assertEqual(coalescer.run("k", lambda: 1), (1, "computed"))
+        self.assertEqual(coalescer.run("k", lambda: 2), (1, "cached"))
+        clock.now += 2.1
+        self.assertEqual(coalescer.run("k", lambda: 3), (3, "computed"))
+
+        self.assertEqual(coalescer.run("retry", lambda: 4, cacheable=lambda r: False), (4, "computed"))
+        self.assertEqual(coalescer.run("retry", lambda: 5, cacheable=lambda r: False), (5, "computed"))
+
+    def test_5_error_is_not_cached(self):
+        coalescer = DecisionCoalescer(ttl=2)
+
+        def fail():
+            raise RuntimeError("pula przeciążona")
+
+        with self.assertRaises(RuntimeError):
+            coalescer.run("k", fail)
+        self.assertEqual(coalescer.run("k", lambda: 1), (1, "computed"))
+
+    def test_6_repeated_scan_reuses_decision(self):
+        """Ten sam QR na tej samej bramce: druga odpowiedź bez ponownej weryfikacji"""
+        import app as app_module
+        client = app_module.app.test_client()
+        # Snapshot odmowy trafia do katalogu tymczasowego, nie do static/
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, True)
+        with mock.patch.object(app_module.snapshot_store, 'root', tmp_dir):
+            self._post_twice(client)
+
+    def _post_twice(self, client):
+        image = BytesIO()
+        Image.new('RGB', (160, 120), color='gray').save(image, format='JPEG')
+        gate_id = os.urandom(4).hex()
+
+        responses = [client.post('/api/verify_entry', content_type='multipart/form-data', data={
+            'qr_code': 'nieistniejacy_qr', 'gate_id': gate_id, 'frame': (BytesIO(image.getvalue()), 'frame.jpg')
+        }) for _ in range(2)]
+        self.assertEqual([r.status_code for r in responses], [403, 403])
+        self.assertNotIn("repeated", responses[0].get_json())
+        self.assertTrue(responses[1].get_json()["repeated"])
+
+    def test_7_success_is_not_cached(self):
+        """Zapamiętywane są tylko odmowy - każde wpuszczenie liczone od nowa"""
+        import app as app_module
+        self.assertTrue(app_module.cacheable_decision(({}, 403)))
+        self.assertFalse(app_module.cacheable_decision(({}, 200)))
+        self.assertFalse(app_module.cacheable_decision(({}, 422)))
+
+    def test_8_rate_limit_ignores_client_gate_id(self):
+        """Limit liczony per adres IP - nowy gate_id w formularzu go nie omija"""
+        import app as app_module
+        client = app_module.app.test_client()
+        limiter = TokenBucketLimiter(rate=0.01, burst=1)
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, True)
+        image = BytesIO()
+        Image.new('RGB', (160, 120), color='gray').save(image, format='JPEG')
+        with mock.patch.object(app_module, 'gate_limiter', limiter), \
+                mock.patch.object(app_module.snapshot_store, 'root', tmp_dir):
+            statuses = [client.post('/api/verify_entry', content_type='multipart/form-data', data={
+                'qr_code': 'nieistniejacy_qr', 'gate_id': os.urandom(4).hex(),
+                'frame': (BytesIO(image.getvalue()), 'frame.jpg')
+            }).status_code for _ in range(2)]
+        self.assertEqual(statuses, [403, 429])
+
+
+if __name__ == '__main__':
+    unittest.main()
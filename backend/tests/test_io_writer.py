@@ -0,0 +1,49 @@
+import unittest
+import os
+import sys
+import tempfile
+from io import BytesIO
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from image_ingest import UploadedImage
+from io_writer import BackgroundWriter, write_snapshot
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    """Zapis snapshotów w tle"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        img = Image.new('RGB', (200, 100), color='white')
+        img_bytes = BytesIO()
+        img.save(img_bytes, format='JPEG')
+        self.image = UploadedImage(img_bytes.getvalue())
+
+    def test_1_flush_writes_all(self):
+        """Po flush() wszystkie zlecone pliki są na dysku"""
+        writer = BackgroundWriter()
+        paths = [os.path.join(self.tmp, f"snap_{i}.jpg") for i in range(5)]
+        for path in paths:
+            writer.submit(write_snapshot, self.image, path)
+        writer.shutdown()
+        self.assertTrue(all(os.path.exists(p) for p in paths))
+        self.assertEqual(writer.stats()["written"], 5)
+
+    def test_2_original_bytes_by_default(self):
+        """Bez opcji zapisywane są oryginalne bajty"""
+        path = os.path.join(self.tmp, "orig.jpg")
+        write_snapshot(self.image, path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), self.image.data)
+
+    def test_3_face_crop(self):
+        """Tryb wycinka zapisuje tylko okolice twarzy"""
+        path = os.path.join(self.tmp, "crop.jpg")
+        write_snapshot(self.image, path, jpeg_quality=70, face_rect={"x": 50, "y": 20, "w": 40, "h": 40})
+        self.assertEqual(Image.open(path).size, (60, 60))
+
+
+if __name__ == '__main__':
+    unittest.main()
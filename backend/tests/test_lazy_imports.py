@@ -0,0 +1,38 @@
+import unittest
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__)) + '/..'
+sys.path.insert(0, BACKEND_DIR)
+
+import lazy_imports
+from lazy_imports import LazyModule, lazy_import, load
+
+
+class TestLazyImports(unittest.TestCase):
+    """Leniwe ładowanie ciężkich bibliotek"""
+
+    def test_1_module_loaded_on_first_attribute(self):
+        """Import następuje dopiero przy pierwszym dostępie do atrybutu"""
+        module = lazy_import('colorsys')
+        self.assertIsNone(module._module)
+        self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0)[0], 0.0)
+        self.assertIsNotNone(module._module)
+        self.assertIn('colorsys', lazy_imports.load_times())
+
+    def test_2_load_returns_real_module(self):
+        """load() zwraca prawdziwy moduł (także dla zwykłego modułu)"""
+        import json
+        self.assertIs(load(LazyModule('json')), json)
+        self.assertIs(load(json), json)
+
+    def test_3_app_import_does_not_load_models(self):
+        """Import aplikacji nie ładuje modeli dlib ani OpenCV"""
+        code = "import sys, app; print('face_recognition' in sys.modules, 'cv2' in sys.modules)"
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=BACKEND_DIR)
+        self.assertEqual(output.decode().split()[-2:], ['False', 'False'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import os
+import sys
+import csv
+import datetime
+import tempfile
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from log_queries import fetch_page, hourly_counts, export_lines
+from models import AccessLog, Base
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+class TestLogQueries(unittest.TestCase):
+    """Paginacja kluczowa, filtry i eksport logów"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp, 'test.db')}")
+        Base.metadata.create_all(self.engine)
+        self.TestSession = sessionmaker(bind=self.engine)
+
+        base = datetime.datetime(2026, 3, 1, 6, 0)
+        session = self.TestSession()
+        for i in range(30):
+            session.add(AccessLog(
+                user_name="Jan" if i % 3 else "Anna",
+                status="SUCCESS" if i % 2 else "DENIED_FACE",
+                # Co druga para wpisów ma identyczny czas - kursor musi to obsłużyć
+                timestamp=base + datetime.timedelta(minutes=10 * (i // 2))
+            ))
+        session.commit()
+        session.close()
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_1_cursor_pages_cover_all_rows_once(self):
+        """Kolejne strony nie gubią ani nie powtarzają wierszy"""
+        session = self.TestSession()
+        seen, cursor = [], None
+        while True:
+            logs, cursor = fetch_page(session, {}, limit=7, cursor=cursor)
+            seen.extend(l.id for l in logs)
+            if not cursor:
+                break
+        session.close()
+        self.assertEqual(sorted(seen), list(range(1, 31)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_2_filters(self):
+        """Filtry po pracowniku, statusie i czasie"""
+        session = self.TestSession()
+        filters = {
+            "user": "Anna",
+            "status": ["DENIED_FACE"],
+            "since": datetime.datetime(2026, 3, 1, 7, 0)
+        }
+        logs, _ = fetch_page(session, filters, limit=100)
+        session.close()
+        self.assertTrue(logs)
+        for log in logs:
+            self.assertEqual((log.user_name, log.status), ("Anna", "DENIED_FACE"))
+            self.assertGreaterEqual(log.timestamp, filters["since"])
+
+    def test_3_hourly_counts(self):
+        """Agregacja na godzinę sumuje się do liczby wierszy"""
+        session = self.TestSession()
+        hours = hourly_counts(session, {})
+        session.close()
+        self.assertEqual(hours[0]["hour"], "2026-03-01 06:00")
+        self.assertEqual(sum(h["total"] for h in hours), 30)
+
+    def test_4_csv_export(self):
+        """Eksport CSV zawiera nagłówek i wszystkie wiersze"""
+        text = "".join(export_lines(self.TestSession, {}, 'csv'))
+        rows = list(csv.DictReader(StringIO(text)))
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(set(rows[0]), {"id", "time", "user", "status", "snapshot"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from log_writer import AccessLogWriter
+from models import AccessLog, Base
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+class BrokenSession:
+    """Sesja symulująca zablokowaną bazę"""
+
+    def execute(self, *args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestAccessLogWriter(unittest.TestCase):
+    """Zapis logów partiami w tle"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp, 'test.db')}")
+        Base.metadata.create_all(self.engine)
+        self.TestSession = sessionmaker(bind=self.engine)
+        self.spill_path = os.path.join(self.tmp, 'spill.jsonl')
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def _count(self):
+        session = self.TestSession()
+        count = session.query(AccessLog).count()
+        session.close()
+        return count
+
+    def test_1_batched_flush(self):
+        """Wpisy z bufora zapisywane są jedną partią"""
+        writer = AccessLogWriter(self.TestSession, flush_interval=60, spill_path=self.spill_path)
+        for i in range(10):
+            writer.log(f"Pracownik {i}", "SUCCESS")
+        self.assertEqual(self._count(), 0)
+        writer.shutdown()
+        self.assertEqual(self._count(), 10)
+        self.assertEqual(writer.stats()["batches"], 1)
+
+    def test_2_spill_and_replay(self):
+        """Przy zablokowanej bazie wpisy trafiają do pliku i wracają przy kolejnym zapisie"""
+        writer = AccessLogWriter(BrokenSession, flush_interval=60, spill_path=self.spill_path)
+        writer.log("Jan", "DENIED_FACE", snapshot_path="fail.jpg")
+        writer.flush()
+        self.assertTrue(os.path.exists(self.spill_path))
+        self.assertEqual(writer.stats()["spilled"], 1)
+
+        writer.Session = self.TestSession
+        writer.log("Anna", "SUCCESS")
+        writer.shutdown()
+        self.assertEqual(self._count(), 2)
+        self.assertFalse(os.path.exists(self.spill_path))
+
+    def test_3_corrupt_spill_line_is_quarantined(self):
+        """Urwana linia pliku awaryjnego nie blokuje zapisu - trafia do pliku .corrupt"""
+        with open(self.spill_path, 'w', encoding='utf-8') as f:
+            f.write('{"user_name": "Ewa", "status": "SUCCESS", "snapshot_path": null, "timestamp": "2026-01-05T08:00:00"}\n')
+            f.write('{"user_name": "a", "stat')
+        writer = AccessLogWriter(self.TestSession, flush_interval=60, spill_path=self.spill_path)
+        writer.log("Jan", "SUCCESS")
+        writer.log("Anna", "SUCCESS")
+        writer.shutdown()
+        self.assertEqual(self._count(), 3)
+        self.assertEqual(writer.stats()["corrupt_spill_lines"], 1)
+        self.assertFalse(os.path.exists(self.spill_path))
+        with open(self.spill_path + '.corrupt', encoding='utf-8') as f:
+            self.assertIn('"stat', f.read())
+
+    def test_4_failed_spill_keeps_entries_buffered(self):
+        """Błąd zapisu pliku awaryjnego (np. brak katalogu) - wpisy wracają do bufora"""
+        spill_path = os.path.join(self.tmp, 'brak', 'spill.jsonl')
+        writer = AccessLogWriter(BrokenSession, flush_interval=60, spill_path=spill_path)
+        writer.log("Jan", "DENIED_FACE")
+        self.assertEqual(writer.flush(), 0)
+        self.assertEqual(writer.stats()["buffered"], 1)
+
+        writer.Session = self.TestSession
+        writer.shutdown()
+        self.assertEqual(self._count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+import metrics
+from metrics import Histogram, Counter, Registry
+
+
+class TestMetrics(unittest.TestCase):
+    """Metryki w formacie Prometheusa"""
+
+    def test_1_histogram_buckets_are_cumulative(self):
+        """Przedziały histogramu są narastające, +Inf = liczba pomiarów"""
+        histogram = Histogram('t_seconds', 'test', label='stage', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, 'detect')
+        lines = histogram.render()
+        self.assertIn('t_seconds_bucket{stage="detect",le="0.1"} 1', lines)
+        self.assertIn('t_seconds_bucket{stage="detect",le="1.0"} 2', lines)
+        self.assertIn('t_seconds_bucket{stage="detect",le="+Inf"} 3', lines)
+        self.assertIn('t_seconds_count{stage="detect"} 3', lines)
+
+    def test_2_registry_renders_counters_and_gauges(self):
+        """Liczniki z etykietą i wartości chwilowe"""
+        registry = Registry()
+        counter = registry.register(Counter('t_total', 'test', label='status'))
+        counter.inc('SUCCESS')
+        counter.inc('SUCCESS')
+        registry.gauge('t_queue', 'test', lambda: 7)
+        text = registry.render()
+        self.assertIn('# TYPE t_total counter', text)
+        self.assertIn('t_total{status="SUCCESS"} 2', text)
+        self.assertIn('t_queue 7', text)
+
+    def test_3_timer_as_decorator_and_context_manager(self):
+        """timed() działa jako dekorator i menedżer kontekstu"""
+        @metrics.timed('test_decorated')
+        def work():
+            return 42
+
+        self.assertEqual(work(), 42)
+        with metrics.timed('test_block'):
+            pass
+        text = metrics.REGISTRY.render()
+        self.assertIn('faceid_stage_seconds_count{stage="test_decorated"} 1', text)
+        self.assertIn('faceid_stage_seconds_count{stage="test_block"} 1', text)
+
+    def test_4_worker_observations_are_buffered(self):
+        """W workerze pomiary są buforowane i odtwarzane w procesie aplikacji"""
+        metrics.buffer_observations()
+        try:
+            with metrics.timed('test_worker'):
+                pass
+            observations = metrics.drain_observations()
+        finally:
+            metrics._buffer = None
+        self.assertEqual([stage for stage, _ in observations], ['test_worker'])
+        metrics.replay_observations(observations)
+        self.assertIn('faceid_stage_seconds_count{stage="test_worker"} 1', metrics.REGISTRY.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
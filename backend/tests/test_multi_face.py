@@ -0,0 +1,79 @@
+import unittest
+import os
+import sys
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+import ai_engine
+from ai_engine import verify_face_multi, dump_encoding
+
+
+class TestMultiFace(unittest.TestCase):
+    """Klatka z kilkoma twarzami - wybór twarzy i kodowanie wsadowe"""
+
+    def setUp(self):
+        self.frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        # top, right, bottom, left: duża twarz z lewej, mniejsza na środku
+        self.large = (50, 250, 250, 50)
+        self.central = (190, 370, 290, 270)
+        self.owner = np.zeros(128)
+        self.stranger = np.full(128, 0.2)
+
+    def run_multi(self, selection, encodings):
+        calls = []
+
+        def face_encodings(img, locations):
+            calls.append(list(locations))
+            return [encodings[l] for l in locations]
+
+        with mock.patch.object(ai_engine, 'detect_faces', return_value=[self.central, self.large]), \
+                mock.patch.object(ai_engine.face_recognition, 'face_encodings', side_effect=face_encodings):
+            result = verify_face_multi(dump_encoding(self.owner), self.frame, selection=selection)
+        return result, calls
+
+    def test_1_match_picks_qr_owner_in_one_batch(self):
+        """Tryb match: wszystkie twarze kodowane jednym wywołaniem, wygrywa właściciel QR"""
+        (match, score, rect, _, distance, quality, faces), calls = self.run_multi(
+            'match', {self.large: self.stranger, self.central: self.owner}
+        )
+        self.assertTrue(match)
+        self.assertEqual(rect, {"x": 270, "y": 190, "w": 100, "h": 100})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(calls[0]), 2)
+        self.assertEqual(faces[0], {"x": 50, "y": 50, "w": 200, "h": 200})
+        self.assertEqual(len(faces), 2)
+
+    def test_2_largest_and_central_encode_one_face(self):
+        """Tryby largest/central wybierają twarz przed kodowaniem"""
+        encodings = {self.large: self.stranger, self.central: self.owner}
+        (match, _, rect, _, _, _, _), calls = self.run_multi('largest', encodings)
+        self.assertFalse(match)
+        self.assertEqual(calls, [[self.large]])
+
+        (match, _, rect, _, _, _, _), calls = self.run_multi('central', encodings)
+        self.assertTrue(match)
+        self.assertEqual(calls, [[self.central]])
+
+    def test_3_match_in_background_is_denied(self):
+        """Tryb match: właściciel QR rozpoznany w tle (ani największy, ani w środku) - odmowa"""
+        background = (20, 620, 70, 570)
+        encodings = {self.large: self.stranger, self.central: self.stranger, background: self.owner}
+        calls = []
+
+        def face_encodings(img, locations):
+            calls.append(list(locations))
+            return [encodings[l] for l in locations]
+
+        with mock.patch.object(ai_engine, 'detect_faces', return_value=[self.central, background, self.large]), \
+                mock.patch.object(ai_engine.face_recognition, 'face_encodings', side_effect=face_encodings):
+            match, score, rect, _, distance, _, _ = verify_face_multi(dump_encoding(self.owner), self.frame, selection='match')
+        self.assertFalse(match)
+        self.assertEqual(distance, 0.0)
+        self.assertEqual(rect, {"x": 570, "y": 20, "w": 50, "h": 50})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from recognition_pool import RecognitionPool, PoolSaturated
+
+
+class TestRecognitionPool(unittest.TestCase):
+    """Ograniczona kolejka rozpoznawania (backpressure)"""
+
+    def test_1_inline_run(self):
+        """Bez workerów zadanie wykonuje się w wątku żądania"""
+        pool = RecognitionPool(workers=0)
+        self.assertEqual(pool.run(sum, [1, 2, 3]), 6)
+        self.assertEqual(pool.stats()["completed"], 1)
+
+    def test_2_saturated_pool_rejects(self):
+        """Po wyczerpaniu miejsc kolejne żądanie dostaje PoolSaturated"""
+        pool = RecognitionPool(workers=0, max_pending=1)
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "ok"
+
+        worker = threading.Thread(target=pool.run, args=(slow,))
+        worker.start()
+        started.wait(5)
+
+        with self.assertRaises(PoolSaturated):
+            pool.run(sum, [1])
+
+        release.set()
+        worker.join(5)
+        self.assertEqual(pool.run(sum, [1]), 1)
+        self.assertEqual(pool.stats()["rejected"], 1)
+
+    def test_3_timeout_raises_saturated(self):
+        """Zadanie dłuższe niż timeout - PoolSaturated, miejsce zwalniane po zakończeniu"""
+        pool = RecognitionPool(workers=1, timeout=0.1)
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        with mock.patch.object(pool, '_get_executor', return_value=executor):
+            with self.assertRaises(PoolSaturated):
+                pool.run(time.sleep, 0.5)
+            self.assertEqual(pool.stats()["timed_out"], 1)
+            executor.shutdown(wait=True)
+        self.assertEqual(pool.stats()["pending"], 0)
+
+    def test_4_broken_pool_is_rebuilt(self):
+        """Śmierć workera - PoolSaturated, a następne żądanie dostaje nową pulę"""
+        pool = RecognitionPool(workers=1, timeout=30, initializer=os.getpid)
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(pool.run(sum, [1, 2]), 3)
+        broken_executor = pool._executor
+
+        with self.assertRaises(PoolSaturated):
+            pool.run(os._exit, 1)
+        self.assertEqual(pool.stats()["broken"], 1)
+
+        self.assertEqual(pool.run(sum, [1, 2]), 3)
+        self.assertIsNot(pool._executor, broken_executor)
+
+
+if __name__ == '__main__':
+    unittest.main()
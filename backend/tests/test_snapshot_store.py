@@ -0,0 +1,72 @@
+import unittest
+import datetime
+import os
+import sys
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from image_ingest import UploadedImage
+from snapshot_store import SnapshotStore, thumbnail_path
+
+
+def make_image(color):
+    buffer = BytesIO()
+    Image.new('RGB', (640, 480), color=color).save(buffer, format='JPEG')
+    return UploadedImage(buffer.getvalue())
+
+
+class TestSnapshotStore(unittest.TestCase):
+    """Magazyn snapshotów: katalogi dzienne, deduplikacja, retencja"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.removed = []
+        self.store = SnapshotStore(self.root, thumb_width=160, on_removed=self.removed.extend)
+
+    def test_1_sharded_path_and_thumbnail(self):
+        """Snapshot trafia do katalogu dnia, obok powstaje miniatura"""
+        image = make_image('red')
+        path = self.store.reserve(image, day=datetime.date(2026, 3, 1))
+        self.assertTrue(path.startswith("2026/03/01/"))
+        self.assertTrue(self.store.write(image, path))
+        self.assertTrue(os.path.exists(os.path.join(self.root, path)))
+        with Image.open(os.path.join(self.root, thumbnail_path(path))) as thumb:
+            self.assertEqual(thumb.size, (160, 120))
+        self.assertIsNone(thumbnail_path("fail_Jan_120000.jpg"))
+
+    def test_2_identical_frames_are_deduplicated(self):
+        """Identyczna klatka tego samego dnia zapisywana jest raz"""
+        day = datetime.date(2026, 3, 1)
+        first, second = make_image('red'), make_image('red')
+        self.assertEqual(self.store.reserve(first, day), self.store.reserve(second, day))
+        self.assertNotEqual(self.store.reserve(first, day), self.store.reserve(make_image('blue'), day))
+        self.store.write(first, self.store.reserve(first, day))
+        self.assertFalse(self.store.write(second, self.store.reserve(second, day)))
+        self.assertEqual(self.store.stats()["deduplicated"], 1)
+
+    def test_3_retention_and_quota(self):
+        """Retencja usuwa stare dni, limit rozmiaru - najstarsze ponad limit"""
+        image = make_image('red')
+        paths = []
+        for day in (1, 2, 3):
+            path = self.store.reserve(image, day=datetime.date(2026, 3, day))
+            self.store.write(image, path)
+            paths.append(path)
+
+        self.store.retention_days = 1
+        self.assertEqual(self.store.sweep(today=datetime.date(2026, 3, 3)), [paths[0]])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "2026", "03", "01")))
+
+        self.store.retention_days = 0
+        self.store.max_bytes = 1
+        self.store.sweep(today=datetime.date(2026, 3, 3))
+        self.assertEqual(self.removed, paths[:2])
+        self.assertTrue(os.path.exists(os.path.join(self.root, paths[2])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from user_listing import UserListCache
+
+
+class TestUserListCache(unittest.TestCase):
+    """Cache listy pracowników z dziennikiem zmian"""
+
+    def test_1_changes_since_version(self):
+        """Różnice od wersji: dodani i usunięci (dodany i usunięty = tylko usunięty)"""
+        cache = UserListCache()
+        start = cache.version
+        cache.record(added=[1, 2])
+        middle = cache.version
+        cache.record(added=[3], removed=[2])
+        self.assertEqual(cache.changes_since(start), ([1, 3], [2]))
+        self.assertEqual(cache.changes_since(middle), ([3], [2]))
+        self.assertEqual(cache.changes_since(cache.version), ([], []))
+
+    def test_2_unknown_version_needs_full_list(self):
+        """Inna epoka (restart), przyszła wersja albo obcięty dziennik - pełna lista"""
+        cache = UserListCache(max_journal=2)
+        start = cache.version
+        cache.record(added=[1, 2, 3])
+        self.assertIsNone(cache.changes_since(start))
+        self.assertIsNone(cache.changes_since("inna-0"))
+        self.assertIsNone(cache.changes_since(f"{cache.epoch}-99"))
+        self.assertIsNone(cache.changes_since("zla wersja"))
+
+    def test_3_responses_cleared_on_change(self):
+        """Zmiana listy czyści odpowiedzi; odpowiedź ze starej wersji nie trafia do cache"""
+        cache = UserListCache()
+        version = cache.version
+        body, etag, _ = cache.put("all", "[]", {}, version)
+        self.assertEqual(cache.get("all"), ("[]", etag, {}))
+
+        cache.record(added=[1])
+        self.assertIsNone(cache.get("all"))
+        cache.put("all", "[]", {}, version)
+        self.assertIsNone(cache.get("all"))
+
+    def test_4_epoch_expires_after_ttl(self):
+        """Po ttl nowa epoka - zmiany z innych procesów dotrą przez pełną listę"""
+        now = [0.0]
+        cache = UserListCache(ttl=60, clock=lambda: now[0])
+        start = cache.version
+        cache.record(added=[1])
+        cache.put("all", "[1]", {}, cache.version)
+        now[0] = 30
+        self.assertEqual(cache.changes_since(start), ([1], []))
+
+        now[0] = 61
+        self.assertNotEqual(cache.version.split('-')[0], start.split('-')[0])
+        self.assertIsNone(cache.changes_since(start))
+        self.assertIsNone(cache.get("all"))
+        self.assertEqual(cache.stats()["rotations"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
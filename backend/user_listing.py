@@ -0,0 +1,135 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+MAX_USERS_PAGE_SIZE = 1000
+
+
+def user_to_dict(user):
+    return {"id": user.id, "name": user.name, "qr": user.qr_code_data, "photo": user.photo_path}
+
+
+class UserListCache:
+    """
+    Cache odpowiedzi /api/users (gotowy JSON + ETag) z dziennikiem zmian.
+
+    Każda rejestracja, usunięcie i zmiana wzorców twarzy (użytkownik trafia
+    wtedy ponownie do "dodanych") podbija wersję listy i czyści zapisane
+    odpowiedzi. Dziennik (kto dodany / usunięty w której wersji) pozwala
+    klientowi pobrać tylko różnice od znanej mu wersji. Wersja ma postać
+    "<epoka>-<numer>" - po restarcie procesu (nowa epoka) albo gdy dziennik
+    nie sięga tak daleko, changes_since zwraca None i trzeba pobrać całość.
+
+    Dziennik jest lokalny dla procesu, tak jak EncodingCache: przy kilku
+    workerach (albo rejestracji z bulk_enroll.py) zmiany z innego procesu
+    do niego nie trafiają. Dlatego epoka żyje najwyżej ttl sekund - potem
+    zaczyna się nowa, klienci pobierają pełną listę z bazy, a zapisane
+    odpowiedzi są odrzucane. ttl=0 - bez rotacji (tylko przy jednym procesie
+    aplikacji, który jako jedyny zmienia listę pracowników).
+    """
+
+    def __init__(self, max_entries=64, max_journal=10000, ttl=0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_journal = max_journal
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+        self._new_epoch()
+        self.rotations = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _new_epoch(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.epoch_started = self.clock()
+        self.number = 0
+        self._journal = []
+        self._journal_floor = 0
+        self._responses.clear()
+
+    def _rotate_expired(self):
+        """Nowa epoka po ttl sekundach (wywoływane pod blokadą)"""
+        if self.ttl and self.clock() - self.epoch_started >= self.ttl:
+            self._new_epoch()
+            self.rotations += 1
+
+    def _version(self):
+        return f"{self.epoch}-{self.number}"
+
+    @property
+    def version(self):
+        with self._lock:
+            self._rotate_expired()
+            return self._version()
+
+    def record(self, added=(), removed=()):
+        """Zmiana listy pracowników - nowa wersja, zapisane odpowiedzi są nieaktualne"""
+        with self._lock:
+            self._rotate_expired()
+            self.number += 1
+            self._journal.extend((self.number, user_id, True) for user_id in added)
+            self._journal.extend((self.number, user_id, False) for user_id in removed)
+            if len(self._journal) > self.max_journal:
+                dropped = self._journal[:len(self._journal) - self.max_journal]
+                del self._journal[:len(dropped)]
+                self._journal_floor = dropped[-1][0]
+            self._responses.clear()
+
+    def changes_since(self, version):
+        """(dodane id, usunięte id) od podanej wersji albo None, jeśli potrzebna pełna lista"""
+        epoch, _, number = (version or '').partition('-')
+        try:
+            number = int(number)
+        except ValueError:
+            return None
+        with self._lock:
+            self._rotate_expired()
+            if epoch != self.epoch or number > self.number or number < self._journal_floor:
+                return None
+            state = {}
+            for change_number, user_id, added in self._journal:
+                if change_number > number:
+                    state[user_id] = added
+        return sorted(i for i, a in state.items() if a), sorted(i for i, a in state.items() if not a)
+
+    def get(self, key):
+        """Zwraca (treść JSON, ETag, nagłówki) albo None"""
+        with self._lock:
+            self._rotate_expired()
+            entry = self._responses.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._responses.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, headers, version):
+        """
+        Zapisuje odpowiedź zbudowaną dla wersji version. Jeśli w międzyczasie
+        lista się zmieniła, odpowiedź jest zwracana, ale nie trafia do cache.
+        """
+        etag = hashlib.sha1(body.encode('utf-8')).hexdigest()[:20]
+        entry = (body, etag, headers)
+        with self._lock:
+            self._rotate_expired()
+            if version == self._version():
+                self._responses[key] = entry
+                while len(self._responses) > self.max_entries:
+                    self._responses.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self._version(),
+                "cached_responses": len(self._responses),
+                "journal": len(self._journal),
+                "ttl": self.ttl,
+                "rotations": self.rotations,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -3,6 +3,16 @@ let html5QrcodeScanner = null;
 let currentQrCode = null;
 let faceStream = null;
 
+// Stały identyfikator bramki (limit żądań i łączenie powtórzonych skanów na serwerze)
+function gateId() {
+    let id = localStorage.getItem('gate_id');
+    if (!id) {
+        id = Math.random().toString(36).slice(2, 10);
+        localStorage.setItem('gate_id', id);
+    }
+    return id;
+}
+
 window.onload = function() {
     startQrScanner();
     document.getElementById('qr-file-input').addEventListener('change', scanQrFromFile);
@@ -72,40 +82,64 @@ function goToFaceStep() {
 }
 
 // --- KLUCZOWA FUNKCJA: KLIKNIĘCIE I WERYFIKACJA ---
+// Weryfikacja strumieniowa: jedna sesja na zeskanowany kod QR, potem kolejne
+// klatki (surowy JPEG, bez formularza) przez to samo połączenie keep-alive,
+// aż do decyzji albo wygaśnięcia sesji. Serwer sprawdza zawsze najnowszą klatkę.
 async function captureAndVerify() {
     const video = document.getElementById('face-video');
     const canvas = document.createElement('canvas'); // Wirtualny canvas do zrzutu
     canvas.width = 640;
     canvas.height = 480;
-    
-    // Robimy zdjęcie z wideo
-    canvas.getContext('2d').drawImage(video, 0, 0, 640, 480);
-    
-    canvas.toBlob(async function(blob) {
-        const formData = new FormData();
-        formData.append('qr_code', currentQrCode);
-        formData.append('frame', blob, 'capture.jpg');
 
-        try {
-            const response = await fetch(`${API_URL}/verify_entry`, { method: 'POST', body: formData });
-            const data = await response.json();
+    const startData = new FormData();
+    startData.append('qr_code', currentQrCode);
+    startData.append('gate_id', gateId());
+
+    let data;
+    try {
+        const response = await fetch(`${API_URL}/stream/start`, { method: 'POST', body: startData });
+        data = await response.json();
+    } catch (e) {
+        console.error(e);
+        return alert("Błąd połączenia z serwerem");
+    }
+    if (!data.stream_id) {
+        if (data.status === 'rate_limited' || data.status === 'busy') return alert(data.error);
+        return showFinalResult(data, false); // Zły kod QR
+    }
+
+    const streamUrl = `${API_URL}/stream/${data.stream_id}`;
+    const deadline = Date.now() + data.expires_in * 1000;
+    try {
+        while (Date.now() < deadline) {
+            canvas.getContext('2d').drawImage(video, 0, 0, 640, 480);
+            const blob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.8));
+            const response = await fetch(`${streamUrl}/frame`, {
+                method: 'POST', body: blob, headers: { 'Content-Type': 'image/jpeg' }
+            });
+            if (response.status === 404) break; // Sesja wygasła po stronie serwera
+            data = await response.json();
+            if (data.status === 'busy') {
+                await new Promise(resolve => setTimeout(resolve, 1000)); // Serwer przeciążony - chwila przerwy
+                continue;
+            }
 
             // Rysujemy ramkę na "żywym" podglądzie (zostanie tam)
             drawResultBox(data);
-
             if (data.status === 'success') {
                 // Poczekaj sekundę żeby użytkownik zobaczył zieloną ramkę, potem pokaż wynik
                 setTimeout(() => showFinalResult(data, true), 1000);
-            } else {
-                // Jeśli błąd, też pokaż ramkę (czerwoną)
-                if(!data.face_rect) alert("Nie widzę twarzy! Spróbuj ponownie.");
+                return;
             }
-
-        } catch (e) {
-            console.error(e);
-            alert("Błąd połączenia z serwerem");
         }
-    }, 'image/jpeg');
+    } catch (e) {
+        console.error(e);
+        alert("Błąd połączenia z serwerem");
+    }
+
+    // Brak dopasowania w czasie sesji - zamknięcie zapisuje odmowę w logu
+    fetch(streamUrl, { method: 'DELETE' }).catch(() => {});
+    showFinalResult({ reason: "Nie rozpoznano twarzy - zeskanuj kod ponownie" }, false);
 }
 
 function drawResultBox(data) {
@@ -113,6 +147,13 @@ function drawResultBox(data) {
     const ctx = canvas.getContext('2d');
     ctx.clearRect(0, 0, 640, 480); // Czyść stare
 
+    // Pozostałe twarze w kadrze (np. kolejka za osobą weryfikowaną) - cienka szara ramka
+    ctx.lineWidth = 2;
+    ctx.strokeStyle = '#95a5a6';
+    (data.faces || []).forEach(f => {
+        if (!data.face_rect || f.x !== data.face_rect.x || f.y !== data.face_rect.y) ctx.strokeRect(f.x, f.y, f.w, f.h);
+    });
+
     if (data.face_rect) {
         const { x, y, w, h } = data.face_rect;
         ctx.lineWidth = 5;
@@ -153,8 +194,9 @@ async function loadAdminData() {
     `).join('');
 
     const logs = await (await fetch(`${API_URL}/logs`)).json();
+    // Miniatura snapshotu w liście, pełne zdjęcie dopiero po kliknięciu
     document.getElementById('logList').innerHTML = logs.map(l => 
-        `<li style="color:${l.status==='SUCCESS'?'green':'red'}">[${l.time}] ${l.user}</li>`
+        `<li style="color:${l.status==='SUCCESS'?'green':'red'}">${l.thumbnail ? `<a href="http://127.0.0.1:5000${l.snapshot}" target="_blank"><img src="http://127.0.0.1:5000${l.thumbnail}" class="log-thumb" loading="lazy"></a>` : ''}[${l.time}] ${l.user}</li>`
     ).join('');
 }
 